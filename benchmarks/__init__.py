@@ -0,0 +1,3 @@
+"""
+Offline benchmark suite: a local API stub plus runners that drive the pipeline end to end.
+"""
@@ -0,0 +1,96 @@
+import argparse
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+READ_ONLY_COMMANDS = [["--show-analysis"], ["--show-data", "--limit", "5"]]
+# Modules that read-only commands must not pull in
+HEAVY_MODULES = ["pandas", "numpy", "requests", "sqlalchemy", "openai", "pyarrow"]
+# Pipeline modules main.py only needs for fetching, analysis or maintenance
+PIPELINE_MODULES = ["src.data_collection.news_fetcher", "src.analysis.llm_analyzer", "src.analysis.watchlists",
+                    "src.monitoring.profiler", "src.storage.maintenance", "src.storage.coin_index",
+                    "src.storage.run_lock"]
+
+
+def _time_command(argv, cwd):
+    start = time.perf_counter()
+    subprocess.run(argv, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - start
+
+
+def imported_modules(args, cwd):
+    """Return the names of the modules imported by `main.py args`, using -X importtime."""
+    result = subprocess.run([sys.executable, "-X", "importtime", MAIN_SCRIPT] + args,
+                            cwd=cwd, capture_output=True, text=True, check=False)
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            name = line.rsplit("|", 1)[1].strip()
+            modules.add(name)
+    return modules
+
+
+def measure_startup(runs=7, cwd=None):
+    """
+    Measure wall-clock startup of read-only commands.
+    
+    Returns a dictionary per command with the median run time, the overhead
+    over a bare interpreter start and any heavy or pipeline modules that were imported.
+    """
+    own_dir = cwd is None
+    cwd = cwd or tempfile.mkdtemp(prefix="whatscrypto-startup-")
+    try:
+        # First run creates the default config and data directories
+        _time_command([sys.executable, MAIN_SCRIPT, "--show-analysis"], cwd)
+        interpreter = statistics.median(_time_command([sys.executable, "-c", "pass"], cwd) for _ in range(runs))
+        
+        results = {"interpreter_ms": interpreter * 1000, "commands": {}}
+        for args in READ_ONLY_COMMANDS:
+            median = statistics.median(_time_command([sys.executable, MAIN_SCRIPT] + args, cwd) for _ in range(runs))
+            modules = imported_modules(args, cwd)
+            heavy = sorted({name.split(".")[0] for name in modules} & set(HEAVY_MODULES))
+            heavy += sorted(modules & set(PIPELINE_MODULES))
+            results["commands"][" ".join(args)] = {
+                "median_ms": median * 1000,
+                "overhead_ms": (median - interpreter) * 1000,
+                "heavy_imports": heavy
+            }
+        return results
+    finally:
+        if own_dir:
+            shutil.rmtree(cwd, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup-time benchmark for read-only CLI commands")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=100,
+                        help="Maximum startup overhead over a bare interpreter (default: 100)")
+    args = parser.parse_args(argv)
+    
+    results = measure_startup(args.runs)
+    logger.info(f"Bare interpreter: {results['interpreter_ms']:.1f} ms")
+    failed = False
+    for command, stats in results["commands"].items():
+        logger.info(f"main.py {command}: {stats['median_ms']:.1f} ms "
+                    f"({stats['overhead_ms']:.1f} ms over interpreter)")
+        if stats["heavy_imports"]:
+            logger.error(f"main.py {command} imports modules it doesn't need: {', '.join(stats['heavy_imports'])}")
+            failed = True
+        if stats["overhead_ms"] > args.budget_ms:
+            logger.error(f"main.py {command} exceeds the {args.budget_ms:.0f} ms budget")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
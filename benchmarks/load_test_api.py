@@ -0,0 +1,212 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.stub_server import StubApiServer, load_corpus, DEFAULT_CORPUS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+# Request mix cycled by every client connection
+DEFAULT_PATHS = [
+    "/news",
+    "/news?limit=20&coin=bitcoin",
+    "/analyses/latest",
+    "/coins/ethereum",
+    "/search?q=bitcoin&limit=20",
+]
+
+
+class LoadStats:
+    """Latency samples and status codes per path."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = Counter()
+        self.errors = 0
+
+    def record(self, path, status, seconds):
+        self.latencies.setdefault(path, []).append(seconds)
+        self.statuses[status] += 1
+
+    def summary(self, elapsed):
+        def percentiles(samples):
+            samples = sorted(samples)
+            return {
+                "requests": len(samples),
+                "p50_ms": statistics.median(samples) * 1000,
+                "p95_ms": samples[int(len(samples) * 0.95)] * 1000,
+                "p99_ms": samples[int(len(samples) * 0.99)] * 1000,
+            }
+        all_samples = [sample for samples in self.latencies.values() for sample in samples]
+        if not all_samples:
+            return {"requests": 0, "errors": self.errors}
+        return dict(percentiles(all_samples),
+                    requests_per_second=len(all_samples) / elapsed,
+                    duration_s=elapsed,
+                    errors=self.errors,
+                    statuses={str(status): count for status, count in sorted(self.statuses.items())},
+                    paths={path: percentiles(samples) for path, samples in self.latencies.items()})
+
+
+async def _client(host, port, paths, offset, deadline, revalidate, stats):
+    """One keep-alive connection sending requests back to back until the deadline."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats.errors += 1
+        return
+    etags = {}
+    index = offset
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if revalidate and path in etags:
+                request += f"If-None-Match: {etags[path]}\r\n"
+            start = time.perf_counter()
+            writer.write((request + "\r\n").encode("latin-1"))
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+            headers = {}
+            for line in head[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length:
+                await reader.readexactly(length)
+            stats.record(path, int(head[0].split(" ")[1]), time.perf_counter() - start)
+            if "etag" in headers:
+                etags[path] = headers["etag"]
+    except (asyncio.IncompleteReadError, ConnectionError) as e:
+        logger.error(f"Connection failed: {e}")
+        stats.errors += 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, paths=None, concurrency=32, duration=10.0, revalidate=False):
+    """
+    Drive the API with `concurrency` keep-alive connections for `duration` seconds.
+
+    Returns:
+        Dictionary with requests/second, latency percentiles overall and per
+        path, and the count of each status code
+    """
+    paths = paths or DEFAULT_PATHS
+    stats = LoadStats()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_client(host, port, paths, offset, deadline, revalidate, stats)
+                           for offset in range(concurrency)))
+    return stats.summary(time.perf_counter() - start)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"API server did not listen on port {port} within {timeout}s")
+
+
+def prepare_database(work_dir, corpus=DEFAULT_CORPUS, copies=50):
+    """
+    Fill a scratch database from the replay corpus: `copies` copies of every
+    fetched item (with distinct urls), indexed by coin, plus one analysis.
+    Writes config/api_config.json under work_dir and returns its path.
+    """
+    from benchmarks.run_benchmarks import BenchmarkContext
+    from src.storage.coin_index import CoinIndexer
+
+    with StubApiServer(corpus=load_corpus(corpus)) as stub:
+        ctx = BenchmarkContext(stub, work_dir)
+        for copy in range(copies):
+            ctx.db.save_news([dict(item, url=f"{item['url']}?copy={copy}") for item in ctx.news_items])
+        CoinIndexer(ctx.config_path, db=ctx.db).index_pending()
+        ctx.analyzer.analyze_recent_news(ctx.db, limit=50)
+
+    config_path = os.path.join(work_dir, "config", "api_config.json")
+    os.makedirs(os.path.dirname(config_path), exist_ok=True)
+    shutil.copy(ctx.config_path, config_path)
+    return config_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the read-only HTTP API and report requests/second")
+    parser.add_argument("--url", help="Base URL of a running API, e.g. http://127.0.0.1:8080 "
+                                      "(default: start one on a scratch database filled from the corpus)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Keep-alive connections (default: 32)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (default: 10)")
+    parser.add_argument("--path", action="append", help="Request path to cycle through (repeatable)")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="Send If-None-Match with the last ETag per path, measuring 304 responses")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Glob of archived news JSON files for the scratch database")
+    parser.add_argument("--copies", type=int, default=50, help="Copies of the corpus in the scratch database (default: 50)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    work_dir, server = None, None
+    try:
+        if args.url:
+            host_port = args.url.split("://", 1)[-1].rstrip("/")
+            host, _, port = host_port.partition(":")
+            port = int(port or 80)
+        else:
+            work_dir = tempfile.mkdtemp(prefix="whatscrypto-api-load-")
+            prepare_database(work_dir, corpus=args.corpus, copies=args.copies)
+            host, port = "127.0.0.1", _free_port()
+            # A separate process, so client and server don't share one interpreter lock
+            server = subprocess.Popen([sys.executable, MAIN_SCRIPT, "--serve-api", str(port)], cwd=work_dir,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            _wait_for_port(port, server)
+
+        results = asyncio.run(run_load(host, port, paths=args.path, concurrency=args.concurrency,
+                                       duration=args.duration, revalidate=args.revalidate))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    logger.info(f"{results['requests']} requests, {results.get('requests_per_second', 0):.0f} req/s, "
+                f"p50 {results.get('p50_ms', 0):.2f} ms, p99 {results.get('p99_ms', 0):.2f} ms, "
+                f"statuses {results.get('statuses', {})}, errors {results['errors']}")
+    for path, summary in results.get("paths", {}).items():
+        logger.info(f"  {path}: {summary['requests']} requests, p50 {summary['p50_ms']:.2f} ms, "
+                    f"p95 {summary['p95_ms']:.2f} ms")
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if results["errors"] or not results["requests"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,382 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.stub_server import StubApiServer, load_corpus, DEFAULT_CORPUS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = "benchmarks/results/latest.json"
+DEFAULT_BASELINE = "benchmarks/results/baseline.json"
+BACKENDS = ("sqlite", "sqlalchemy")
+COINS = ["bitcoin", "ethereum", "ripple", "cardano", "solana"]
+
+# Registered scenarios in execution order: name -> function(ctx) returning the number of items processed
+SCENARIOS = {}
+
+
+def scenario(name, setup=None, sqlite_only=False):
+    """Register a scenario; `setup(ctx)` runs untimed before every iteration.
+
+    Scenarios marked `sqlite_only` need the coin mention index, which only the
+    SQLite backend has, and are skipped on other backends.
+    """
+    def register(func):
+        func.setup = setup
+        func.sqlite_only = sqlite_only
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def _output_path(path, backend):
+    """Keep results of different backends apart, e.g. baseline.json -> baseline_sqlalchemy.json"""
+    if backend == "sqlite":
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}_{backend}{ext}"
+
+
+class BenchmarkContext:
+    """Pipeline components wired to the stub server and a throwaway data directory."""
+
+    def __init__(self, stub, work_dir, config_overrides=None):
+        from src.data_collection.news_fetcher import NewsFetcher
+        from src.storage.database import NewsDatabase
+        from src.analysis.llm_analyzer import LLMAnalyzer
+        from src.analysis.report_generator import ReportGenerator
+        
+        self.work_dir = work_dir
+        config = stub.config(db_path=os.path.join(work_dir, "crypto_news.db"))
+        for section, values in (config_overrides or {}).items():
+            config.setdefault(section, {}).update(values)
+        self.config_path = os.path.join(work_dir, "api_config.json")
+        with open(self.config_path, "w") as f:
+            json.dump(config, f, indent=2)
+        
+        self.fetcher = NewsFetcher(self.config_path)
+        self.db = NewsDatabase(self.config_path)
+        self.analyzer = LLMAnalyzer(self.config_path)
+        self.report_generator = ReportGenerator(output_dir=os.path.join(work_dir, "reports"))
+        self.iteration = 0
+        self.news_items = self.fetcher.fetch_all_sources()
+        self.analysis_result = None
+
+
+@scenario("fetch_all_sources")
+def bench_fetch_all_sources(ctx):
+    return len(ctx.fetcher.fetch_all_sources())
+
+
+@scenario("fetch_by_coin")
+def bench_fetch_by_coin(ctx):
+    return len(ctx.fetcher.fetch_by_coin(COINS))
+
+
+@scenario("save_news")
+def bench_save_news(ctx):
+    # Unique URLs per iteration so every run measures real inserts, not dedup hits
+    items = [dict(item, url=f"{item['url']}?bench={ctx.iteration}") for item in ctx.news_items]
+    return ctx.db.save_news(items)
+
+
+@scenario("save_news_to_files")
+def bench_save_news_to_files(ctx):
+    return ctx.db.save_news_to_files(ctx.news_items, save_path=os.path.join(ctx.work_dir, "news_data"))
+
+
+@scenario("save_coin_updates")
+def bench_save_coin_updates(ctx):
+    return ctx.db.save_coin_updates(ctx.fetcher.fetch_by_coin(COINS))
+
+
+@scenario("coin_history")
+def bench_coin_history(ctx):
+    return sum(len(ctx.db.get_coin_history(coin)) for coin in COINS)
+
+
+@scenario("recent_news")
+def bench_recent_news(ctx):
+    return len(ctx.db.get_recent_news(100))
+
+
+@scenario("read_bodies")
+def bench_read_bodies(ctx):
+    # Touching record.body decompresses it when body compression is enabled
+    return sum(1 for record in ctx.db.iter_news(limit=500) if record.body is not None)
+
+
+def _add_unindexed_news(ctx):
+    ctx.db.save_news([dict(item, url=f"{item['url']}?index={ctx.iteration}") for item in ctx.news_items])
+
+
+@scenario("index_coins", setup=_add_unindexed_news, sqlite_only=True)
+def bench_index_coins(ctx):
+    from src.storage.coin_index import CoinIndexer
+    if not hasattr(ctx, "coin_indexer"):
+        ctx.coin_indexer = CoinIndexer(ctx.config_path, db=ctx.db)
+    return ctx.coin_indexer.index_pending()
+
+
+@scenario("coin_news", sqlite_only=True)
+def bench_coin_news(ctx):
+    return sum(len(list(ctx.db.iter_news(filters={'coin': coin}, limit=100))) for coin in COINS)
+
+
+@scenario("fetch_prices")
+def bench_fetch_prices(ctx):
+    from src.storage.price_store import PriceStore
+    # A fresh store per iteration, so every run backfills and appends full charts
+    store = PriceStore(ctx.config_path, db=ctx.db)
+    store.path = os.path.join(ctx.work_dir, f"prices_{ctx.iteration}")
+    return sum(store.ingest(COINS).values())
+
+
+def _prepare_price_returns(ctx):
+    from src.storage.coin_index import CoinIndexer
+    from src.storage.price_store import PriceStore
+    if not hasattr(ctx, "price_store"):
+        ctx.price_store = PriceStore(ctx.config_path, db=ctx.db)
+        ctx.price_store.ingest(COINS)
+    CoinIndexer(ctx.config_path, db=ctx.db).index_pending()
+
+
+@scenario("price_returns", setup=_prepare_price_returns, sqlite_only=True)
+def bench_price_returns(ctx):
+    return len(ctx.price_store.news_returns()["news_id"])
+
+
+def _add_unanalyzed_news(ctx):
+    # Fresh copies are unanalyzed on every backend, unlike resetting the flag with raw SQL
+    ctx.db.save_news([dict(item, url=f"{item['url']}?analyze={ctx.iteration}") for item in ctx.news_items])
+
+
+@scenario("analyze", setup=_add_unanalyzed_news)
+def bench_analyze(ctx):
+    ctx.analysis_result = ctx.analyzer.analyze_recent_news(ctx.db)
+    return 1
+
+
+@scenario("search_news")
+def bench_search_news(ctx):
+    return sum(len(ctx.db.search_news(coin, limit=50)) for coin in COINS)
+
+
+@scenario("render_reports")
+def bench_render_reports(ctx):
+    analysis = ctx.analysis_result or ctx.db.get_latest_analysis().get("analysis") or {}
+    ctx.report_generator.generate_html_report(analysis)
+    ctx.report_generator.generate_text_report(analysis)
+    return 2
+
+
+@scenario("cli_startup")
+def bench_cli_startup(ctx):
+    from benchmarks.bench_startup import MAIN_SCRIPT
+    cwd = os.path.join(ctx.work_dir, "cli")
+    os.makedirs(cwd, exist_ok=True)
+    subprocess.run([sys.executable, MAIN_SCRIPT, "--show-analysis"], cwd=cwd,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    return 1
+
+
+def _summarize(durations, items):
+    total = sum(durations)
+    ordered = sorted(durations)
+    return {
+        "iterations": len(durations),
+        "mean_s": statistics.mean(durations),
+        "p50_s": statistics.median(durations),
+        "p95_s": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "min_s": ordered[0],
+        "max_s": ordered[-1],
+        "items": sum(items),
+        "items_per_s": sum(items) / total if total > 0 else None
+    }
+
+
+def _storage_stats(ctx):
+    """Database file size and stored vs. decompressed body bytes after the run."""
+    conn = ctx.db._get_connection()
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        rows, compressed, stored, text = conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(typeof(body) = 'blob'), 0), COALESCE(SUM(length(body)), 0),
+                   COALESCE(SUM(length(CAST(news_body(body) AS BLOB))), 0)
+            FROM news
+        """).fetchone()
+    finally:
+        conn.close()
+    return {
+        "db_bytes": os.path.getsize(ctx.db.db_path),
+        "news_rows": rows,
+        "compressed_bodies": compressed,
+        "body_bytes": stored,
+        "body_text_bytes": text,
+        "body_ratio": stored / text if text else None
+    }
+
+
+def run_benchmarks(iterations=5, warmup=1, names=None, corpus=DEFAULT_CORPUS, latency_ms=0,
+                   error_rate=0.0, rate_limit_rate=0.0, seed=42, config_overrides=None,
+                   backend="sqlite", db_url=None, body_chars=0, compress_bodies=False):
+    """Run the selected scenarios against the stub server and return a results dictionary.
+
+    With backend="sqlalchemy" the store is `db_url`, or a SQLite file accessed
+    through SQLAlchemy when no URL is given. `compress_bodies` stores bodies
+    zlib-compressed with a dictionary trained on the corpus; compare a run with
+    and without it to see the size and read-latency trade-off.
+    """
+    work_dir = tempfile.mkdtemp(prefix="whatscrypto-bench-")
+    names = names or list(SCENARIOS)
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "settings": {
+            "iterations": iterations, "warmup": warmup, "latency_ms": latency_ms,
+            "error_rate": error_rate, "rate_limit_rate": rate_limit_rate, "seed": seed,
+            "backend": backend, "config_overrides": config_overrides or {},
+            "body_chars": body_chars, "compress_bodies": compress_bodies
+        },
+        "scenarios": {}
+    }
+    
+    if backend != "sqlite":
+        skipped = [name for name in names if SCENARIOS[name].sqlite_only]
+        if skipped:
+            logger.info(f"Skipping SQLite-only scenarios on {backend}: {', '.join(skipped)}")
+        names = [name for name in names if name not in skipped]
+        config_overrides = dict(config_overrides or {})
+        config_overrides["data_storage"] = dict(config_overrides.get("data_storage", {}), type=backend,
+                                                url=db_url or f"sqlite:///{os.path.join(work_dir, 'crypto_news.db')}")
+    elif compress_bodies:
+        config_overrides = dict(config_overrides or {})
+        config_overrides["body_compression"] = dict(config_overrides.get("body_compression", {}), enabled=True)
+    
+    try:
+        with StubApiServer(load_corpus(corpus), latency_ms=latency_ms, error_rate=error_rate,
+                           rate_limit_rate=rate_limit_rate, seed=seed, body_chars=body_chars) as stub:
+            ctx = BenchmarkContext(stub, work_dir, config_overrides)
+            if backend == "sqlite" and compress_bodies:
+                from src.storage.body_codec import train_dictionary
+                settings = ctx.db.body_compression
+                ctx.db.save_body_dictionary(train_dictionary([item.get("body", "") for item in ctx.news_items],
+                                                             settings["dict_size"]))
+            for name in names:
+                func = SCENARIOS[name]
+                durations, items = [], []
+                for i in range(warmup + iterations):
+                    ctx.iteration += 1
+                    if func.setup:
+                        func.setup(ctx)
+                    start = time.perf_counter()
+                    count = func(ctx)
+                    elapsed = time.perf_counter() - start
+                    if i >= warmup:
+                        durations.append(elapsed)
+                        items.append(count or 0)
+                results["scenarios"][name] = _summarize(durations, items)
+                logger.info(f"{name}: p50 {results['scenarios'][name]['p50_s'] * 1000:.2f} ms")
+            if backend == "sqlite":
+                results["storage"] = _storage_stats(ctx)
+                logger.info(f"Storage: {results['storage']}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=0.25, min_delta_s=0.002):
+    """Return regressions where p50 latency grew more than `tolerance` over the baseline.
+
+    Differences below `min_delta_s` are ignored so sub-millisecond scenarios
+    don't fail on timer noise.
+    """
+    regressions = []
+    for name, current in results.get("scenarios", {}).items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        limit = previous["p50_s"] * (1 + tolerance)
+        if current["p50_s"] > limit and current["p50_s"] - previous["p50_s"] > min_delta_s:
+            regressions.append({
+                "scenario": name,
+                "baseline_p50_s": previous["p50_s"],
+                "current_p50_s": current["p50_s"],
+                "ratio": current["p50_s"] / previous["p50_s"] if previous["p50_s"] else None
+            })
+    return regressions
+
+
+def _write_json(path, data):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks against a local API stub")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Glob of archived news JSON files to replay")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Injected stub latency per request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of stub requests answered with 429")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--backend", choices=BACKENDS, default="sqlite", help="Storage backend (default: sqlite)")
+    parser.add_argument("--db-url", help="SQLAlchemy URL of an empty scratch database for --backend sqlalchemy")
+    parser.add_argument("--body-chars", type=int, default=0,
+                        help="Give corpus items without a body one of about this many characters (default: 0)")
+    parser.add_argument("--compress-bodies", action="store_true",
+                        help="Store article bodies compressed (SQLite), to compare size and read latency")
+    parser.add_argument("--output", help=f"Results file (default: {DEFAULT_OUTPUT}, suffixed by non-sqlite backends)")
+    parser.add_argument("--baseline", help=f"Baseline to compare to (default: {DEFAULT_BASELINE}, suffixed likewise)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown before failing (default: 0.25)")
+    args = parser.parse_args(argv)
+    args.output = args.output or _output_path(DEFAULT_OUTPUT, args.backend)
+    args.baseline = args.baseline or _output_path(DEFAULT_BASELINE, args.backend)
+    
+    results = run_benchmarks(iterations=args.iterations, warmup=args.warmup, names=args.scenario,
+                             corpus=args.corpus, latency_ms=args.latency_ms, error_rate=args.error_rate,
+                             rate_limit_rate=args.rate_limit_rate, seed=args.seed,
+                             backend=args.backend, db_url=args.db_url, body_chars=args.body_chars,
+                             compress_bodies=args.compress_bodies)
+    _write_json(args.output, results)
+    logger.info(f"Results written to {args.output}")
+    
+    if args.save_baseline:
+        _write_json(args.baseline, results)
+        logger.info(f"Baseline saved to {args.baseline}")
+        return 0
+    
+    if not os.path.exists(args.baseline):
+        logger.info("No baseline found; run with --save-baseline to record one")
+        return 0
+    
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for regression in regressions:
+        logger.error(f"Regression in {regression['scenario']}: p50 {regression['baseline_p50_s'] * 1000:.2f} ms "
+                     f"-> {regression['current_p50_s'] * 1000:.2f} ms")
+    if not regressions:
+        logger.info("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
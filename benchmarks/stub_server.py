@@ -0,0 +1,324 @@
+import argparse
+import glob
+import json
+import logging
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CORPUS = "data/news_data/*.json"
+
+# (id, symbol, name) served by /coingecko/api/v3/coins/markets, largest market cap first
+STUB_COINS = [
+    ("bitcoin", "btc", "Bitcoin"), ("ethereum", "eth", "Ethereum"), ("tether", "usdt", "Tether"),
+    ("binancecoin", "bnb", "BNB"), ("solana", "sol", "Solana"), ("ripple", "xrp", "XRP"),
+    ("usd-coin", "usdc", "USDC"), ("dogecoin", "doge", "Dogecoin"), ("cardano", "ada", "Cardano"),
+    ("tron", "trx", "TRON"), ("avalanche-2", "avax", "Avalanche"), ("chainlink", "link", "Chainlink"),
+    ("polkadot", "dot", "Polkadot"), ("litecoin", "ltc", "Litecoin"), ("shiba-inu", "shib", "Shiba Inu"),
+    ("bitcoin-cash", "bch", "Bitcoin Cash"), ("uniswap", "uni", "Uniswap"), ("pepe", "pepe", "Pepe"),
+]
+
+
+def _to_epoch(value):
+    if isinstance(value, (int, float)):
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp())
+    except ValueError:
+        return int(time.time())
+
+
+def load_corpus(pattern=DEFAULT_CORPUS):
+    """Load archived news items (NewsFetcher schema) used as the replay corpus."""
+    items = []
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        try:
+            with open(path, "r") as f:
+                items.append(json.load(f))
+        except Exception as e:
+            logger.error(f"Skipping unreadable corpus file {path}: {e}")
+    logger.info(f"Loaded {len(items)} corpus items")
+    return items
+
+
+class StubApiServer:
+    """Local HTTP server replaying recorded payloads for every external API.
+
+    Routes mirror the real services under a per-provider prefix:
+    /cryptocompare/data/v2/news/, /cryptopanic/api/v1/posts/,
+    /coingecko/api/v3/coins/<id>, /coingecko/api/v3/coins/<id>/market_chart,
+    /coingecko/api/v3/coins/markets and /openai/v1/chat/completions.
+
+    Latency, server errors and 429 rate-limit responses are injected with the
+    configured probabilities using a seeded RNG, so runs are reproducible.
+    Corpus items without a body get one of about `body_chars` characters made
+    of other corpus headlines, since archived items often have empty bodies.
+    """
+
+    def __init__(self, corpus=None, host="127.0.0.1", port=0, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, rate_limit_rate=0.0, seed=42, body_chars=0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.request_count = 0
+        self._server = None
+        self._thread = None
+        self.body_chars = body_chars
+        self._load_payloads(corpus if corpus is not None else load_corpus())
+
+    def _load_payloads(self, corpus):
+        # Shift the corpus so the newest item is "now", keeping analysis windows populated
+        corpus = [item for item in corpus if item.get("url")]
+        timestamps = [_to_epoch(item.get("published_at")) for item in corpus]
+        shift = int(time.time()) - max(timestamps) if timestamps else 0
+        
+        titles = [item.get("title", "") for item in corpus if item.get("title")]
+        self.cryptocompare_items = []
+        self.cryptopanic_items = []
+        for index, (item, ts) in enumerate(zip(corpus, timestamps)):
+            published = ts + shift
+            codes = [code.strip() for code in str(item.get("categories", "")).split(",") if code.strip()]
+            self.cryptocompare_items.append({
+                "id": str(index),
+                "published_on": published,
+                "title": item.get("title", ""),
+                "url": f"{item['url']}#cc",
+                "body": item.get("body") or self._body(index, item.get("title", ""), titles),
+                "source": item.get("source_name", ""),
+                "categories": "|".join(codes)
+            })
+            self.cryptopanic_items.append({
+                "kind": "news",
+                "title": item.get("title", ""),
+                "published_at": datetime.fromtimestamp(published, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "url": item["url"],
+                "source": {"title": item.get("source_name", "")},
+                "currencies": [{"code": code, "title": code} for code in codes]
+            })
+        self.cryptocompare_items.sort(key=lambda i: i["published_on"], reverse=True)
+        self.cryptopanic_items.sort(key=lambda i: i["published_at"], reverse=True)
+
+    def _body(self, index, title, titles):
+        """Deterministic stand-in body: the headline followed by the next headlines of the corpus"""
+        sentences = [title]
+        length = len(title)
+        offset = index + 1
+        while titles and length < self.body_chars:
+            sentences.append(titles[offset % len(titles)])
+            length += len(sentences[-1]) + 2
+            offset += 1
+        return ". ".join(sentences)
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def config(self, db_path="data/crypto_news.db"):
+        """Return an api_config dictionary pointing every client at this stub."""
+        return {
+            "cryptocompare": {"base_url": f"{self.base_url}/cryptocompare/data/v2/news/", "api_key": "stub"},
+            "cryptopanic": {"base_url": f"{self.base_url}/cryptopanic/api/v1/posts/", "api_key": "stub"},
+            "coingecko": {"base_url": f"{self.base_url}/coingecko/api/v3/"},
+            "openai": {"base_url": f"{self.base_url}/openai/v1/", "api_key": "stub", "model": "gpt-4o-mini"},
+            "data_storage": {"type": "sqlite", "path": db_path}
+        }
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self, None)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                stub._handle(self, body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-api", daemon=True)
+        self._thread.start()
+        logger.info(f"Stub API server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _roll(self):
+        with self._random_lock:
+            self.request_count += 1
+            delay = max(0.0, self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            return delay, self._random.random(), self._random.random()
+
+    def _handle(self, handler, body):
+        delay, error_roll, limit_roll = self._roll()
+        if delay:
+            time.sleep(delay)
+        if limit_roll < self.rate_limit_rate:
+            return self._send(handler, 429, {"error": "rate limited"}, {"Retry-After": "1"})
+        if error_roll < self.error_rate:
+            return self._send(handler, 500, {"error": "injected failure"})
+        
+        url = urlparse(handler.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = re.sub(r"/+", "/", url.path)
+        
+        if path.startswith("/cryptocompare/data/v2/news"):
+            return self._send(handler, 200, self._cryptocompare(params))
+        if path.startswith("/cryptopanic/api/v1/posts"):
+            posts = self._cryptopanic(params)
+            if posts is None:
+                # Like the real API, pages past the last one are a 404
+                return self._send(handler, 404, {"detail": "Invalid page."})
+            return self._send(handler, 200, posts)
+        if re.match(r"^/coingecko/api/v3/coins/markets/?$", path):
+            return self._send(handler, 200, self._coingecko_markets(params))
+        match = re.match(r"^/coingecko/api/v3/coins/([^/]+)/market_chart/?$", path)
+        if match:
+            return self._send(handler, 200, self._coingecko_market_chart(match.group(1), params))
+        match = re.match(r"^/coingecko/api/v3/coins/([^/]+)/?$", path)
+        if match:
+            return self._send(handler, 200, self._coingecko_coin(match.group(1)))
+        if path.startswith("/openai/v1/chat/completions"):
+            return self._send(handler, 200, self._openai(body))
+        return self._send(handler, 404, {"error": f"no stub for {path}"})
+
+    def _send(self, handler, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _cryptocompare(self, params):
+        limit = int(params.get("limit", 50))
+        items = self.cryptocompare_items
+        if "lTs" in params:
+            before = int(params["lTs"])
+            items = [item for item in items if item["published_on"] < before]
+        return {"Type": 100, "Message": "News list successfully returned", "Data": items[:limit]}
+
+    def _cryptopanic(self, params):
+        limit = int(params.get("limit", 50))
+        page = int(params.get("page", 1))
+        start = (page - 1) * limit
+        results = self.cryptopanic_items[start:start + limit]
+        if page > 1 and not results:
+            return None
+        has_next = start + limit < len(self.cryptopanic_items)
+        return {
+            "count": len(self.cryptopanic_items),
+            "next": f"{self.base_url}/cryptopanic/api/v1/posts/?page={page + 1}" if has_next else None,
+            "results": results
+        }
+
+    def _coingecko_markets(self, params):
+        per_page = int(params.get("per_page", 100))
+        page = int(params.get("page", 1))
+        start = (page - 1) * per_page
+        return [{"id": coin_id, "symbol": symbol, "name": name, "market_cap_rank": rank}
+                for rank, (coin_id, symbol, name) in enumerate(STUB_COINS[start:start + per_page], start + 1)]
+
+    def _coingecko_coin(self, coin_id):
+        return {
+            "id": coin_id,
+            "name": coin_id.capitalize(),
+            "description": {"en": f"{coin_id.capitalize()} is a cryptocurrency. " * 40},
+            "links": {"homepage": [f"https://{coin_id}.example.org"], "blockchain_site": []},
+            "last_updated": datetime.now(timezone.utc).isoformat()
+        }
+
+    def _coingecko_market_chart(self, coin_id, params):
+        # Deterministic in (coin, timestamp), so overlapping fetches return the same samples
+        days = float(params.get("days", 1))
+        step = 300 if days <= 1 else 3600 if days <= 90 else 86400
+        end = int(time.time()) // step * step
+        base = 10 + zlib.crc32(coin_id.encode()) % 50000
+        prices, market_caps, volumes = [], [], []
+        for ts in range(end - int(days * 86400), end + 1, step):
+            noise = (zlib.crc32(f"{coin_id}:{ts}".encode()) % 1000) / 1000 - 0.5
+            price = base * (1 + 0.08 * math.sin(ts / 604800 * 2 * math.pi) + 0.02 * math.sin(ts / 21600) + 0.005 * noise)
+            prices.append([ts * 1000, price])
+            market_caps.append([ts * 1000, price * 1e7])
+            volumes.append([ts * 1000, price * 1e5 * (1.5 + noise)])
+        return {"prices": prices, "market_caps": market_caps, "total_volumes": volumes}
+
+    def _openai(self, body):
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            request = {}
+        prompt_chars = sum(len(m.get("content", "")) for m in request.get("messages", []))
+        analysis = {
+            "summary": "Stubbed analysis of the provided news items.",
+            "market_indicators": ["Indicator A", "Indicator B"],
+            "significant_events": ["Event A"],
+            "sentiment": "neutral - stub response",
+            "trends": ["Trend A"],
+            "opportunities_and_risks": {"opportunities": ["Opportunity A"], "risks": ["Risk A"]},
+            "key_coins": {"BTC": "Stub analysis for BTC"}
+        }
+        content = json.dumps(analysis)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_chars // 4 + len(content) // 4
+            }
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub for CryptoCompare, CryptoPanic, CoinGecko and OpenAI")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Glob of archived news JSON files")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    
+    server = StubApiServer(load_corpus(args.corpus), port=args.port, latency_ms=args.latency_ms,
+                           jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                           rate_limit_rate=args.rate_limit_rate, seed=args.seed).start()
+    print(json.dumps(server.config(), indent=2))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
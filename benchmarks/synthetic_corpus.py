@@ -0,0 +1,523 @@
+import argparse
+import bisect
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from src.data_collection.news_fetcher import normalize_cryptocompare_item, normalize_cryptopanic_item
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Coins in market-cap order; mentions follow a Zipf distribution over this list
+COINS = [
+    ("bitcoin", "BTC", "Bitcoin"), ("ethereum", "ETH", "Ethereum"), ("tether", "USDT", "Tether"),
+    ("binancecoin", "BNB", "BNB"), ("solana", "SOL", "Solana"), ("ripple", "XRP", "XRP"),
+    ("usd-coin", "USDC", "USDC"), ("dogecoin", "DOGE", "Dogecoin"), ("cardano", "ADA", "Cardano"),
+    ("tron", "TRX", "TRON"), ("avalanche-2", "AVAX", "Avalanche"), ("chainlink", "LINK", "Chainlink"),
+    ("polkadot", "DOT", "Polkadot"), ("litecoin", "LTC", "Litecoin"), ("shiba-inu", "SHIB", "Shiba Inu"),
+    ("bitcoin-cash", "BCH", "Bitcoin Cash"), ("stellar", "XLM", "Stellar"), ("uniswap", "UNI", "Uniswap"),
+    ("near", "NEAR", "NEAR Protocol"), ("aptos", "APT", "Aptos"), ("sui", "SUI", "Sui"),
+    ("pepe", "PEPE", "Pepe"), ("internet-computer", "ICP", "Internet Computer"),
+    ("ethereum-classic", "ETC", "Ethereum Classic"), ("monero", "XMR", "Monero"), ("aave", "AAVE", "Aave"),
+    ("arbitrum", "ARB", "Arbitrum"), ("optimism", "OP", "Optimism"), ("filecoin", "FIL", "Filecoin"),
+    ("cosmos", "ATOM", "Cosmos Hub"), ("hedera-hashgraph", "HBAR", "Hedera"), ("injective-protocol", "INJ", "Injective"),
+    ("render-token", "RNDR", "Render"), ("the-graph", "GRT", "The Graph"), ("algorand", "ALGO", "Algorand"),
+    ("fantom", "FTM", "Fantom"), ("maker", "MKR", "Maker"), ("kaspa", "KAS", "Kaspa"),
+    ("celestia", "TIA", "Celestia"), ("worldcoin-wld", "WLD", "Worldcoin"),
+]
+
+OUTLETS = [
+    ("CoinDesk", "coindesk.com"), ("Cointelegraph", "cointelegraph.com"), ("The Block", "theblock.co"),
+    ("Decrypt", "decrypt.co"), ("NewsBTC", "newsbtc.com"), ("Bitcoinist", "bitcoinist.com"),
+    ("CryptoSlate", "cryptoslate.com"), ("U.Today", "u.today"), ("CryptoPotato", "cryptopotato.com"),
+    ("Blockworks", "blockworks.co"), ("BeInCrypto", "beincrypto.com"), ("The Daily Hodl", "dailyhodl.com"),
+]
+
+CATEGORIES = ["Trading", "Market", "Regulation", "Exchange", "Mining", "Technology", "Business", "Altcoin"]
+
+# Interchangeable words; near-duplicate headlines swap them like different outlets do
+SYNONYMS = [
+    ["surges", "jumps", "rallies", "soars", "climbs"],
+    ["drops", "slides", "falls", "tumbles", "sinks"],
+    ["analysts", "traders", "experts", "strategists"],
+    ["whales", "large holders", "big investors"],
+    ["amid", "as", "following"],
+    ["rally", "breakout", "run-up"],
+]
+_SYNONYM_OF = {word: group for group in SYNONYMS for word in group}
+
+TITLE_TEMPLATES = [
+    "{name} ({symbol}) surges {pct}% amid {catalyst}",
+    "{name} price drops {pct}% as {catalyst}",
+    "{symbol} breaks ${price} as analysts eye further rally",
+    "Whales move {amount} {symbol} to {exchange} amid {catalyst}",
+    "{exchange} lists {name}; {symbol} jumps {pct}%",
+    "{name} {event}: what it means for {symbol} holders",
+    "Why {name} traders expect volatility after {catalyst}",
+    "{name} and {other} lead market as {catalyst}",
+    "Crypto market slides as {catalyst}",
+    "Analysts say {name} could retest ${price} {horizon}",
+]
+
+SENTENCE_TEMPLATES = [
+    "{name} traded at ${price} at the time of writing, {direction} {pct}% over the past 24 hours.",
+    "Data from {exchange} shows trading volume for {symbol} reached ${volume} billion.",
+    "According to on-chain data, whales moved {amount} {symbol} in the last week.",
+    "Analysts at {outlet} noted that {catalyst} weighed on the broader market.",
+    "The move comes as {catalyst}, according to market participants.",
+    "Open interest in {symbol} futures rose to ${volume} billion, the highest level {horizon}.",
+    "{other} also {direction} {pct}%, while the total crypto market cap stood at ${cap} trillion.",
+    "Developers said the {event} is scheduled to go live {horizon}.",
+    "Some traders warned that resistance near ${price} could cap further gains.",
+    "Funding rates remained positive, suggesting that leveraged longs still dominate.",
+]
+
+# Follow-up clauses naming the story's own organisations, which set otherwise similar headlines apart
+TITLE_SUFFIXES = [" after {entity} deal", " as {entity} expands", ", {entity} says", " following {entity} report",
+                  "; {entity} and {partner} respond", " - {entity} data"]
+ENTITY_SENTENCES = [
+    "{entity} said it had reached an agreement with {partner} to support {symbol}.",
+    "A spokesperson for {entity} declined to comment on the {event}.",
+    "{partner} disclosed a position in {name} in a filing published on {weekday}.",
+    "{entity} expects the {event} to bring new users to {name}, the company said.",
+]
+ENTITY_SYLLABLES = ["vel", "tra", "xon", "mir", "lu", "dex", "qua", "ren", "zo", "fi", "nor", "ka", "bel", "ix",
+                    "sol", "tor", "ami", "gen", "pha", "ro", "cy", "dra", "ul", "vex", "sen", "ta", "om", "bri"]
+ENTITY_KINDS = ["Labs", "Capital", "Finance", "Protocol", "Research", "Ventures", "Markets", "Group"]
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+CATALYSTS = ["ETF inflows accelerate", "the Fed holds rates steady", "regulators tighten rules",
+             "a major exchange outage", "institutional demand grows", "inflation data surprises",
+             "a large token unlock", "the SEC delays a decision", "stablecoin supply expands",
+             "miners sell reserves", "a network upgrade nears", "liquidations hit $500 million"]
+EVENTS = ["network upgrade", "mainnet launch", "token unlock", "hard fork", "staking update", "ETF filing"]
+EXCHANGES = ["Binance", "Coinbase", "Kraken", "OKX", "Bybit", "Bitfinex"]
+HORIZONS = ["this week", "this month", "by the end of the quarter", "in the coming days", "since March"]
+
+
+def _zipf_cum_weights(count, skew):
+    weights = [1 / (rank ** skew) for rank in range(1, count + 1)]
+    return list(itertools.accumulate(weights))
+
+
+class Story:
+    """An event as reported once; near-duplicates re-report it with different words."""
+
+    __slots__ = ("title", "sentences", "coins", "categories", "ts")
+
+    def __init__(self, title, sentences, coins, categories, ts):
+        self.title = title
+        self.sentences = sentences
+        self.coins = coins
+        self.categories = categories
+        self.ts = ts
+
+
+class SyntheticCorpus:
+    """Deterministic generator of news items in the exact NewsFetcher schema.
+
+    Items are raw CryptoCompare articles and CryptoPanic posts normalized with
+    the same functions the fetcher uses, published in time order across
+    `span_days` ending at `end_ts`. The corpus mixes the timestamp forms the
+    pipeline meets in practice (epoch ints and digit strings, ISO 8601 with
+    "Z", offsets, fractions or no zone), repeats items verbatim like
+    overlapping polls (`duplicate_rate`), re-reports recent stories from other
+    outlets with reworded headlines (`near_duplicate_rate`) and mentions coins
+    with a Zipf skew, so the top coins dominate as in real news.
+
+    The same seed, count and end_ts always produce the same items.
+    """
+
+    def __init__(self, count, seed=42, end_ts=None, span_days=30, cryptopanic_share=0.5,
+                 duplicate_rate=0.02, near_duplicate_rate=0.1, coin_skew=1.1, body_chars=1200):
+        self.count = count
+        self.seed = seed
+        self.end_ts = int(end_ts if end_ts is not None else time.time())
+        self.span = int(span_days * 86400)
+        self.cryptopanic_share = cryptopanic_share
+        self.duplicate_rate = duplicate_rate
+        self.near_duplicate_rate = near_duplicate_rate
+        self.body_chars = body_chars
+        self._coin_weights = _zipf_cum_weights(len(COINS), coin_skew)
+        self._outlet_weights = _zipf_cum_weights(len(OUTLETS), 0.8)
+
+    def coin_list(self):
+        """The coins mentioned, as {'id', 'symbol', 'name'} dicts for NewsDatabase.save_coin_list."""
+        return [{"id": coin_id, "symbol": symbol.lower(), "name": name} for coin_id, symbol, name in COINS]
+
+    def _coin(self, rng):
+        return COINS[bisect.bisect_left(self._coin_weights, rng.random() * self._coin_weights[-1])]
+
+    def _outlet(self, rng):
+        return OUTLETS[bisect.bisect_left(self._outlet_weights, rng.random() * self._outlet_weights[-1])]
+
+    def _entity(self, rng):
+        name = "".join(rng.choice(ENTITY_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        return f"{name} {rng.choice(ENTITY_KINDS)}"
+
+    def _fields(self, rng, coin, other, entities):
+        return {
+            "entity": entities[0], "partner": entities[1], "weekday": rng.choice(WEEKDAYS),
+            "name": coin[2], "symbol": coin[1], "other": other[2],
+            "pct": f"{rng.uniform(0.5, 25):.1f}", "price": f"{rng.uniform(0.1, 100000):,.2f}",
+            "amount": f"{rng.randint(1, 900) * 1000:,}", "volume": f"{rng.uniform(0.1, 60):.1f}",
+            "cap": f"{rng.uniform(1.5, 4):.2f}", "catalyst": rng.choice(CATALYSTS), "event": rng.choice(EVENTS),
+            "exchange": rng.choice(EXCHANGES), "horizon": rng.choice(HORIZONS),
+            "direction": rng.choice(["up", "down"]), "outlet": self._outlet(rng)[0],
+        }
+
+    def _story(self, rng, ts):
+        coin = self._coin(rng)
+        other = self._coin(rng)
+        while other == coin:
+            other = self._coin(rng)
+        entities = (self._entity(rng), self._entity(rng))
+        fields = self._fields(rng, coin, other, entities)
+        title = (rng.choice(TITLE_TEMPLATES) + rng.choice(TITLE_SUFFIXES)).format(**fields)
+        sentences = [template.format(**fields) for template in rng.sample(ENTITY_SENTENCES, 2)]
+        length = sum(len(sentence) + 1 for sentence in sentences)
+        target = int(rng.lognormvariate(0, 0.5) * self.body_chars)
+        while length < target:
+            sentence = rng.choice(SENTENCE_TEMPLATES).format(**self._fields(rng, coin, other, entities))
+            sentences.append(sentence)
+            length += len(sentence) + 1
+        coins = [coin] if "{other}" not in title and rng.random() > 0.3 else [coin, other]
+        categories = [rng.choice(CATEGORIES)]
+        return Story(title, sentences, coins, categories, ts)
+
+    def _reword(self, rng, story, ts):
+        """Another outlet's version of `story`: synonyms swapped, numbers and body shuffled."""
+        words = []
+        for word in story.title.split(" "):
+            group = _SYNONYM_OF.get(word)
+            words.append(rng.choice(group) if group and rng.random() < 0.7 else word)
+        title = " ".join(words)
+        if rng.random() < 0.3:
+            title = f"{title} - report"
+        sentences = list(story.sentences)
+        rng.shuffle(sentences)
+        keep = max(1, int(len(sentences) * rng.uniform(0.6, 1.0)))
+        return Story(title, sentences[:keep], story.coins, story.categories, ts)
+
+    def _published_on(self, rng, ts):
+        # CryptoCompare sends epoch ints; archived items sometimes carry them as strings
+        return str(ts) if rng.random() < 0.05 else ts
+
+    def _published_at(self, rng, ts):
+        moment = datetime.fromtimestamp(ts, tz=timezone.utc)
+        form = rng.random()
+        if form < 0.8:
+            return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+        if form < 0.9:
+            return moment.isoformat()
+        if form < 0.95:
+            return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{rng.randint(0, 999999):06d}Z"
+        return moment.replace(tzinfo=None).isoformat()
+
+    def _raw(self, rng, index, story):
+        """Raw API payload of a story; returns (source, payload)."""
+        outlet, domain = self._outlet(rng)
+        slug = "-".join(re.findall(r"[a-z0-9]+", story.title.lower())[:8])
+        if rng.random() < self.cryptopanic_share:
+            return "cryptopanic", {
+                "kind": "news",
+                "title": story.title,
+                "published_at": self._published_at(rng, story.ts),
+                "url": f"https://cryptopanic.com/news/{20000000 + index}/{slug}",
+                "source": {"title": outlet, "domain": domain},
+                "currencies": [{"code": coin[1], "title": coin[2]} for coin in story.coins],
+            }
+        return "cryptocompare", {
+            "id": str(index),
+            "published_on": self._published_on(rng, story.ts),
+            "title": story.title,
+            "url": f"https://{domain}/news/{slug}-{index}",
+            "body": " ".join(story.sentences),
+            "source": outlet.lower().replace(" ", "_"),
+            "categories": "|".join([coin[1] for coin in story.coins] + story.categories),
+        }
+
+    def raw_items(self):
+        """Yield (source, raw API payload) pairs in publication order, duplicates included."""
+        rng = random.Random(self.seed)
+        recent_stories = deque(maxlen=500)
+        recent_items = deque(maxlen=2000)
+        start_ts = self.end_ts - self.span
+        for index in range(self.count):
+            ts = start_ts + self.span * index // max(self.count, 1) + rng.randint(0, 59)
+            roll = rng.random()
+            if roll < self.duplicate_rate and recent_items:
+                yield rng.choice(recent_items)
+                continue
+            if roll < self.duplicate_rate + self.near_duplicate_rate and recent_stories:
+                story = self._reword(rng, rng.choice(recent_stories), ts)
+            else:
+                story = self._story(rng, ts)
+                recent_stories.append(story)
+            item = self._raw(rng, index, story)
+            recent_items.append(item)
+            yield item
+
+    def items(self):
+        """Yield normalized items (the NewsFetcher dict schema) in publication order."""
+        for source, raw in self.raw_items():
+            ts = raw.get("published_on") or raw.get("published_at")
+            # Collected a few minutes after publication, as a polling collector would
+            collected_at = datetime.fromtimestamp(_epoch(ts) + 300, tz=timezone.utc).replace(tzinfo=None).isoformat()
+            normalize = normalize_cryptopanic_item if source == "cryptopanic" else normalize_cryptocompare_item
+            yield normalize(raw, collected_at)
+
+
+def _epoch(value):
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _paced(batches, rate):
+    """Yield batches no faster than `rate` items per second (unlimited if None)."""
+    start = time.perf_counter()
+    produced = 0
+    for batch in batches:
+        if rate:
+            ahead = start + produced / rate - time.perf_counter()
+            if ahead > 0:
+                time.sleep(ahead)
+        produced += len(batch)
+        yield batch
+
+
+class ArchiveWriter:
+    """Writes items into a JSON archive that `main.py --import-archive` reads.
+
+    "items" writes one normalized item per file, like NewsDatabase.save_news_to_files;
+    "batches" writes raw API responses ({"Data": [...]} / {"results": [...]}), one per batch.
+    Files go into one directory per publication day to keep directories small.
+    """
+
+    def __init__(self, root, layout="items"):
+        self.root = root
+        self.layout = layout
+        self.files = 0
+
+    def _path(self, day, name):
+        directory = os.path.join(self.root, day)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, name)
+
+    def write(self, batch):
+        if self.layout == "batches":
+            for source in ("cryptocompare", "cryptopanic"):
+                payloads = [raw for item_source, raw in batch if item_source == source]
+                if not payloads:
+                    continue
+                ts = payloads[0].get("published_on") or payloads[0].get("published_at")
+                day = datetime.fromtimestamp(_epoch(ts), tz=timezone.utc).strftime("%Y-%m-%d")
+                response = {"Data": payloads} if source == "cryptocompare" else {"results": payloads}
+                with open(self._path(day, f"{source}_{self.files:09d}.json"), "w") as f:
+                    json.dump(response, f)
+                self.files += 1
+            return len(batch)
+        for item in batch:
+            day = datetime.fromtimestamp(_epoch(item["published_at"]), tz=timezone.utc).strftime("%Y-%m-%d")
+            with open(self._path(day, f"{item['source']}_{self.files:09d}.json"), "w") as f:
+                json.dump(item, f, indent=2)
+            self.files += 1
+        return len(batch)
+
+
+def probe_queries(db, analyzer, coin_indexer, top_coin, tail_coin, newest_ts=None):
+    """Time the read paths on the current data: index, windowed reads, search and prompt preparation.
+
+    Analysis looks back from now; `newest_ts` (the latest publication time
+    ingested so far) stretches its window so a checkpoint halfway through an
+    older corpus still prepares the last 8 hours of what was ingested.
+    """
+    timings = {}
+    hours = 8
+    if newest_ts:
+        hours += max(0, time.time() - newest_ts) / 3600
+
+    def timed(name, func):
+        start = time.perf_counter()
+        result = func()
+        timings[f"{name}_ms"] = (time.perf_counter() - start) * 1000
+        return result
+
+    timed("index_coins", coin_indexer.index_pending)
+    timed("recent_news", lambda: db.get_recent_news(100))
+    timed("coin_news_top", lambda: list(db.iter_news(filters={"coin": top_coin}, limit=100)))
+    timed("coin_news_tail", lambda: list(db.iter_news(filters={"coin": tail_coin}, limit=100)))
+    timed("search_common", lambda: db.search_news("ETF inflows", limit=50))
+    timed("search_rare", lambda: db.search_news("quantum-resistant", limit=50))
+
+    def prepare_prompt():
+        records = analyzer._get_news_for_analysis(db, hours=hours, limit=100)
+        clusters = analyzer._cluster_news(db, records)
+        mentions = db.get_news_coins([record.id for record in records])
+        return analyzer._prepare_news_for_prompt(clusters, mentions)
+
+    prompt_items = timed("analysis_prep", prepare_prompt)
+    timings["prompt_items"] = len(prompt_items)
+    timings["prompt_chars"] = len(json.dumps(prompt_items, indent=2))
+    return timings
+
+
+def run_scaling(corpus, target="db", work_dir=None, rate=None, batch_size=500, checkpoints=10,
+                archive_layout="items", config_overrides=None):
+    """Stream `corpus` into a scratch database or JSON archive and measure how costs grow.
+
+    After every 1/`checkpoints` of the corpus the ingest rate so far is
+    recorded; for the database target also the file size and the read probes
+    of probe_queries.
+
+    Returns:
+        Dictionary with the settings and one entry per checkpoint
+    """
+    from src.storage.database import NewsDatabase
+
+    work_dir = work_dir or tempfile.mkdtemp(prefix="whatscrypto-synthetic-")
+    os.makedirs(work_dir, exist_ok=True)
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "settings": {"count": corpus.count, "seed": corpus.seed, "end_ts": corpus.end_ts, "target": target,
+                     "rate": rate, "batch_size": batch_size, "archive_layout": archive_layout,
+                     "config_overrides": config_overrides or {}},
+        "checkpoints": []
+    }
+
+    checkpoint_every = max(batch_size, corpus.count // max(checkpoints, 1))
+    if target == "archive":
+        writer = ArchiveWriter(os.path.join(work_dir, "news_data"), archive_layout)
+        stream = corpus.raw_items() if archive_layout == "batches" else corpus.items()
+        sink = writer.write
+    else:
+        from src.analysis.llm_analyzer import LLMAnalyzer
+        from src.storage.coin_index import CoinIndexer
+
+        config = {"data_storage": {"type": "sqlite", "path": os.path.join(work_dir, "crypto_news.db")}}
+        for section, values in (config_overrides or {}).items():
+            config.setdefault(section, {}).update(values)
+        config_path = os.path.join(work_dir, "api_config.json")
+        with open(config_path, "w") as f:
+            json.dump(config, f, indent=2)
+        db = NewsDatabase(config_path)
+        db.save_coin_list(corpus.coin_list())
+        db.set_state("coin_list_updated_at", datetime.now().isoformat())
+        analyzer = LLMAnalyzer(config_path)
+        coin_indexer = CoinIndexer(config_path, db=db)
+        stream = corpus.items()
+        sink = db.save_news
+
+    # Ingest logging per batch would drown the measurements
+    logging.getLogger("src.storage.database").setLevel(logging.WARNING)
+    start = time.perf_counter()
+    ingest_seconds = 0.0
+    generated = stored = 0
+    next_checkpoint = checkpoint_every
+    for batch in _paced(_batches(stream, batch_size), rate):
+        batch_start = time.perf_counter()
+        stored += sink(batch) or 0
+        ingest_seconds += time.perf_counter() - batch_start
+        generated += len(batch)
+        if generated < next_checkpoint and generated < corpus.count:
+            continue
+        next_checkpoint += checkpoint_every
+        checkpoint = {
+            "items": generated,
+            "stored": stored,
+            "elapsed_s": time.perf_counter() - start,
+            "ingest_items_per_s": generated / ingest_seconds if ingest_seconds else None,
+        }
+        if target == "archive":
+            checkpoint["files"] = writer.files
+        else:
+            conn = db._get_connection()
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                conn.close()
+            checkpoint["db_bytes"] = os.path.getsize(db.db_path)
+            checkpoint.update(probe_queries(db, analyzer, coin_indexer, COINS[0][0], COINS[-1][0],
+                                            newest_ts=_epoch(batch[-1]["published_at"])))
+        results["checkpoints"].append(checkpoint)
+        logger.info(", ".join(f"{key} {value:.1f}" if isinstance(value, float) else f"{key} {value}"
+                              for key, value in checkpoint.items()))
+    results["work_dir"] = work_dir
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a large deterministic news corpus and measure how "
+                                                 "ingest, queries and analysis preparation scale")
+    parser.add_argument("--count", type=int, default=1000000, help="Items to generate (default: 1000000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", help="Publication time of the newest item, ISO 8601 (default: now); "
+                                      "fix it to reproduce a corpus byte for byte")
+    parser.add_argument("--span-days", type=float, default=30, help="Days the corpus covers (default: 30)")
+    parser.add_argument("--duplicate-rate", type=float, default=0.02, help="Share of verbatim repeats (default: 0.02)")
+    parser.add_argument("--near-duplicate-rate", type=float, default=0.1,
+                        help="Share of reworded re-reports of recent stories (default: 0.1)")
+    parser.add_argument("--coin-skew", type=float, default=1.1, help="Zipf exponent of coin mentions (default: 1.1)")
+    parser.add_argument("--body-chars", type=int, default=1200, help="Median CryptoCompare body length (default: 1200)")
+    parser.add_argument("--target", choices=["db", "archive"], default="db",
+                        help="Stream into a scratch NewsDatabase or a JSON archive (default: db)")
+    parser.add_argument("--archive-layout", choices=["items", "batches"], default="items",
+                        help="With --target archive: one file per item, or raw API responses per batch")
+    parser.add_argument("--rate", type=float, help="Items per second to stream at (default: as fast as possible)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Items per save_news call or archive batch")
+    parser.add_argument("--checkpoints", type=int, default=10, help="Measurements along the way (default: 10)")
+    parser.add_argument("--compress-bodies", action="store_true", help="Store bodies compressed in the database")
+    parser.add_argument("--work-dir", help="Keep the database or archive here (default: a temporary directory, removed)")
+    parser.add_argument("--output", help="Write the measurements to this JSON file")
+    args = parser.parse_args(argv)
+
+    end_ts = None
+    if args.end:
+        end = datetime.fromisoformat(args.end.replace("Z", "+00:00"))
+        end_ts = int((end if end.tzinfo else end.replace(tzinfo=timezone.utc)).timestamp())
+    corpus = SyntheticCorpus(args.count, seed=args.seed, end_ts=end_ts, span_days=args.span_days,
+                             duplicate_rate=args.duplicate_rate, near_duplicate_rate=args.near_duplicate_rate,
+                             coin_skew=args.coin_skew, body_chars=args.body_chars)
+    overrides = {"body_compression": {"enabled": True}} if args.compress_bodies else None
+    try:
+        results = run_scaling(corpus, target=args.target, work_dir=args.work_dir, rate=args.rate,
+                              batch_size=args.batch_size, checkpoints=args.checkpoints,
+                              archive_layout=args.archive_layout, config_overrides=overrides)
+    finally:
+        if not args.work_dir and "results" in locals():
+            shutil.rmtree(results["work_dir"], ignore_errors=True)
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
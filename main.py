@@ -2,10 +2,6 @@ import logging
 import argparse
 import time
 import json
-from src.data_collection.news_fetcher import NewsFetcher
-from src.storage.database import NewsDatabase
-from src.analysis.llm_analyzer import LLMAnalyzer
-from src.analysis.report_generator import ReportGenerator
 import os
 
 logging.basicConfig(
@@ -17,10 +13,17 @@ logger = logging.getLogger(__name__)
 # Default interval set to 8 hours (in seconds)
 DEFAULT_INTERVAL = 28800
 
+# Metrics snapshot written at the end of one-shot runs
+DEFAULT_METRICS_FILE = "data/metrics/latest.json"
+
+# Lookback of analyses and of the coin mention counts shown in reports
+ANALYSIS_HOURS = 8
+
 def setup_directories():
     """Create necessary directories"""
     os.makedirs("data/news_data", exist_ok=True)
     os.makedirs("data/reports", exist_ok=True)
+    os.makedirs("data/metrics", exist_ok=True)
     os.makedirs("config", exist_ok=True)
     
     # Create config file if it doesn't exist
@@ -49,41 +52,103 @@ def setup_directories():
             }, f, indent=2)
             logger.info("Created default config file")
 
-def fetch_and_store(continuous=False, interval=DEFAULT_INTERVAL, analyze=True):
+def fetch_and_store(continuous=False, interval=DEFAULT_INTERVAL, analyze=True,
+                    metrics_port=None, metrics_file=DEFAULT_METRICS_FILE, profiler=None, api_port=None):
     """Fetch news, store them in the database, and optionally analyze them"""
+    from src.data_collection.news_fetcher import NewsFetcher
+    from src.storage.database import NewsDatabase
+    from src.analysis.llm_analyzer import LLMAnalyzer
+    from src.analysis.report_generator import ReportGenerator
+    from src.analysis.watchlists import load_watchlists, watched_coins, WatchlistReporter
+    from src.monitoring.metrics import registry, start_metrics_server
+    from src.monitoring.profiler import StageProfiler
+    from src.storage.maintenance import DatabaseMaintenance
+    from src.storage.coin_index import CoinIndexer
+    from src.storage.run_lock import RunCoordinator
+    
     fetcher = NewsFetcher()
     db = NewsDatabase()
     analyzer = LLMAnalyzer() if analyze else None
     report_generator = ReportGenerator() if analyze else None
+    # The mention index lives in SQLite-only tables; watchlists are rejected at startup without it
+    coin_indexer = CoinIndexer(db=db) if db.db_type == "sqlite" else None
+    # Every watchlist is served from this process's single fetch
+    watchlists = load_watchlists(db.config)
+    watchlist_reporter = WatchlistReporter(analyzer, report_generator, watchlists) if analyze and watchlists else None
+    # Coordinates with other processes (cron runs, --analyze-only, workers) on the same database
+    coordinator = RunCoordinator(db)
+    # Price charts of the watched coins, for correlating news with market moves
+    price_store = None
+    if db.db_type == "sqlite":
+        from src.storage.price_store import PriceStore
+        price_store = PriceStore(db=db)
+        if not price_store.settings["enabled"]:
+            price_store = None
+    # Read replica for the API and other readers, synced after every run
+    replica = None
+    if db.db_type == "sqlite" and db.config.get("replica", {}).get("enabled"):
+        from src.storage.replica import ReplicaExporter
+        replica = ReplicaExporter(db=db)
+    # Without --profile every stage runs unwrapped
+    profiler = profiler or StageProfiler(enabled=False)
     
     def single_fetch():
+        profiler.begin_cycle()
+        try:
+            run_stages()
+        finally:
+            profiler.end_cycle()
+    
+    def fetch_stages():
         # Fetch news from all sources
-        news_items = fetcher.fetch_all_sources()
-        saved_count = db.save_news(news_items)
-        logger.info(f"Saved {saved_count} new news items to database")
+        with profiler.stage("fetch"):
+            news_items = fetcher.fetch_all_sources()
+        
+        with profiler.stage("store"):
+            saved_count = db.save_news(news_items)
+            logger.info(f"Saved {saved_count} new news items to database")
+            
+            # Also save to files
+            saved_files = db.save_news_to_files(news_items)
+            logger.info(f"Saved {saved_files} news items to files")
         
-        # Also save to files
-        saved_files = db.save_news_to_files(news_items)
-        logger.info(f"Saved {saved_files} news items to files")
+        # Tag new articles with the coins they mention
+        if coin_indexer:
+            with profiler.stage("index"):
+                coin_indexer.index_pending()
         
         # Fetch coin-specific updates
-        coin_updates = fetcher.fetch_by_coin(["bitcoin", "ethereum", "ripple", "cardano", "solana"])
-        if coin_updates:
-            saved_coins = db.save_coin_updates(coin_updates)
-            logger.info(f"Saved updates for {saved_coins} coins")
+        coins = watched_coins(watchlists, db.resolve_coin)
+        with profiler.stage("coins"):
+            coin_updates = fetcher.fetch_by_coin(coins)
+            if coin_updates:
+                saved_coins = db.save_coin_updates(coin_updates)
+                logger.info(f"Saved updates for {saved_coins} coins")
+                
+        if price_store:
+            with profiler.stage("prices"):
+                price_store.ingest(coins)
+        return saved_count
+    
+    def run_stages():
+        # A run that overlaps another process's fetch waits for it instead of fetching again
+        coordinator.single_flight("fetch", fetch_stages)
             
         # Analyze news if requested
         if analyze and analyzer:
             logger.info("Analyzing news with LLM...")
-            analysis_result = analyzer.analyze_recent_news(db)
+            with profiler.stage("analyze"):
+                analysis_result = analyzer.analyze_recent_news(db, hours=ANALYSIS_HOURS)
             
             if "error" not in analysis_result:
                 logger.info("News analysis completed successfully")
                 
                 # Generate reports
                 if report_generator:
-                    html_report = report_generator.generate_html_report(analysis_result)
-                    text_report = report_generator.generate_text_report(analysis_result)
+                    with profiler.stage("report"):
+                        coin_mentions = recent_coin_mentions(db)
+                        html_report = report_generator.generate_html_report(analysis_result, coin_mentions)
+                        text_report = report_generator.generate_text_report(analysis_result, coin_mentions)
                     
                     if html_report:
                         logger.info(f"HTML report generated: {html_report}")
@@ -91,12 +156,30 @@ def fetch_and_store(continuous=False, interval=DEFAULT_INTERVAL, analyze=True):
                         logger.info(f"Text report generated: {text_report}")
             else:
                 logger.error(f"News analysis failed: {analysis_result['error']}")
+                
+            # Per-desk reports, analyzed concurrently
+            if watchlist_reporter:
+                with profiler.stage("watchlists"):
+                    run_watchlists(watchlist_reporter, db)
+                    
+        if replica:
+            with profiler.stage("replica"):
+                replica.sync()
     
     if continuous:
+        if metrics_port:
+            start_metrics_server(metrics_port)
+        if api_port is not None:
+            # In-process, so /events streams this collector's articles and analyses as they are saved
+            from src.api.server import NewsApiServer
+            NewsApiServer(port=api_port or None).start_in_thread()
+        maintenance = DatabaseMaintenance()
         logger.info(f"Starting continuous fetching every {interval} seconds ({interval/3600:.1f} hours)")
         while True:
             try:
                 single_fetch()
+                if maintenance.is_due():
+                    maintenance.run()
                 logger.info(f"Sleeping for {interval} seconds")
                 time.sleep(interval)
             except KeyboardInterrupt:
@@ -107,21 +190,194 @@ def fetch_and_store(continuous=False, interval=DEFAULT_INTERVAL, analyze=True):
                 time.sleep(60)  # Wait a minute before retrying
     else:
         single_fetch()
+        if metrics_file:
+            registry.write_snapshot(metrics_file)
+
+def run_worker(role, interval=DEFAULT_INTERVAL):
+    """Run a queue worker for one pipeline role until interrupted"""
+    from src.workers import Worker
+    
+    Worker(role, fetch_interval=interval).run()
+
+def serve_api(port=None):
+    """Serve the read-only HTTP API until interrupted"""
+    from src.api.server import NewsApiServer
+    
+    NewsApiServer(port=port).run()
+
+def fetch_prices(days=None):
+    """Fetch CoinGecko price charts of the watched coins into the price store"""
+    from src.storage.database import NewsDatabase
+    from src.analysis.watchlists import load_watchlists, watched_coins
+    from src.storage.price_store import PriceStore
+    
+    db = NewsDatabase()
+    price_store = PriceStore(db=db)
+    appended = price_store.ingest(watched_coins(load_watchlists(db.config), db.resolve_coin), days=days)
+    for coin_id, count in sorted(appended.items()):
+        logger.info(f"{coin_id}: {count} new samples, {len(price_store.series(coin_id)['ts'])} stored")
+
+def display_price_returns(coin=None):
+    """Log the average price move around articles per coin"""
+    from src.storage.database import NewsDatabase
+    from src.storage.price_store import PriceStore, DEFAULT_HORIZONS, horizon_label
+    import numpy as np
+    
+    db = NewsDatabase()
+    returns = PriceStore(db=db).news_returns()
+    coin_id = db.resolve_coin(coin) if coin else None
+    labels = [f"return_{horizon_label(horizon)}" for horizon in DEFAULT_HORIZONS]
+    coin_ids = returns["coin_id"]
+    if not len(coin_ids):
+        logger.info("No articles with stored prices; run --fetch-prices and --index-coins first")
+        return
+    for current in sorted(set(coin_ids)):
+        if coin_id and current != coin_id:
+            continue
+        mask = coin_ids == current
+        averages = ", ".join(f"{label[7:]}: {np.nanmean(returns[label][mask]) * 100:+.2f}%"
+                             if np.isfinite(returns[label][mask]).any() else f"{label[7:]}: n/a" for label in labels)
+        logger.info(f"{current} ({int(mask.sum())} articles) average move {averages}")
+
+def run_watchlists(watchlist_reporter, db):
+    """Analyze every configured watchlist and log its reports"""
+    results = watchlist_reporter.run(db, hours=ANALYSIS_HOURS)
+    for name, result in sorted(results.items()):
+        for report in (result["html_report"], result["text_report"]):
+            if report:
+                logger.info(f"Watchlist {name} report generated: {report}")
+
+def recent_coin_mentions(db, hours=ANALYSIS_HOURS, top=10):
+    """Most mentioned coins of the last `hours`, from the mention index"""
+    return db.get_coin_mention_counts(since_ts=int(time.time()) - hours * 3600, limit=top)
+
+def index_coins(rebuild=False):
+    """Tag stored articles with the coins they mention (all articles with rebuild)"""
+    from src.storage.coin_index import CoinIndexer
+    
+    indexer = CoinIndexer()
+    scanned = indexer.rebuild() if rebuild else indexer.index_pending()
+    logger.info(f"Scanned {scanned} articles for coin mentions")
 
-def display_saved_data(limit=10):
-    """Display recently saved news data"""
+def check_coin_index(parser, coin=None, watchlists=False):
+    """
+    Exit with a configuration error when --coin or the configured watchlists are used
+    with a storage backend that has no news_coins mention index (only sqlite keeps one)
+    """
+    from src.config import load_config
+    
+    config = load_config()
+    db_type = config.get("data_storage", {}).get("type", "sqlite")
+    if db_type == "sqlite":
+        return
+    if coin:
+        error = "--coin needs the coin mention index"
+        fix = "set data_storage.type to sqlite to filter by coin"
+    elif watchlists and config.get("watchlists"):
+        error = "watchlists need the coin mention index"
+        fix = "remove the watchlists section or set data_storage.type to sqlite"
+    else:
+        return
+    parser.exit(2, f"{parser.prog}: configuration error: {error}, which the {db_type} storage backend "
+                   f"doesn't have; {fix}\n")
+
+def backfill_date(value):
+    """argparse type for --since: a YYYY-MM-DD date or ISO 8601 timestamp"""
+    from datetime import datetime
+    
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD")
+    return value
+
+def run_backfill(since, workers=4):
+    """Backfill historical news from CryptoCompare and CryptoPanic back to `since`"""
+    from src.data_collection.backfill import HistoricalBackfill
+    
+    backfill = HistoricalBackfill(workers=workers)
+    results = backfill.run(since)
+    logger.info(f"Backfill saved {sum(results.values())} new news items")
+
+def run_maintenance(convert_vacuum=False, compress_bodies=False):
+    """Apply retention policies, update rollups and vacuum the database"""
+    from src.storage.maintenance import DatabaseMaintenance
+    
+    maintenance = DatabaseMaintenance()
+    if compress_bodies:
+        if not maintenance.db.body_compression["enabled"]:
+            logger.warning('New articles are still stored uncompressed; set "body_compression": {"enabled": true} in the config')
+        compressed = maintenance.compress_news_bodies(retrain=True)
+        # Rows shrink in place; only a full VACUUM returns the space inside half-empty pages
+        logger.info(f"Compressed {compressed} article bodies"
+                    + ("" if convert_vacuum else "; add --convert-vacuum to shrink the file now"))
+    if convert_vacuum:
+        maintenance.convert_to_incremental_vacuum()
+    maintenance.run()
+
+def export_parquet(output_dir):
+    """Append rows added since the last export to the Parquet dataset in `output_dir`"""
+    from src.storage.parquet_export import ParquetExporter
+    
+    ParquetExporter(output_dir=output_dir).run()
+
+def snapshot_database(path):
+    """Write a consistent copy of the database to `path` without pausing a running collector"""
+    from src.storage.replica import ReplicaExporter
+    
+    ReplicaExporter().snapshot(path)
+
+def replicate(path=None, every=None, stop=False):
+    """Sync the read replica once, or every `every` seconds until interrupted"""
+    from src.storage.replica import ReplicaExporter
+    
+    exporter = ReplicaExporter()
+    if path:
+        exporter.path = path
+    if stop:
+        exporter.stop()
+        return
+    while True:
+        exporter.sync()
+        if not every:
+            return
+        try:
+            time.sleep(every)
+        except KeyboardInterrupt:
+            logger.info("Replication stopped by user")
+            return
+
+def import_archive(directory, workers=None):
+    """Import JSON news archives under `directory` into the database"""
+    from src.storage.archive_importer import ArchiveImporter
+    
+    importer = ArchiveImporter(workers=workers)
+    importer.run(directory)
+
+def display_saved_data(limit=10, coin=None):
+    """Display recently saved news data, optionally only articles mentioning `coin`"""
+    from src.storage.database import NewsDatabase
+    
     db = NewsDatabase()
-    recent_news = db.get_recent_news(limit)
+    filters = {'coin': db.resolve_coin(coin)} if coin else None
     
-    if recent_news.empty:
+    # Stream rows instead of loading them all, so large limits use constant memory
+    count = 0
+    for record in db.iter_news(filters=filters, limit=limit):
+        if count == 0:
+            logger.info("Recent news items:")
+        logger.info(f"- {record.source}: {record.title} ({record.published_at})")
+        count += 1
+    
+    if count == 0:
         logger.info("No news found in the database")
     else:
-        logger.info(f"Found {len(recent_news)} news items:")
-        for _, row in recent_news.iterrows():
-            logger.info(f"- {row['source']}: {row['title']} ({row['published_at']})")
+        logger.info(f"Found {count} news items")
 
 def display_latest_analysis():
     """Display the latest analysis result"""
+    from src.storage.database import NewsDatabase
+    
     db = NewsDatabase()
     latest_analysis = db.get_latest_analysis()
     
@@ -139,31 +395,44 @@ def display_latest_analysis():
     else:
         logger.info("No analysis results found. Run with --analyze to generate analysis.")
 
-def analyze_latest_news():
-    """Analyze the latest news without fetching new data"""
-    logger.info("Analyzing latest unanalyzed news...")
+def analyze_latest_news(metrics_file=DEFAULT_METRICS_FILE, coin=None):
+    """Analyze the latest news without fetching new data, optionally focused on one coin"""
+    from src.storage.database import NewsDatabase
+    from src.analysis.llm_analyzer import LLMAnalyzer
+    from src.analysis.report_generator import ReportGenerator
+    from src.analysis.watchlists import load_watchlists, WatchlistReporter
+    from src.monitoring.metrics import registry
+    
     db = NewsDatabase()
+    coin_id = db.resolve_coin(coin) if coin else None
+    logger.info(f"Analyzing recent news about {coin_id}..." if coin_id else "Analyzing latest unanalyzed news...")
     analyzer = LLMAnalyzer()
     report_generator = ReportGenerator()
     
-    analysis_result = analyzer.analyze_recent_news(db)
+    analysis_result = analyzer.analyze_recent_news(db, hours=ANALYSIS_HOURS, coins=[coin_id] if coin_id else None)
     
     if "error" not in analysis_result:
         logger.info("News analysis completed successfully")
         
         # Generate reports
-        html_report = report_generator.generate_html_report(analysis_result)
-        text_report = report_generator.generate_text_report(analysis_result)
+        coin_mentions = recent_coin_mentions(db)
+        html_report = report_generator.generate_html_report(analysis_result, coin_mentions)
+        text_report = report_generator.generate_text_report(analysis_result, coin_mentions)
         
         if html_report:
             logger.info(f"HTML report generated: {html_report}")
         if text_report:
             logger.info(f"Text report generated: {text_report}")
-            
-        return True
     else:
         logger.error(f"News analysis failed: {analysis_result['error']}")
-        return False
+        
+    watchlists = load_watchlists(db.config)
+    if watchlists and not coin_id:
+        run_watchlists(WatchlistReporter(analyzer, report_generator, watchlists), db)
+        
+    if metrics_file:
+        registry.write_snapshot(metrics_file)
+    return "error" not in analysis_result
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Crypto News Collector and Analyzer')
@@ -175,16 +444,98 @@ if __name__ == "__main__":
     parser.add_argument('--no-analyze', action='store_true', help='Skip LLM analysis of news')
     parser.add_argument('--analyze-only', action='store_true', help='Only analyze existing news without fetching new data')
     parser.add_argument('--show-analysis', action='store_true', help='Display latest analysis results')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve Prometheus metrics on http://127.0.0.1:PORT/metrics in continuous mode')
+    parser.add_argument('--backfill', action='store_true',
+                        help='Backfill historical news back to --since (resumes an interrupted run)')
+    parser.add_argument('--since', type=backfill_date, help='Oldest publication date to backfill, YYYY-MM-DD')
+    parser.add_argument('--import-archive', metavar='DIR',
+                        help='Import news JSON files under DIR (e.g. data/news_data) into the database')
+    parser.add_argument('--maintenance', action='store_true',
+                        help='Run retention, rollups and incremental vacuum now (runs automatically in continuous mode)')
+    parser.add_argument('--convert-vacuum', action='store_true',
+                        help='With --maintenance: switch an existing database to incremental auto-vacuum (one full VACUUM)')
+    parser.add_argument('--compress-bodies', action='store_true',
+                        help='With --maintenance: train a new body dictionary and compress all article bodies stored as text')
+    parser.add_argument('--export-parquet', nargs='?', const='data/exports', metavar='DIR',
+                        help='Incrementally export news, coin updates and analyses to Parquet (default: data/exports)')
+    parser.add_argument('--index-coins', action='store_true',
+                        help='Tag stored articles not yet indexed with the coins they mention')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='With --index-coins: refresh the coin list and re-index every article')
+    parser.add_argument('--coin', help='With --show-data or --analyze-only: only articles mentioning this coin (id, symbol or name)')
+    parser.add_argument('--fetch-prices', nargs='?', type=int, const=0, metavar='DAYS',
+                        help='Fetch CoinGecko price charts of the watched coins (default: since the last sample, '
+                             'or prices.backfill_days for new coins)')
+    parser.add_argument('--price-returns', action='store_true',
+                        help='Show the average price move around articles per coin (optionally --coin)')
+    parser.add_argument('--worker', choices=['fetch', 'analyze', 'render'],
+                        help='Run as a queue worker for one pipeline role (start several processes to scale out)')
+    parser.add_argument('--serve-api', nargs='?', type=int, const=0, metavar='PORT',
+                        help='Serve the read-only JSON API (/news, /analyses/latest, /coins/ID, /search, /events); '
+                             'PORT defaults to api.port in the config (8080). With --continuous it runs inside '
+                             'the collector and /events streams new articles and analyses live')
+    parser.add_argument('--snapshot', metavar='PATH',
+                        help='Write a consistent copy of the database to PATH using the online backup API '
+                             '(safe while --continuous is writing)')
+    parser.add_argument('--replicate', nargs='?', const='', metavar='PATH',
+                        help='Sync the read replica (default: replica.path, or crypto_news_replica.db next to the '
+                             'database) with the rows changed since the last sync; the first run copies everything')
+    parser.add_argument('--replica-every', type=float, metavar='SECONDS',
+                        help='With --replicate: keep syncing every SECONDS until interrupted')
+    parser.add_argument('--stop-replication', action='store_true',
+                        help='Remove the change-tracking triggers that --replicate installs on the database')
+    parser.add_argument('--workers', type=int, default=4, help='Number of parallel workers (default: 4)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile each pipeline stage with cProfile and tracemalloc into data/profiles/')
+    parser.add_argument('--profile-every', type=int, default=1,
+                        help='In continuous mode, only profile every Nth cycle (default: 1)')
+    parser.add_argument('--profile-top', type=int, default=25,
+                        help='Number of allocation differences to record per stage (default: 25)')
+    parser.add_argument('--metrics-file', default=DEFAULT_METRICS_FILE,
+                        help=f'JSON metrics snapshot written after one-shot runs (default: {DEFAULT_METRICS_FILE})')
     
     args = parser.parse_args()
     
     setup_directories()
     
-    if args.show_data:
-        display_saved_data(args.limit)
+    if args.backfill:
+        if not args.since:
+            parser.error("--backfill requires --since YYYY-MM-DD")
+        run_backfill(args.since, workers=args.workers)
+    elif args.maintenance:
+        run_maintenance(convert_vacuum=args.convert_vacuum, compress_bodies=args.compress_bodies)
+    elif args.export_parquet:
+        export_parquet(args.export_parquet)
+    elif args.snapshot:
+        snapshot_database(args.snapshot)
+    elif args.replicate is not None or args.stop_replication:
+        replicate(path=args.replicate or None, every=args.replica_every, stop=args.stop_replication)
+    elif args.import_archive:
+        import_archive(args.import_archive, workers=args.workers)
+    elif args.worker:
+        check_coin_index(parser, watchlists=True)
+        run_worker(args.worker, interval=args.interval)
+    elif args.serve_api is not None and not args.continuous:
+        serve_api(port=args.serve_api or None)
+    elif args.fetch_prices is not None:
+        fetch_prices(days=args.fetch_prices or None)
+    elif args.price_returns:
+        display_price_returns(coin=args.coin)
+    elif args.index_coins:
+        index_coins(rebuild=args.rebuild)
+    elif args.show_data:
+        check_coin_index(parser, coin=args.coin)
+        display_saved_data(args.limit, coin=args.coin)
     elif args.show_analysis:
         display_latest_analysis()
     elif args.analyze_only:
-        analyze_latest_news()
+        check_coin_index(parser, coin=args.coin, watchlists=not args.coin)
+        analyze_latest_news(metrics_file=args.metrics_file, coin=args.coin)
     else:
-        fetch_and_store(continuous=args.continuous, interval=args.interval, analyze=not args.no_analyze) 
\ No newline at end of file
+        check_coin_index(parser, watchlists=not args.no_analyze)
+        from src.monitoring.profiler import StageProfiler
+        profiler = StageProfiler(top_n=args.profile_top, every=args.profile_every) if args.profile else None
+        fetch_and_store(continuous=args.continuous, interval=args.interval, analyze=not args.no_analyze,
+                        metrics_port=args.metrics_port, metrics_file=args.metrics_file, profiler=profiler,
+                        api_port=args.serve_api) 
\ No newline at end of file
@@ -1,43 +1,93 @@
 import logging
 import json
-import os
-import requests
+import threading
+import time
 from datetime import datetime, timedelta
-import pandas as pd
+from src.config import load_config
+from src.monitoring.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS_TOTAL, LLM_COST_USD_TOTAL, DB_QUERY_SECONDS
+from src.storage.events import broadcaster
+from src.storage.run_lock import RunCoordinator
+from .story_clusters import StoryClusterer, DEFAULT_CLUSTERING
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# USD per 1M tokens (prompt, completion); override with "pricing" in the openai config
+MODEL_PRICING = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-3.5-turbo-16k": (3.00, 4.00),
+}
+
+# Incremental mode: previous analysis sections carried into the next prompt, and their size caps
+DEFAULT_ANALYSIS = {
+    "incremental": True,
+    "context_max_age_hours": 24,
+}
+CONTEXT_SECTIONS = ("summary", "sentiment", "market_indicators", "significant_events", "trends",
+                    "opportunities_and_risks", "key_coins")
+CONTEXT_MAX_ITEMS = 5
+CONTEXT_MAX_CHARS = 400
+
+# One semaphore per process caps concurrent LLM requests across all analyzers
+_llm_slots = None
+_llm_slots_lock = threading.Lock()
+
+def _get_llm_slots(max_concurrency):
+    """Get the process-wide LLM request semaphore, created on first use"""
+    global _llm_slots
+    with _llm_slots_lock:
+        if _llm_slots is None:
+            _llm_slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        return _llm_slots
+
 class LLMAnalyzer:
     """Analyzes crypto news using OpenAI's LLM capabilities."""
     
     def __init__(self, config_path="config/api_config.json"):
-        self.config = self._load_config(config_path)
+        self.config = load_config(config_path)
         self.openai_config = self.config.get("openai", {})
-        # self.api_key = self.openai_config.get("api_key", os.environ.get("OPENAI_API_KEY"))
         self.api_key = self.openai_config.get("api_key", '')
         self.model = self.openai_config.get("model", "gpt-4o-mini")
+        self.base_url = self.openai_config.get("base_url", "https://api.openai.com/v1/")
+        self.llm_slots = _get_llm_slots(self.openai_config.get("max_concurrency", 2))
+        
+        self.analysis_config = dict(DEFAULT_ANALYSIS, **self.config.get("analysis", {}))
+        
+        # Articles about the same event are merged into one prompt entry
+        clustering = dict(DEFAULT_CLUSTERING, **self.config.get("clustering", {}))
+        self.clusterer = StoryClusterer(
+            threshold=clustering["threshold"],
+            body_chars=clustering["body_chars"]
+        ) if clustering["enabled"] else None
         
         if not self.api_key:
             logger.warning("No OpenAI API key found. LLM analysis will not be available.")
     
-    def _load_config(self, config_path):
-        """Load configuration from the specified path."""
-        try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading config: {e}")
-            return {}
-            
-    def analyze_recent_news(self, db_instance, hours=8, limit=100):
+    def analyze_recent_news(self, db_instance, hours=8, limit=100, coins=None, watchlist=None, incremental=None):
         """
         Analyze news from the last specified hours.
         
+        Only one process runs a given analysis at a time: a concurrent caller
+        waits for the running one and returns its result instead of paying for
+        a second completion over the same articles.
+        
+        In incremental mode the previous analysis is sent as compact context
+        together with only the articles that arrived since, and the model
+        updates it and lists what changed, so the prompt grows with the new
+        information rather than with the window.
+        
         Args:
             db_instance: Database instance to fetch news from
             hours: Hours to look back for news
             limit: Maximum number of news items to analyze
+            coins: Optional list of coin ids; analyzes only articles mentioning any
+                   of them (analyzed or not) and leaves the analyzed flags untouched
+            watchlist: Name of the watchlist `coins` belong to, stored with the result
+            incremental: Build on the previous analysis; defaults to the
+                         "analysis.incremental" config setting. Coin-focused
+                         analyses always start from scratch
             
         Returns:
             Dictionary containing analysis results
@@ -46,65 +96,140 @@ class LLMAnalyzer:
             logger.error("Cannot perform analysis: No OpenAI API key provided")
             return {"error": "No OpenAI API key provided"}
             
+        run_name = f"analysis:{watchlist or ','.join(coins)}" if coins else "analysis"
+        return RunCoordinator(db_instance).single_flight(
+            run_name, lambda: self._run_analysis(db_instance, hours, limit, coins, watchlist, incremental)
+        )
+    
+    def _run_analysis(self, db_instance, hours, limit, coins, watchlist, incremental):
+        """Select, cluster and analyze news, then save the result."""
         # Get recent news
-        recent_news = self._get_news_for_analysis(db_instance, hours, limit)
+        recent_news = self._get_news_for_analysis(db_instance, hours, limit, coins)
         
-        if recent_news.empty:
+        if not recent_news:
             logger.info("No news to analyze")
             return {"analysis": "No recent news available for analysis"}
             
+        # Group articles about the same event so the LLM reads each event once
+        story_clusters = self._cluster_news(db_instance, recent_news)
+        
         # Prepare news for analysis
-        news_for_prompt = self._prepare_news_for_prompt(recent_news)
+        coin_mentions = db_instance.get_news_coins([record.id for record in recent_news])
+        news_for_prompt = self._prepare_news_for_prompt(story_clusters, coin_mentions)
+        
+        if incremental is None:
+            incremental = self.analysis_config["incremental"]
+        previous = self._get_previous_analysis(db_instance) if incremental and not coins else None
         
         # Analyze with OpenAI
-        analysis_result = self._analyze_with_openai(news_for_prompt)
+        analysis_result = self._analyze_with_openai(news_for_prompt, coins, previous)
+        if coins and "error" not in analysis_result:
+            analysis_result["coins"] = list(coins)
+            if watchlist:
+                analysis_result["watchlist"] = watchlist
+        if previous and "error" not in analysis_result:
+            analysis_result["previous_analysis_at"] = previous["created_at"]
         
         # Save analysis results to database
-        self._save_analysis_results(db_instance, analysis_result)
+        # Coin-focused analyses leave the flags to the global analysis; failed ones are retried next time
+        analyzed_ids = [] if coins or "error" in analysis_result else [record.id for record in recent_news]
+        self._save_analysis_results(db_instance, analysis_result, analyzed_ids)
         
         return analysis_result
     
-    def _get_news_for_analysis(self, db_instance, hours, limit):
-        """Get recent news that hasn't been analyzed yet."""
-        conn = db_instance._get_connection()
-        lookback_time = (datetime.now() - timedelta(hours=hours)).isoformat()
-        
-        query = f"""
-        SELECT * FROM news 
-        WHERE analyzed = 0 
-        AND published_at > '{lookback_time}'
-        ORDER BY published_at DESC
-        LIMIT {limit}
-        """
+    def _get_news_for_analysis(self, db_instance, hours, limit, coins=None):
+        """Get recent news that hasn't been analyzed yet, or all recent news mentioning any of `coins`."""
+        lookback_ts = int((datetime.now() - timedelta(hours=hours)).timestamp())
+        filters = {'coins': coins, 'since_ts': lookback_ts} if coins else {'analyzed': False, 'since_ts': lookback_ts}
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
+        with DB_QUERY_SECONDS.time(query="news_for_analysis"):
+            records = list(db_instance.iter_news(
+                filters=filters,
+                batch_size=limit,
+                limit=limit
+            ))
         
-        logger.info(f"Retrieved {len(df)} news items for analysis")
-        return df
+        logger.info(f"Retrieved {len(records)} news items for analysis")
+        return records
     
-    def _prepare_news_for_prompt(self, news_df):
-        """Prepare news dataframe for inclusion in LLM prompt."""
+    def _get_previous_analysis(self, db_instance):
+        """Get the compacted latest general analysis if it's recent enough to build on, else None."""
+        latest = db_instance.get_latest_analysis()
+        analysis = latest.get("analysis") if latest else None
+        if not isinstance(analysis, dict) or "error" in analysis or "coins" in analysis:
+            return None
+        try:
+            age = datetime.now() - datetime.fromisoformat(latest["created_at"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if age > timedelta(hours=self.analysis_config["context_max_age_hours"]):
+            return None
+        context = {section: self._compact(analysis[section]) for section in CONTEXT_SECTIONS if section in analysis}
+        if not context:
+            return None
+        return {"created_at": latest["created_at"], "analysis": context}
+    
+    def _compact(self, value):
+        """Trim a section of a previous analysis to a bounded size."""
+        if isinstance(value, str):
+            return value if len(value) <= CONTEXT_MAX_CHARS else value[:CONTEXT_MAX_CHARS] + "..."
+        if isinstance(value, list):
+            return [self._compact(item) for item in value[:CONTEXT_MAX_ITEMS]]
+        if isinstance(value, dict):
+            return {key: self._compact(item) for key, item in list(value.items())[:CONTEXT_MAX_ITEMS]}
+        return value
+    
+    def _cluster_news(self, db_instance, news_records):
+        """Group news records into story clusters; one cluster per record when clustering is disabled."""
+        if not self.clusterer:
+            return [[record] for record in news_records]
+        try:
+            return self.clusterer.cluster(db_instance, news_records)
+        except Exception as e:
+            logger.error(f"Error clustering news, sending articles individually: {e}")
+            return [[record] for record in news_records]
+    
+    def _prepare_news_for_prompt(self, news_clusters, coin_mentions=None):
+        """Prepare one prompt entry per story cluster, represented by its first report."""
+        coin_mentions = coin_mentions or {}
         news_items = []
         
-        for _, row in news_df.iterrows():
+        for cluster in news_clusters:
+            record = cluster[0]
             item = {
-                'title': row['title'],
-                'source': row['source_name'],
-                'published_at': row['published_at'],
-                'categories': row['categories'],
-                'url': row['url']
+                'title': record.title,
+                'source': record.source_name,
+                'published_at': record.published_at,
+                'categories': record.categories,
+                'url': record.url
             }
             
+            if len(cluster) > 1:
+                source_names = sorted({member.source_name for member in cluster if member.source_name})
+                item['articles'] = len(cluster)
+                item['source_count'] = len(source_names)
+                item['sources'] = source_names
+                item['last_published_at'] = cluster[-1].published_at
+                related = []
+                for member in cluster[1:]:
+                    if member.title and member.title != record.title and member.title not in related:
+                        related.append(member.title)
+                if related:
+                    item['related_headlines'] = related[:3]
+                    
+            coins = sorted({coin for member in cluster for coin in coin_mentions.get(member.id, [])})
+            if coins:
+                item['coins'] = coins
+            
             # Only include body if it's not too long
-            if row['body'] and len(row['body']) < 1000:
-                item['body'] = row['body']
+            if record.body and len(record.body) < 1000:
+                item['body'] = record.body
             
             news_items.append(item)
             
         return news_items
     
-    def _analyze_with_openai(self, news_items):
+    def _analyze_with_openai(self, news_items, coins=None, previous=None):
         """Send news to OpenAI for analysis and return results."""
         logger.info("Analyzing news with OpenAI...")
         
@@ -124,14 +249,32 @@ class LLMAnalyzer:
         - sentiment: Overall market sentiment (positive, neutral, negative) with reasoning
         - trends: Important trends identified
         - opportunities_and_risks: Potential investment opportunities or risks
-        - key_coins: Analysis of specific cryptocurrencies mentioned
+        - key_coins: Analysis of specific cryptocurrencies mentioned (the "coins" field of a news item lists the coins it mentions)
+        
+        Items reported by several outlets are merged into one entry; "articles" and "source_count"
+        tell how widely an event was covered.
         
         Be objective, fact-based, and avoid speculation where possible.
         """
         
         user_prompt = f"Here are the latest cryptocurrency news items to analyze:\n\n{json.dumps(news_items, indent=2)}"
+        if previous:
+            system_prompt += """
+        You are updating your previous analysis with news that arrived since it was written.
+        Keep what still holds, revise what the new items change, and add one more section:
+        - changes: List of what changed since the previous analysis (new events, sentiment shifts, reversed trends)
+        """
+            user_prompt = (f"Previous analysis from {previous['created_at']}:\n\n"
+                           f"{json.dumps(previous['analysis'], separators=(',', ':'))}\n\n"
+                           f"Only the news items below are new since then. {user_prompt}")
+        if coins:
+            focus = ", ".join(coins)
+            user_prompt = (f"Focus the analysis on {focus}; every item below mentions at least one of them. "
+                           f"Cover other coins only where they affect {focus}.\n\n{user_prompt}")
         
         try:
+            import requests
+            
             headers = {
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {self.api_key}"
@@ -147,14 +290,18 @@ class LLMAnalyzer:
                 "max_tokens": 2000
             }
             
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers=headers,
-                json=payload
-            )
+            with self.llm_slots:
+                start = time.perf_counter()
+                response = requests.post(
+                    f"{self.base_url.rstrip('/')}/chat/completions",
+                    headers=headers,
+                    json=payload
+                )
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, model=self.model)
             
             if response.status_code == 200:
                 result = response.json()
+                self._record_usage(result.get("usage", {}))
                 analysis_text = result['choices'][0]['message']['content']
                 
                 # Try to parse as JSON if it's in JSON format
@@ -172,40 +319,33 @@ class LLMAnalyzer:
             logger.error(f"Error during OpenAI analysis: {e}")
             return {"error": str(e)}
     
-    def _save_analysis_results(self, db_instance, analysis_result):
-        """Save analysis results to the database and mark analyzed news."""
-        conn = db_instance._get_connection()
-        cursor = conn.cursor()
-        
-        # Save the analysis
-        timestamp = datetime.now().isoformat()
+    def _record_usage(self, usage):
+        """Record token usage and estimated cost of a completion."""
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        LLM_TOKENS_TOTAL.inc(prompt_tokens, model=self.model, kind="prompt")
+        LLM_TOKENS_TOTAL.inc(completion_tokens, model=self.model, kind="completion")
         
+        pricing = self.openai_config.get("pricing")
+        if pricing:
+            prompt_price, completion_price = pricing.get("prompt", 0), pricing.get("completion", 0)
+        else:
+            prompt_price, completion_price = MODEL_PRICING.get(self.model, (0, 0))
+        cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+        LLM_COST_USD_TOTAL.inc(cost, model=self.model)
+        logger.info(f"LLM usage: {prompt_tokens} prompt + {completion_tokens} completion tokens (~${cost:.4f})")
+    
+    def _save_analysis_results(self, db_instance, analysis_result, news_ids=None):
+        """Save analysis results to the database and mark the analyzed news."""
         try:
-            # Insert the analysis into an analysis table
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS news_analysis (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                analysis_data TEXT,
-                created_at TEXT
-            )
-            ''')
-            
-            cursor.execute('''
-            INSERT INTO news_analysis (analysis_data, created_at)
-            VALUES (?, ?)
-            ''', (json.dumps(analysis_result), timestamp))
-            
-            # Mark the news items as analyzed
-            cursor.execute('''
-            UPDATE news
-            SET analyzed = 1
-            WHERE analyzed = 0
-            ''')
-            
-            conn.commit()
+            analysis_id = db_instance.save_analysis(analysis_result, news_ids)
             logger.info("Analysis results saved to database")
-            
+            if "error" not in analysis_result:
+                # Coin analyses only reach subscribers of those coins; market-wide ones reach everyone
+                broadcaster.publish("analysis", {
+                    "id": analysis_id,
+                    "created_at": datetime.now().isoformat(),
+                    "analysis": analysis_result
+                }, coins=analysis_result.get("coins"))
         except Exception as e:
             logger.error(f"Error saving analysis results: {e}")
-        finally:
-            conn.close() 
\ No newline at end of file
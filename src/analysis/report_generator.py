@@ -2,6 +2,8 @@ import json
 import logging
 from datetime import datetime
 import os
+import time
+from src.monitoring.metrics import REPORT_RENDER_SECONDS
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -13,12 +15,14 @@ class ReportGenerator:
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
     
-    def generate_html_report(self, analysis_data):
+    def generate_html_report(self, analysis_data, coin_mentions=None, name=None):
         """
         Generate an HTML report from the analysis data.
         
         Args:
             analysis_data: Dictionary containing analysis results
+            coin_mentions: Optional [(coin_id, article_count)] from the mention index
+            name: Optional watchlist name, added to the file name and title
             
         Returns:
             str: Path to the generated HTML report
@@ -28,26 +32,30 @@ class ReportGenerator:
             return None
             
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        report_path = os.path.join(self.output_dir, f"crypto_analysis_{timestamp}.html")
+        report_path = os.path.join(self.output_dir, self._report_filename(timestamp, "html", name))
         
         try:
-            html_content = self._create_html_content(analysis_data)
+            start = time.perf_counter()
+            html_content = self._create_html_content(analysis_data, coin_mentions, name)
             
             with open(report_path, "w", encoding="utf-8") as f:
                 f.write(html_content)
                 
+            REPORT_RENDER_SECONDS.observe(time.perf_counter() - start, format="html")
             logger.info(f"HTML report generated: {report_path}")
             return report_path
         except Exception as e:
             logger.error(f"Error generating HTML report: {e}")
             return None
     
-    def generate_text_report(self, analysis_data):
+    def generate_text_report(self, analysis_data, coin_mentions=None, name=None):
         """
         Generate a plain text report from the analysis data.
         
         Args:
             analysis_data: Dictionary containing analysis results
+            coin_mentions: Optional [(coin_id, article_count)] from the mention index
+            name: Optional watchlist name, added to the file name and title
             
         Returns:
             str: Path to the generated text report
@@ -57,22 +65,32 @@ class ReportGenerator:
             return None
             
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        report_path = os.path.join(self.output_dir, f"crypto_analysis_{timestamp}.txt")
+        report_path = os.path.join(self.output_dir, self._report_filename(timestamp, "txt", name))
         
         try:
-            text_content = self._create_text_content(analysis_data)
+            start = time.perf_counter()
+            text_content = self._create_text_content(analysis_data, coin_mentions, name)
             
             with open(report_path, "w", encoding="utf-8") as f:
                 f.write(text_content)
                 
+            REPORT_RENDER_SECONDS.observe(time.perf_counter() - start, format="text")
             logger.info(f"Text report generated: {report_path}")
             return report_path
         except Exception as e:
             logger.error(f"Error generating text report: {e}")
             return None
     
-    def _create_html_content(self, analysis_data):
+    def _report_filename(self, timestamp, extension, name=None):
+        """Report file name; watchlist reports carry the watchlist name"""
+        if name:
+            safe_name = "".join(char if char.isalnum() or char in "-_" else "_" for char in name)
+            return f"crypto_analysis_{safe_name}_{timestamp}.{extension}"
+        return f"crypto_analysis_{timestamp}.{extension}"
+    
+    def _create_html_content(self, analysis_data, coin_mentions=None, name=None):
         """Create HTML content from the analysis data."""
+        title = f"Cryptocurrency Market Analysis: {name}" if name else "Cryptocurrency Market Analysis"
         # Extract the analysis if it's nested
         if isinstance(analysis_data, dict) and "analysis" in analysis_data:
             if isinstance(analysis_data["analysis"], dict):
@@ -82,7 +100,7 @@ class ReportGenerator:
                 return f"""
                 <html>
                 <head>
-                    <title>Cryptocurrency Market Analysis</title>
+                    <title>{title}</title>
                     <style>
                         body {{ font-family: Arial, sans-serif; line-height: 1.6; max-width: 1000px; margin: 0 auto; padding: 20px; }}
                         h1, h2 {{ color: #2c3e50; }}
@@ -91,7 +109,7 @@ class ReportGenerator:
                     </style>
                 </head>
                 <body>
-                    <h1>Cryptocurrency Market Analysis</h1>
+                    <h1>{title}</h1>
                     <div class="timestamp">Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</div>
                     <pre>{analysis_data["analysis"]}</pre>
                 </body>
@@ -104,7 +122,7 @@ class ReportGenerator:
         html = f"""
         <html>
         <head>
-            <title>Cryptocurrency Market Analysis</title>
+            <title>{title}</title>
             <style>
                 body {{ font-family: Arial, sans-serif; line-height: 1.6; max-width: 1000px; margin: 0 auto; padding: 20px; }}
                 h1, h2, h3 {{ color: #2c3e50; }}
@@ -118,7 +136,7 @@ class ReportGenerator:
             </style>
         </head>
         <body>
-            <h1>Cryptocurrency Market Analysis</h1>
+            <h1>{title}</h1>
             <div class="timestamp">Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</div>
         """
         
@@ -131,6 +149,23 @@ class ReportGenerator:
             </div>
             """
         
+        # Changes since the previous analysis (incremental mode)
+        if "changes" in analysis:
+            html += f"""
+            <div class="section">
+                <h2>What Changed</h2>
+                <ul>
+            """
+            if isinstance(analysis["changes"], list):
+                for change in analysis["changes"]:
+                    html += f"<li>{change}</li>"
+            else:
+                html += f"<li>{analysis['changes']}</li>"
+            html += """
+                </ul>
+            </div>
+            """
+        
         # Market indicators section
         if "market_indicators" in analysis:
             html += f"""
@@ -260,6 +295,20 @@ class ReportGenerator:
             </div>
             """
         
+        # Coin mention counts from the index
+        if coin_mentions:
+            html += """
+            <div class="section">
+                <h2>Most Mentioned Coins</h2>
+                <ul>
+            """
+            for coin, count in coin_mentions:
+                html += f"<li>{coin}: {count} articles</li>"
+            html += """
+                </ul>
+            </div>
+            """
+        
         # Close HTML tags
         html += """
         </body>
@@ -268,8 +317,9 @@ class ReportGenerator:
         
         return html
     
-    def _create_text_content(self, analysis_data):
+    def _create_text_content(self, analysis_data, coin_mentions=None, name=None):
         """Create plain text content from the analysis data."""
+        title = f"CRYPTOCURRENCY MARKET ANALYSIS: {name.upper()}" if name else "CRYPTOCURRENCY MARKET ANALYSIS"
         # Extract the analysis if it's nested
         if isinstance(analysis_data, dict) and "analysis" in analysis_data:
             if isinstance(analysis_data["analysis"], dict):
@@ -277,7 +327,7 @@ class ReportGenerator:
             else:
                 # Handle case where analysis is a string
                 return f"""
-CRYPTOCURRENCY MARKET ANALYSIS
+{title}
 Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 {analysis_data["analysis"]}
@@ -286,7 +336,7 @@ Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
             analysis = analysis_data
         
         # Build the text content
-        text = f"""CRYPTOCURRENCY MARKET ANALYSIS
+        text = f"""{title}
 Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 """
@@ -299,6 +349,18 @@ Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 
 """
         
+        # Changes since the previous analysis (incremental mode)
+        if "changes" in analysis:
+            text += f"""WHAT CHANGED
+------------
+"""
+            if isinstance(analysis["changes"], list):
+                for change in analysis["changes"]:
+                    text += f"- {change}\n"
+            else:
+                text += f"- {analysis['changes']}\n"
+            text += "\n"
+        
         # Market indicators section
         if "market_indicators" in analysis:
             text += f"""KEY MARKET INDICATORS
@@ -385,4 +447,13 @@ Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
             else:
                 text += f"{analysis['key_coins']}\n"
         
+        # Coin mention counts from the index
+        if coin_mentions:
+            text += f"""
+MOST MENTIONED COINS
+--------------------
+"""
+            for coin, count in coin_mentions:
+                text += f"- {coin}: {count} articles\n"
+        
         return text 
\ No newline at end of file
@@ -0,0 +1,161 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLUSTERING = {
+    "enabled": True,
+    "threshold": 0.3,
+    "body_chars": 400,
+}
+
+# Terms in more documents than this are scored with a dense product over their columns;
+# rarer terms by pairing postings, so no documents x vocabulary matrix is ever built
+DENSE_TERM_MIN_DOCS = 64
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9$][a-z0-9$'-]*[a-z0-9]|[a-z0-9]")
+
+STOPWORDS = frozenset('''
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers him his how i if in into is it its itself just me more most my new news no nor not now of
+off on once only or other our out over own same says said she should so some such than that the their them
+then there these they this those through to too under until up very was we were what when where which while
+who whom why will with would you your
+'''.split())
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords"""
+    return [token for token in TOKEN_PATTERN.findall((text or '').lower()) if token not in STOPWORDS]
+
+class StoryClusterer:
+    """
+    Groups articles describing the same event by TF-IDF cosine similarity.
+    
+    Term counts and cluster assignments are cached per article in the database,
+    so a cycle only tokenizes articles it has not seen before and never moves
+    an article that was already assigned. A new article joins the cluster of its
+    most similar article in the window when the similarity reaches `threshold`,
+    otherwise it starts a new cluster.
+    """
+    
+    def __init__(self, threshold=0.3, body_chars=400):
+        self.threshold = threshold
+        self.body_chars = body_chars
+        
+    def terms(self, record):
+        """Term counts of an article; the headline counts twice since it names the event"""
+        tokens = tokenize(record.title) * 2 + tokenize(record.body_prefix(self.body_chars))
+        return dict(Counter(tokens))
+    
+    def cluster(self, db_instance, records):
+        """
+        Group records into clusters.
+        
+        Args:
+            db_instance: NewsDatabase holding the cached assignments
+            records: NewsRecord objects, newest first as returned by iter_news
+            
+        Returns:
+            List of clusters (lists of records, earliest first), largest cluster first
+        """
+        if not records:
+            return []
+        start = time.perf_counter()
+        cached = db_instance.get_news_clusters([record.id for record in records])
+        
+        # Assign oldest first so an event's cluster is named after its first report
+        ordered = sorted(records, key=lambda record: (record.published_ts or 0, record.id))
+        term_counts, assignments, new_rows = [], {}, []
+        for record in ordered:
+            if record.id in cached:
+                cluster_id, terms = cached[record.id]
+                assignments[record.id] = cluster_id
+            else:
+                terms = self.terms(record)
+            term_counts.append(terms)
+            
+        new_indexes = [index for index, record in enumerate(ordered) if record.id not in assignments]
+        if new_indexes:
+            similarity = self._similarity(term_counts, new_indexes)
+            for row, index in enumerate(new_indexes):
+                record = ordered[index]
+                # Only compare with articles that already have a cluster
+                candidates = [other for other in range(len(ordered)) if ordered[other].id in assignments]
+                cluster_id = record.id
+                if candidates:
+                    scores = similarity[row, candidates]
+                    best = int(scores.argmax())
+                    if scores[best] >= self.threshold:
+                        cluster_id = assignments[ordered[candidates[best]].id]
+                assignments[record.id] = cluster_id
+                new_rows.append((record.id, cluster_id, json.dumps(term_counts[index], separators=(',', ':'))))
+            db_instance.save_news_clusters(new_rows)
+            
+        clusters = {}
+        for record in ordered:
+            clusters.setdefault(assignments[record.id], []).append(record)
+        result = sorted(clusters.values(), key=lambda members: (-len(members), -(members[-1].published_ts or 0)))
+        logger.info(f"Clustered {len(records)} articles into {len(result)} stories "
+                    f"({len(new_indexes)} new) in {time.perf_counter() - start:.3f}s")
+        return result
+    
+    def _similarity(self, term_counts, row_indexes):
+        """
+        Cosine similarity of the given rows against all documents, on TF-IDF weights over this window.
+        
+        Works on the sparse (doc, term, weight) triples: common terms go through a
+        small dense matrix over their columns only, rare terms are paired posting
+        by posting. Memory grows with the result (rows x documents), not with the vocabulary.
+        """
+        import numpy as np
+        
+        # Sparse coordinates (doc, term, count) of the window
+        vocabulary = {}
+        doc_ids, term_ids, counts = [], [], []
+        for doc, terms in enumerate(term_counts):
+            for term, count in terms.items():
+                doc_ids.append(doc)
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        
+        # Sublinear tf with smoothed idf
+        n_docs = len(term_counts)
+        document_frequency = np.bincount(term_ids, minlength=len(vocabulary))
+        idf = np.log((1 + n_docs) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(np.asarray(counts, dtype=np.float64))) * idf[term_ids]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights ** 2, minlength=n_docs))
+        weights /= np.where(norms > 0, norms, 1)[doc_ids]
+        
+        
+        n_rows = len(row_indexes)
+        row_of_doc = np.full(n_docs, -1, dtype=np.int64)
+        row_of_doc[row_indexes] = np.arange(n_rows)
+        
+        # Common terms: dense product over just their columns
+        common = document_frequency > DENSE_TERM_MIN_DOCS
+        column = np.cumsum(common) - 1
+        dense = common[term_ids]
+        matrix = np.zeros((n_docs, int(common.sum())))
+        matrix[doc_ids[dense], column[term_ids[dense]]] = weights[dense]
+        similarity = matrix[row_indexes] @ matrix.T
+        
+        # Rare terms: pair every triple of a row document with the postings of its term
+        rare = np.flatnonzero(~dense)
+        postings_order = rare[np.argsort(term_ids[rare], kind='stable')]
+        offsets = np.concatenate(([0], np.cumsum(np.where(common, 0, document_frequency))))
+        query = rare[row_of_doc[doc_ids[rare]] >= 0]
+        lengths = document_frequency[term_ids[query]]
+        ends = np.cumsum(lengths)
+        within = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths, lengths)
+        postings = postings_order[np.repeat(offsets[term_ids[query]], lengths) + within]
+        pairs = np.repeat(row_of_doc[doc_ids[query]], lengths) * n_docs + doc_ids[postings]
+        products = np.repeat(weights[query], lengths) * weights[postings]
+        similarity += np.bincount(pairs, weights=products, minlength=n_rows * n_docs).reshape(n_rows, n_docs)
+        return similarity
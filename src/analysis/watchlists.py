@@ -0,0 +1,104 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Coins fetched from CoinGecko when no watchlists are configured
+DEFAULT_COINS = ["bitcoin", "ethereum", "ripple", "cardano", "solana"]
+
+def load_watchlists(config):
+    """
+    Read watchlist definitions from the "watchlists" config section.
+    
+    Each entry maps a name to a list of coins or to a dict, e.g.
+    {"majors": ["bitcoin", "ethereum"], "l1": {"coins": ["SOL", "ADA", "AVAX"], "hours": 24, "limit": 50}}.
+    Coins may be CoinGecko ids, ticker symbols or names.
+    
+    Returns:
+        Dictionary of name -> {"coins": [...], "hours": int or None, "limit": int}
+    """
+    watchlists = {}
+    for name, definition in config.get("watchlists", {}).items():
+        if isinstance(definition, list):
+            definition = {"coins": definition}
+        coins = [coin for coin in definition.get("coins", []) if coin]
+        if not coins:
+            logger.warning(f"Watchlist {name} has no coins; skipping it")
+            continue
+        watchlists[name] = {
+            "coins": coins,
+            "hours": definition.get("hours"),
+            "limit": definition.get("limit", 100)
+        }
+    return watchlists
+
+def watched_coins(watchlists, resolve=None):
+    """Coin ids of all watchlists combined, for the one shared CoinGecko fetch"""
+    resolve = resolve or (lambda coin: coin)
+    coins = sorted({resolve(coin) for watchlist in watchlists.values() for coin in watchlist["coins"]})
+    return coins or list(DEFAULT_COINS)
+
+class WatchlistReporter:
+    """
+    Produces one analysis and report pair per watchlist from the shared news store.
+    
+    Watchlists run in parallel threads; the number of simultaneous LLM requests
+    is bounded separately by the analyzer's process-wide semaphore
+    ("openai.max_concurrency"), so adding watchlists never floods the API.
+    """
+    
+    def __init__(self, analyzer, report_generator, watchlists, max_workers=8):
+        self.analyzer = analyzer
+        self.report_generator = report_generator
+        self.watchlists = watchlists
+        self.max_workers = max_workers
+        
+    def run(self, db_instance, hours=8):
+        """
+        Analyze and report every watchlist.
+        
+        Returns:
+            Dictionary of watchlist name -> {"analysis", "html_report", "text_report"}
+        """
+        if not self.watchlists:
+            return {}
+        start = time.perf_counter()
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.watchlists)),
+                                thread_name_prefix="watchlist") as pool:
+            futures = {
+                pool.submit(self._run_watchlist, db_instance, name, watchlist, hours): name
+                for name, watchlist in self.watchlists.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error(f"Watchlist {name} failed: {e}")
+                    results[name] = {"analysis": {"error": str(e)}, "html_report": None, "text_report": None}
+        logger.info(f"Processed {len(results)} watchlists in {time.perf_counter() - start:.1f}s")
+        return results
+    
+    def _run_watchlist(self, db_instance, name, watchlist, hours):
+        coins = [db_instance.resolve_coin(coin) for coin in watchlist["coins"]]
+        hours = watchlist["hours"] or hours
+        analysis = self.analyzer.analyze_recent_news(
+            db_instance, hours=hours, limit=watchlist["limit"], coins=coins, watchlist=name
+        )
+        result = {"analysis": analysis, "html_report": None, "text_report": None}
+        if "error" in analysis:
+            logger.error(f"Analysis of watchlist {name} failed: {analysis['error']}")
+            return result
+        if "coins" not in analysis:
+            logger.info(f"No recent news for watchlist {name}")
+            return result
+            
+        since_ts = int(time.time()) - hours * 3600
+        coin_mentions = [(coin, count) for coin, count in db_instance.get_coin_mention_counts(since_ts=since_ts)
+                         if coin in coins]
+        result["html_report"] = self.report_generator.generate_html_report(analysis, coin_mentions, name=name)
+        result["text_report"] = self.report_generator.generate_text_report(analysis, coin_mentions, name=name)
+        return result
@@ -0,0 +1,3 @@
+"""
+Read-only HTTP API serving news, analyses and coin mentions from the database.
+"""
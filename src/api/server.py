@@ -0,0 +1,515 @@
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+from src.monitoring.metrics import (HTTP_CACHE_TOTAL, HTTP_REQUEST_SECONDS, HTTP_RESPONSES_TOTAL,
+                                    SSE_DISCONNECTS_TOTAL, SSE_SUBSCRIBERS)
+from src.storage.connection_pool import ConnectionPool
+from src.storage.replica import replica_path
+from src.storage.database import NewsDatabase
+from src.storage.events import Subscription, broadcaster
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_API = {
+    "host": "127.0.0.1",
+    "port": 8080,
+    "pool_size": 4,
+    "cache_entries": 512,
+    "version_check_seconds": 1.0,
+    "page_size": 50,
+    "max_page_size": 200,
+    "replay_size": 1000,
+    "client_queue_size": 256,
+    "client_timeout_seconds": 30,
+    "heartbeat_seconds": 15,
+    # Read from the replica kept up to date by --replicate instead of the live database
+    "use_replica": False,
+}
+
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 500: "Internal Server Error"}
+
+class ApiError(Exception):
+    """Error answered with `status` and a JSON {"error": message} body"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ResponseCache:
+    """
+    LRU cache of encoded responses for one data version.
+    
+    Entries are (status, body, etag) tuples. Responses only change when news,
+    analyses or the coin index change, so instead of expiring entries one by
+    one the whole cache is dropped when the data version moves on.
+    """
+    
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.version = None
+        self._entries = OrderedDict()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+    
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, version=None):
+        self._entries.clear()
+        self.version = version
+
+def _etag(body):
+    return f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+class NewsApiServer:
+    """
+    Read-only JSON API on top of NewsDatabase, served by asyncio.
+    
+    Endpoints:
+        GET /news?limit=&cursor=&source=&coin=&since=   newest first, keyset paginated
+        GET /analyses/latest                            most recent stored analysis
+        GET /coins/{id}?limit=&cursor=                  coin info, 24h mentions and its news
+        GET /search?q=&limit=                           title/body search
+        GET /events?coin=&source=&types=                Server-Sent Events of new articles and analyses
+    
+    The event loop only parses requests and writes responses; queries run on a
+    small thread pool that borrows connections from a read-only ConnectionPool
+    of the same size. Encoded responses are cached in memory and dropped when
+    an ingest, analysis or coin index run changes the data, which is checked at
+    most every `version_check_seconds`. Every response carries an ETag so
+    clients can revalidate with If-None-Match and get an empty 304.
+    
+    /events streams the change events that NewsDatabase and LLMAnalyzer
+    publish in this process, so it is live when the API runs inside the
+    collector (`--continuous --serve-api`). Each client has a bounded queue;
+    one that falls `client_queue_size` events behind, or doesn't accept data
+    for `client_timeout_seconds`, is disconnected and resumes from the replay
+    buffer with Last-Event-ID when it reconnects.
+    
+    With use_replica the queries read the replica kept up to date by
+    `--replicate`, so they never contend with the collector's writes.
+    
+    Configure it in the "api" section of the config file.
+    """
+    
+    def __init__(self, config_path="config/api_config.json", host=None, port=None):
+        self.db = NewsDatabase(config_path)
+        self.settings = dict(DEFAULT_API, **self.db.config.get("api", {}))
+        self.host = host or self.settings["host"]
+        self.port = self.settings["port"] if port is None else port
+        
+        self.pool = None
+        if self.db.db_type == "sqlite":
+            db_path = replica_path(self.db.config, self.db.db_path) if self.settings["use_replica"] else self.db.db_path
+            self.pool = ConnectionPool(db_path, size=self.settings["pool_size"])
+            self.db.use_pool(self.pool)
+        self.executor = ThreadPoolExecutor(max_workers=self.settings["pool_size"], thread_name_prefix="api-db")
+        self.cache = ResponseCache(self.settings["cache_entries"])
+        self._inflight = {}
+        self._version_checked_at = 0
+        self._server = None
+        self._loop = None
+        broadcaster.enable(self.settings["replay_size"])
+        broadcaster.add_listener(self._on_change)
+    
+    def data_version(self):
+        """Token that changes whenever news, analyses or the coin index change"""
+        if self.db.db_type != "sqlite":
+            # Without a cheap change marker the cache simply expires every check interval
+            return int(time.time() // self.settings["version_check_seconds"])
+        conn = self.db._get_connection()
+        try:
+            return conn.execute('''
+            SELECT (SELECT MAX(id) FROM news),
+                   (SELECT MAX(id) FROM news_analysis),
+                   (SELECT value FROM maintenance_state WHERE key = 'coin_index_last_news_id'),
+                   (SELECT MAX(updated_at) FROM coins)
+            ''').fetchone()
+        finally:
+            conn.close()
+    
+    def invalidate(self):
+        """Drop cached responses, e.g. after an in-process ingest"""
+        self.cache.invalidate()
+        self._version_checked_at = 0
+    
+    def _on_change(self, event):
+        # Called on the publishing thread; an in-process ingest shows up without waiting for the next check
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.invalidate)
+    
+    async def _check_version(self):
+        now = time.monotonic()
+        if now - self._version_checked_at < self.settings["version_check_seconds"]:
+            return
+        self._version_checked_at = now
+        version = await self._loop.run_in_executor(self.executor, self.data_version)
+        if version != self.cache.version:
+            if self.cache.version is not None:
+                logger.debug(f"Data version changed, dropping {len(self.cache)} cached responses")
+            self.cache.invalidate(version)
+    
+    # Routing
+    
+    def _route(self, path):
+        """Return (route name, handler, path arguments) for a request path"""
+        path = path.rstrip("/") or "/"
+        if path == "/news":
+            return "news", self._news, ()
+        if path == "/analyses/latest":
+            return "analyses_latest", self._latest_analysis, ()
+        if path == "/search":
+            return "search", self._search, ()
+        if path.startswith("/coins/") and path.count("/") == 2:
+            return "coin", self._coin, (unquote(path[len("/coins/"):]),)
+        return "unknown", None, ()
+    
+    async def respond(self, method, target, if_none_match=None):
+        """
+        Answer one request.
+        
+        Returns:
+            Tuple of (status, body bytes, etag or None)
+        """
+        start = time.perf_counter()
+        url = urlsplit(target)
+        route, handler, args = self._route(url.path)
+        try:
+            if method not in ("GET", "HEAD"):
+                raise ApiError(405, f"Method {method} not allowed")
+            if handler is None:
+                raise ApiError(404, f"No route for {url.path}")
+            
+            params = dict(parse_qsl(url.query))
+            # Same parameters in any order share one cache entry
+            key = (route, args, urlencode(sorted(params.items())))
+            await self._check_version()
+            entry = self.cache.get(key)
+            if entry is not None:
+                HTTP_CACHE_TOTAL.inc(result="hit")
+            else:
+                HTTP_CACHE_TOTAL.inc(result="miss")
+                entry = await self._compute(key, handler, args, params)
+            status, body, etag = entry
+        except ApiError as e:
+            status, body, etag = self._encode(e.status, {"error": str(e)})
+        
+        if etag and if_none_match and status == 200 and _etag_matches(if_none_match, etag):
+            HTTP_CACHE_TOTAL.inc(result="not_modified")
+            status, body = 304, b""
+        HTTP_RESPONSES_TOTAL.inc(route=route, status=str(status))
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route=route)
+        return status, body, etag
+    
+    async def _compute(self, key, handler, args, params):
+        """Run a handler on the thread pool; concurrent misses for one key share a single query"""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        version = self.cache.version
+        future = self._loop.run_in_executor(self.executor, self._call, handler, args, params)
+        self._inflight[key] = future
+        try:
+            entry = await future
+        finally:
+            self._inflight.pop(key, None)
+        # Server errors are not cached, and neither are results of a version that was replaced meanwhile
+        if entry[0] < 500 and self.cache.version == version:
+            self.cache.put(key, entry)
+        return entry
+    
+    def _call(self, handler, args, params):
+        try:
+            status, payload = handler(*args, params)
+        except ApiError as e:
+            status, payload = e.status, {"error": str(e)}
+        except ValueError as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            logger.error(f"Error answering API request: {e}")
+            status, payload = 500, {"error": "Internal server error"}
+        return self._encode(status, payload)
+    
+    def _encode(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return status, body, _etag(body)
+    
+    # Handlers, run on the thread pool
+    
+    def _int_param(self, params, name, default, minimum=None, maximum=None):
+        value = params.get(name)
+        if value is None or value == "":
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise ApiError(400, f"{name} must be an integer")
+        if minimum is not None and value < minimum:
+            raise ApiError(400, f"{name} must be at least {minimum}")
+        return min(value, maximum) if maximum is not None else value
+    
+    def _page_limit(self, params):
+        return self._int_param(params, "limit", self.settings["page_size"], 1, self.settings["max_page_size"])
+    
+    def _cursor_param(self, params):
+        """Parse a "published_ts:id" cursor as returned in next_cursor"""
+        value = params.get("cursor")
+        if not value:
+            return None
+        try:
+            published_ts, news_id = value.split(":")
+            return (int(published_ts), int(news_id))
+        except ValueError:
+            raise ApiError(400, "cursor must look like <published_ts>:<id>")
+    
+    def _news_page(self, filters, params):
+        limit = self._page_limit(params)
+        records = list(self.db.iter_news(filters, after_cursor=self._cursor_param(params),
+                                         batch_size=limit, limit=limit))
+        mentions = self.db.get_news_coins([record.id for record in records])
+        items = []
+        for record in records:
+            item = record.to_dict()
+            item['coins'] = mentions.get(record.id, [])
+            items.append(item)
+        last = records[-1] if len(records) == limit else None
+        return {"items": items, "next_cursor": f"{last.published_ts}:{last.id}" if last else None}
+    
+    def _news(self, params):
+        filters = {}
+        if params.get("source"):
+            filters["source"] = params["source"]
+        if params.get("coin"):
+            filters["coin"] = self.db.resolve_coin(params["coin"])
+        if params.get("since"):
+            filters["since_ts"] = self._int_param(params, "since", None)
+        return 200, self._news_page(filters, params)
+    
+    def _latest_analysis(self, params):
+        result = self.db.get_latest_analysis()
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        if result.get("analysis") is None:
+            raise ApiError(404, result.get("message", "No analysis found"))
+        return 200, result
+    
+    def _coin(self, term, params):
+        coin_id = self.db.resolve_coin(term)
+        coin = self.db.get_coin(coin_id)
+        page = self._news_page({"coin": coin_id}, params)
+        if coin is None and not page["items"] and not params.get("cursor"):
+            raise ApiError(404, f"Unknown coin: {term}")
+        mentions = dict(self.db.get_coin_mention_counts(since_ts=int(time.time()) - 86400))
+        return 200, {
+            "coin": coin or {"id": coin_id},
+            "mentions_24h": mentions.get(coin_id, 0),
+            "news": page["items"],
+            "next_cursor": page["next_cursor"]
+        }
+    
+    def _search(self, params):
+        query = params.get("q", "").strip()
+        if not query:
+            raise ApiError(400, "q is required")
+        limit = self._page_limit(params)
+        return 200, {"items": [record.to_dict() for record in self.db.search_news(query, limit)]}
+    
+    # HTTP/1.1 transport
+    
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    status, body, _ = self._encode(400, {"error": "Malformed request line"})
+                    writer.write(self._response_head(status, body, None, keep_alive=False) + body)
+                    await writer.drain()
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                # Requests are read-only, so any body is read and ignored
+                length = int(headers.get("content-length") or 0)
+                if length:
+                    await reader.readexactly(length)
+                
+                if method == "GET" and urlsplit(target).path.rstrip("/") == "/events":
+                    await self._stream_events(writer, target, headers.get("last-event-id"))
+                    return
+                
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                status, body, etag = await self.respond(method, target, headers.get("if-none-match"))
+                writer.write(self._response_head(status, body, etag, keep_alive))
+                if method != "HEAD" and status != 304:
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+    
+    def _resolve_coins(self, value):
+        return [self.db.resolve_coin(term.strip()) for term in value.split(",") if term.strip()]
+    
+    async def _stream_events(self, writer, target, last_event_id):
+        """Stream matching change events to one client until it disconnects or falls behind"""
+        params = dict(parse_qsl(urlsplit(target).query))
+        try:
+            coins = await self._loop.run_in_executor(self.executor, self._resolve_coins, params.get("coin", ""))
+            sources = [source for source in params.get("source", "").split(",") if source]
+            types = [event_type for event_type in params.get("types", "").split(",") if event_type]
+            # EventSource sends Last-Event-ID itself on reconnect; the parameter is for other clients
+            last_event_id = last_event_id or params.get("last_event_id")
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            status, body, _ = self._encode(400, {"error": "Last-Event-ID must be an integer"})
+            HTTP_RESPONSES_TOTAL.inc(route="events", status=str(status))
+            writer.write(self._response_head(status, body, None, keep_alive=False) + body)
+            await writer.drain()
+            return
+        
+        queue = asyncio.Queue(maxsize=self.settings["client_queue_size"])
+        overflowed = threading.Event()
+        
+        def deliver(event):
+            if overflowed.is_set():
+                return
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                overflowed.set()
+        
+        loop = self._loop
+        subscription = Subscription(lambda event: loop.call_soon_threadsafe(deliver, event), coins, sources, types)
+        backlog, gap = broadcaster.subscribe(subscription, last_event_id)
+        SSE_SUBSCRIBERS.set(broadcaster.subscriber_count)
+        HTTP_RESPONSES_TOTAL.inc(route="events", status="200")
+        timeout = self.settings["client_timeout_seconds"]
+        try:
+            writer.write(("HTTP/1.1 200 OK\r\n"
+                          "Content-Type: text/event-stream; charset=utf-8\r\n"
+                          "Cache-Control: no-cache\r\n"
+                          "Connection: close\r\n\r\n"
+                          "retry: 3000\n\n").encode("utf-8"))
+            if gap:
+                # The client missed events that are no longer buffered and should reload from /news
+                writer.write(b'event: reset\ndata: {"reason": "replay buffer exceeded"}\n\n')
+            for event in backlog:
+                writer.write(event.text.encode("utf-8"))
+            await asyncio.wait_for(writer.drain(), timeout)
+            
+            # The queue only overflows while a slow client keeps drain() waiting
+            while not overflowed.is_set():
+                try:
+                    event = await asyncio.wait_for(queue.get(), self.settings["heartbeat_seconds"])
+                    writer.write(event.text.encode("utf-8"))
+                except asyncio.TimeoutError:
+                    # Comment line that keeps proxies from closing an idle stream
+                    writer.write(b": keep-alive\n\n")
+                await asyncio.wait_for(writer.drain(), timeout)
+            SSE_DISCONNECTS_TOTAL.inc(reason="slow_client")
+            logger.info(f"Disconnected an event stream client that fell {queue.qsize()} events behind")
+        except asyncio.TimeoutError:
+            SSE_DISCONNECTS_TOTAL.inc(reason="write_timeout")
+        finally:
+            broadcaster.unsubscribe(subscription)
+            SSE_SUBSCRIBERS.set(broadcaster.subscriber_count)
+    
+    def _response_head(self, status, body, etag, keep_alive):
+        lines = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body) if status != 304 else 0}",
+            # Clients may keep responses but must revalidate them with the ETag
+            "Cache-Control: no-cache",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if etag:
+            lines.append(f"ETag: {etag}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+    
+    # Lifecycle
+    
+    async def start(self):
+        """Start listening; the bound port is available as self.port afterwards"""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"API available at http://{self.host}:{self.port}/news")
+        return self._server
+    
+    async def serve(self):
+        """Serve until cancelled"""
+        server = await self.start()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+    
+    def run(self):
+        """Serve in the foreground until interrupted"""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logger.info("API server stopped")
+    
+    def start_in_thread(self):
+        """Serve from a daemon thread and return once the server is listening"""
+        ready = threading.Event()
+        
+        async def serve():
+            try:
+                server = await self.start()
+            finally:
+                ready.set()
+            async with server:
+                await server.serve_forever()
+        
+        thread = threading.Thread(target=asyncio.run, args=(serve(),), name="api-server", daemon=True)
+        thread.start()
+        ready.wait()
+        if self._server is None:
+            raise OSError(f"Could not start API server on {self.host}:{self.port}")
+        return thread
+    
+    def close(self):
+        self.executor.shutdown(wait=False)
+        if self.pool is not None:
+            self.pool.close()
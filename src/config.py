@@ -0,0 +1,98 @@
+import copy
+import json
+import logging
+import os
+import threading
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = "config/api_config.json"
+
+# Environment variables that override values from the config file
+ENV_OVERRIDES = {
+    "OPENAI_API_KEY": ("openai", "api_key"),
+    "OPENAI_MODEL": ("openai", "model"),
+    "OPENAI_BASE_URL": ("openai", "base_url"),
+    "CRYPTOCOMPARE_API_KEY": ("cryptocompare", "api_key"),
+    "CRYPTOPANIC_API_KEY": ("cryptopanic", "api_key"),
+    "COINGECKO_BASE_URL": ("coingecko", "base_url"),
+    "WHATSCRYPTO_DB_TYPE": ("data_storage", "type"),
+    "WHATSCRYPTO_DB_PATH": ("data_storage", "path"),
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+_dotenv_loaded = False
+
+
+def _load_dotenv():
+    """Load a .env file into the environment once, if python-dotenv is installed."""
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    _dotenv_loaded = True
+    if not os.path.exists(".env"):
+        return
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        logger.warning("Found .env but python-dotenv is not installed; ignoring it")
+        return
+    load_dotenv(".env", override=False)
+
+
+def _apply_env_overrides(config):
+    for env_name, (section, key) in ENV_OVERRIDES.items():
+        value = os.environ.get(env_name)
+        if value:
+            config.setdefault(section, {})[key] = value
+    return config
+
+
+def load_config(config_path=DEFAULT_CONFIG_PATH):
+    """
+    Load the API configuration, shared by every component of the process.
+    
+    The file is parsed once per path and re-read only when its modification
+    time changes. Environment variables listed in ENV_OVERRIDES take
+    precedence over the file. Every call gets its own copy, so a component
+    that changes its config doesn't change anyone else's.
+    
+    Args:
+        config_path: Path to the JSON config file
+        
+    Returns:
+        Configuration dictionary (empty if the file can't be read)
+    """
+    _load_dotenv()
+    path = os.path.abspath(config_path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+        
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return copy.deepcopy(cached[1])
+            
+        config = {}
+        if mtime is not None:
+            try:
+                with open(path, 'r') as f:
+                    config = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading config: {e}")
+        else:
+            logger.error(f"Error loading config: {config_path} not found")
+            
+        config = _apply_env_overrides(config)
+        _cache[path] = (mtime, config)
+        return copy.deepcopy(config)
+
+
+def clear_config_cache():
+    """Forget cached configs, e.g. after changing environment variables."""
+    with _cache_lock:
+        _cache.clear()
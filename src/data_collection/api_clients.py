@@ -1,37 +1,79 @@
-import requests
 import json
-import os
 import logging
-from datetime import datetime
+import threading
+import time
+from src.config import load_config
+from src.monitoring.metrics import API_REQUEST_SECONDS, API_RESPONSES_TOTAL, API_RESPONSE_BYTES
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class RateLimiter:
+    """Thread-safe limiter spacing calls at most `rate` per second"""
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 class BaseApiClient:
+    provider = "generic"
+
     def __init__(self, config_path="config/api_config.json"):
-        self.config = self._load_config(config_path)
-        
-    def _load_config(self, config_path):
-        try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading config: {e}")
-            return {}
+        self.config = load_config(config_path)
+        provider_config = self.config.get(self.provider, {})
+        rate = provider_config.get("requests_per_second")
+        self.rate_limiter = RateLimiter(rate) if rate else None
+        self.max_retries = provider_config.get("max_retries", 2)
             
-    def make_request(self, url, params=None, headers=None):
+    def make_request(self, url, params=None, headers=None, ok_statuses=(200,)):
+        """
+        GET `url` and return the decoded JSON, or None if the request failed.
+        Responses with a status in `ok_statuses` are returned rather than treated as failures.
+        """
+        # Imported lazily so commands that never hit the network start fast
+        import requests
+        
+        start = time.perf_counter()
         try:
             logger.info(f"Making request to: {url}")
             if headers:
                 logger.info(f"With headers: {headers}")
-            response = requests.get(url, params=params, headers=headers)
+                
+            for attempt in range(self.max_retries + 1):
+                if self.rate_limiter:
+                    self.rate_limiter.wait()
+                response = requests.get(url, params=params, headers=headers)
+                
+                API_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=self.provider)
+                API_RESPONSES_TOTAL.inc(provider=self.provider, status=response.status_code)
+                API_RESPONSE_BYTES.inc(len(response.content), provider=self.provider)
+                
+                if response.status_code != 429 or attempt == self.max_retries:
+                    break
+                    
+                # Rate limited: back off as instructed by Retry-After, or exponentially
+                retry_after = response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt
+                logger.warning(f"Rate limited by {self.provider}, retrying in {delay:.0f}s")
+                time.sleep(delay)
+                start = time.perf_counter()
             
-            if response.status_code != 200:
+            if response.status_code not in ok_statuses:
                 logger.error(f"API request failed with status code {response.status_code}: {response.text}")
                 return None
             
             return response.json()
         except requests.exceptions.RequestException as e:
+            API_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=self.provider)
+            API_RESPONSES_TOTAL.inc(provider=self.provider, status="error")
             logger.error(f"API request failed: {e}")
             return None
         except json.JSONDecodeError:
@@ -39,20 +81,29 @@ class BaseApiClient:
             return None
 
 class CryptoCompareClient(BaseApiClient):
+    provider = "cryptocompare"
+
     def __init__(self, config_path="config/api_config.json"):
         super().__init__(config_path)
         self.base_url = self.config.get("cryptocompare", {}).get("base_url")
         self.api_key = self.config.get("cryptocompare", {}).get("api_key")
         
-    def get_latest_news(self, categories=None, limit=50):
-        """Fetch latest crypto news from CryptoCompare"""
+    def get_latest_news(self, categories=None, limit=50, before_ts=None):
+        """
+        Fetch latest crypto news from CryptoCompare, optionally only items published before `before_ts`.
+        
+        Returns:
+            List of articles (empty when there are none), or None if the request failed
+        """
         if not self.base_url:
             logger.error("CryptoCompare base URL not configured")
-            return []
+            return None
             
         params = {'limit': limit}
         if categories:
             params['categories'] = categories
+        if before_ts:
+            params['lTs'] = before_ts
             
         headers = {}
         if self.api_key:
@@ -64,19 +115,27 @@ class CryptoCompareClient(BaseApiClient):
             return data['Data']
         elif data:
             logger.error(f"Unexpected response format from CryptoCompare: {data}")
-        return []
+        return None
 
 class CryptoPanicClient(BaseApiClient):
+    provider = "cryptopanic"
+
     def __init__(self, config_path="config/api_config.json"):
         super().__init__(config_path)
         self.base_url = self.config.get("cryptopanic", {}).get("base_url")
         self.api_key = self.config.get("cryptopanic", {}).get("api_key")
         
-    def get_news(self, currencies=None, kind=None, limit=50):
-        """Fetch news from CryptoPanic"""
+    def get_news(self, currencies=None, kind=None, limit=50, page=None):
+        """
+        Fetch news from CryptoPanic, optionally a specific (1-based) result page.
+        
+        Returns:
+            List of posts (empty when there are none or `page` is past the last page),
+            or None if the request failed
+        """
         if not self.base_url or not self.api_key:
             logger.error("CryptoPanic configuration incomplete")
-            return []
+            return None
             
         params = {
             'auth_token': self.api_key,
@@ -88,14 +147,23 @@ class CryptoPanicClient(BaseApiClient):
             params['currencies'] = currencies
         if kind:
             params['kind'] = kind  # 'news' or 'media'
+        if page:
+            params['page'] = page
             
-        data = self.make_request(self.base_url, params=params)
+        # A page past the end is answered with 404 {"detail": "Invalid page."}
+        data = self.make_request(self.base_url, params=params, ok_statuses=(200, 404) if page else (200,))
         
         if data and 'results' in data:
             return data['results']
-        return []
+        if page and data and "invalid page" in str(data.get('detail', '')).lower():
+            return []
+        if data:
+            logger.error(f"Unexpected response format from CryptoPanic: {data}")
+        return None
 
 class CoinGeckoClient(BaseApiClient):
+    provider = "coingecko"
+
     def __init__(self, config_path="config/api_config.json"):
         super().__init__(config_path)
         self.base_url = self.config.get("coingecko", {}).get("base_url")
@@ -117,4 +185,61 @@ class CoinGeckoClient(BaseApiClient):
                 'links': data.get('links', {}),
                 'last_updated': data.get('last_updated')
             }
-        return {} 
\ No newline at end of file
+        return {}
+    
+    def get_market_chart(self, coin_id, days=1, vs_currency="usd"):
+        """
+        Fetch price, market cap and volume samples of a coin for the last `days` days.
+        
+        CoinGecko returns 5-minute samples for 1 day, hourly ones up to 90 days
+        and daily ones beyond.
+        
+        Returns:
+            Tuple of (ts, prices, market_caps, volumes) lists with ts in epoch
+            seconds, or None if the request failed
+        """
+        if not self.base_url:
+            logger.error("CoinGecko base URL not configured")
+            return None
+            
+        data = self.make_request(f"{self.base_url}coins/{coin_id}/market_chart",
+                                 params={'vs_currency': vs_currency, 'days': days})
+        if not data or not data.get('prices'):
+            return None
+        market_caps = {int(ms): value for ms, value in data.get('market_caps', [])}
+        volumes = {int(ms): value for ms, value in data.get('total_volumes', [])}
+        ts, prices, caps, vols = [], [], [], []
+        for ms, price in data['prices']:
+            if price is None:
+                continue
+            ms = int(ms)
+            ts.append(ms // 1000)
+            prices.append(price)
+            caps.append(market_caps.get(ms, float('nan')))
+            vols.append(volumes.get(ms, float('nan')))
+        return ts, prices, caps, vols
+    
+    def get_coin_list(self, top=250):
+        """Fetch id, symbol and name of the `top` coins by market cap, largest first"""
+        if not self.base_url:
+            logger.error("CoinGecko base URL not configured")
+            return []
+            
+        coins = []
+        page = 1
+        while len(coins) < top:
+            per_page = min(250, top - len(coins))
+            data = self.make_request(f"{self.base_url}coins/markets", params={
+                'vs_currency': 'usd',
+                'order': 'market_cap_desc',
+                'per_page': per_page,
+                'page': page
+            })
+            if not isinstance(data, list) or not data:
+                break
+            coins.extend({'id': coin.get('id'), 'symbol': coin.get('symbol'), 'name': coin.get('name')}
+                         for coin in data)
+            if len(data) < per_page:
+                break
+            page += 1
+        return coins
@@ -0,0 +1,148 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from .api_clients import CryptoCompareClient, CryptoPanicClient, RateLimiter
+from .news_fetcher import normalize_cryptocompare_item, normalize_cryptopanic_item
+from src.storage.database import NewsDatabase, to_epoch
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Requests per second used when the config sets no requests_per_second for a source
+DEFAULT_BACKFILL_RATES = {
+    "cryptocompare": 5,
+    "cryptopanic": 1,
+}
+
+class HistoricalBackfill:
+    """
+    Walks the history of CryptoCompare and CryptoPanic backwards until a start date.
+    
+    CryptoCompare is paged with the `lTs` (published before) parameter. The time
+    range is split into one slice per worker and every slice is walked on its
+    own. CryptoPanic pages are fetched in waves of `workers` pages. Each page is
+    written to the database as soon as it arrives, and the job checkpoints are
+    stored in the `backfill_checkpoints` table, so an interrupted backfill
+    continues from the last stored page when it is run again with the same
+    start date. A failed request stops its walker without marking the job
+    done, so the next run retries that page.
+    """
+    
+    def __init__(self, config_path="config/api_config.json", workers=4, page_size=50):
+        self.db = NewsDatabase(config_path)
+        self.cryptocompare = CryptoCompareClient(config_path)
+        self.cryptopanic = CryptoPanicClient(config_path)
+        self.workers = max(1, workers)
+        self.page_size = page_size
+        
+        for client in (self.cryptocompare, self.cryptopanic):
+            if client.rate_limiter is None:
+                client.rate_limiter = RateLimiter(DEFAULT_BACKFILL_RATES[client.provider])
+    
+    def run(self, since):
+        """
+        Backfill all sources back to `since`.
+        
+        Args:
+            since: datetime or YYYY-MM-DD string of the oldest news to collect
+            
+        Returns:
+            Dictionary with the number of new items saved per source
+        """
+        since_ts = to_epoch(since.isoformat() if isinstance(since, datetime) else since)
+        if since_ts is None:
+            raise ValueError(f"Invalid backfill start date: {since!r}")
+        logger.info(f"Starting backfill to {datetime.fromtimestamp(since_ts).isoformat()} with {self.workers} workers")
+        start = time.perf_counter()
+        
+        jobs = self._plan_cryptocompare(since_ts)
+        with ThreadPoolExecutor(max_workers=self.workers + 1) as executor:
+            cc_futures = [executor.submit(self._walk_cryptocompare, job) for job in jobs if not job['done']]
+            cp_future = executor.submit(self._walk_cryptopanic, since_ts)
+            results = {
+                'cryptocompare': sum(future.result() for future in cc_futures),
+                'cryptopanic': cp_future.result()
+            }
+            
+        elapsed = time.perf_counter() - start
+        total = sum(results.values())
+        logger.info(f"Backfill finished: {total} new items in {elapsed:.1f}s ({results})")
+        return results
+    
+    def _plan_cryptocompare(self, since_ts):
+        """Load the slices of an earlier run with the same start date, or create new ones."""
+        prefix = f"cryptocompare:{since_ts}:"
+        jobs = self.db.get_backfill_checkpoints(prefix)
+        if jobs:
+            remaining = sum(1 for job in jobs if not job['done'])
+            logger.info(f"Resuming CryptoCompare backfill: {remaining} of {len(jobs)} slices remaining")
+            return jobs
+            
+        now_ts = int(time.time())
+        step = max(1, (now_ts - since_ts) // self.workers)
+        for index in range(self.workers):
+            slice_end = now_ts if index == 0 else now_ts - index * step
+            slice_start = since_ts if index == self.workers - 1 else now_ts - (index + 1) * step
+            self.db.save_backfill_checkpoint(f"{prefix}{index:03d}", 'cryptocompare', slice_end, slice_start)
+        return self.db.get_backfill_checkpoints(prefix)
+    
+    def _walk_cryptocompare(self, job):
+        """Page backwards through one time slice, from its cursor down to its target."""
+        cursor, target, items = job['cursor'], job['target'], job['items']
+        saved = 0
+        while True:
+            page = self.cryptocompare.get_latest_news(limit=self.page_size, before_ts=cursor)
+            if page is None:
+                logger.warning(f"Stopping {job['job']} at {cursor} after a failed request; run again to resume")
+                return saved
+            in_range = [item for item in page if (item.get('published_on') or 0) >= target]
+            if in_range:
+                saved += self.db.save_news([normalize_cryptocompare_item(item) for item in in_range])
+                items += len(in_range)
+                
+            oldest = min((item.get('published_on') or 0 for item in page), default=None)
+            done = not page or oldest is None or oldest < target or oldest >= cursor
+            if not done:
+                cursor = oldest
+            self.db.save_backfill_checkpoint(job['job'], 'cryptocompare', cursor, target, done, items)
+            if done:
+                return saved
+    
+    def _walk_cryptopanic(self, since_ts):
+        """Fetch CryptoPanic pages in parallel waves until they are older than `since_ts`."""
+        job = f"cryptopanic:{since_ts}"
+        checkpoints = self.db.get_backfill_checkpoints(job)
+        checkpoint = checkpoints[0] if checkpoints else {'cursor': 1, 'done': False, 'items': 0}
+        if checkpoint['done']:
+            return 0
+            
+        page, items, saved = checkpoint['cursor'], checkpoint['items'], 0
+        if page > 1:
+            logger.info(f"Resuming CryptoPanic backfill at page {page}")
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                pages = list(range(page, page + self.workers))
+                results = executor.map(lambda p: self.cryptopanic.get_news(limit=self.page_size, page=p), pages)
+                
+                done = stopped = False
+                # Store pages in order so the checkpoint never skips an unsaved page
+                for number, posts in zip(pages, results):
+                    if posts is None:
+                        logger.warning(f"Stopping CryptoPanic backfill at page {number} after a failed request; "
+                                       f"run again to resume")
+                        stopped = True
+                        break
+                    in_range = [post for post in posts if (to_epoch(post.get('published_at')) or 0) >= since_ts]
+                    if in_range:
+                        saved += self.db.save_news([normalize_cryptopanic_item(post) for post in in_range])
+                        items += len(in_range)
+                    page = number + 1
+                    if len(in_range) < len(posts) or not posts:
+                        done = True
+                        break
+                        
+                self.db.save_backfill_checkpoint(job, 'cryptopanic', page, since_ts, done, items)
+                if done or stopped:
+                    return saved
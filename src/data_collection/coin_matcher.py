@@ -0,0 +1,154 @@
+import logging
+from collections import deque
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tickers that are ordinary English words or crypto jargon; only matched as cashtags ($ONE)
+AMBIGUOUS_SYMBOLS = {
+    'A', 'AI', 'ALL', 'AND', 'ANY', 'ARE', 'BE', 'BIG', 'BIT', 'BUY', 'CAN', 'CEO', 'DAO', 'DEFI',
+    'DEX', 'ETF', 'FOR', 'GAS', 'GET', 'GO', 'HAS', 'HOT', 'IN', 'IS', 'IT', 'KEY', 'MAX', 'ME',
+    'NEW', 'NFT', 'NOW', 'OF', 'ON', 'ONE', 'OR', 'OUT', 'PAY', 'SEC', 'SO', 'THE', 'TO', 'UP',
+    'US', 'USD', 'WE', 'WIN', 'YOU'
+}
+
+# Coin names that are ordinary English words or phrases; only matched as written
+# by the coin (e.g. "Optimism", not "optimism") and not where every sentence or
+# headline word is capitalized anyway
+AMBIGUOUS_NAMES = {
+    'ark', 'aurora', 'avalanche', 'beam', 'blur', 'celsius', 'compound', 'core', 'dash', 'dogs',
+    'flare', 'flow', 'gas', 'golem', 'harmony', 'helium', 'immutable', 'injective', 'iota', 'just',
+    'mantra', 'movement', 'oasis', 'ocean', 'optimism', 'origin', 'osmosis', 'quant', 'radiant',
+    'render', 'safe', 'sky', 'sonic', 'stacks', 'status', 'stellar', 'story', 'tether', 'the graph',
+    'the sandbox', 'theta', 'usual', 'waves', 'wormhole'
+}
+
+class AhoCorasick:
+    """
+    Compiled multi-pattern matcher; one pass over the text finds every
+    occurrence of every pattern, independent of the number of patterns.
+    """
+    
+    def __init__(self, patterns):
+        # patterns: {pattern string: value}; states are indexes into the three lists below
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for pattern, value in patterns.items():
+            self._add(pattern, value)
+        self._build()
+        
+    def _add(self, pattern, value):
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append((len(pattern), value))
+        
+    def _build(self):
+        """Breadth-first pass computing failure links and merged outputs"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                if self.fail[next_state] == next_state:
+                    self.fail[next_state] = 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+                
+    def iter_matches(self, text):
+        """Yield (start, end, value) for every pattern occurrence in text"""
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, value in output[state]:
+                yield index - length + 1, index + 1, value
+
+class CoinMatcher:
+    """
+    Finds coin mentions in article text by name (any case) or ticker symbol (upper case).
+    
+    Names in AMBIGUOUS_NAMES only count in the coin's own capitalization,
+    inside a sentence of a text that isn't Title Case, so "Core inflation" and
+    "Safe Haven Demand Rises" don't mention a coin but "the Optimism network" does.
+    """
+    
+    def __init__(self, coins):
+        """
+        Args:
+            coins: Iterable of {'id', 'symbol', 'name'} dicts, most important coin first;
+                   when several coins share a name or symbol the first one wins
+        """
+        names, word_names, symbols = {}, {}, {}
+        for coin in coins:
+            coin_id = coin.get('id')
+            if not coin_id:
+                continue
+            name = (coin.get('name') or '').strip()
+            if len(name) >= 3 and name.lower() in AMBIGUOUS_NAMES:
+                word_names.setdefault(name, coin_id)
+            elif len(name) >= 3:
+                names.setdefault(name.lower(), coin_id)
+            symbol = (coin.get('symbol') or '').strip().upper()
+            if symbol:
+                symbols.setdefault('$' + symbol, coin_id)
+                if len(symbol) >= 2 and symbol not in AMBIGUOUS_SYMBOLS:
+                    symbols.setdefault(symbol, coin_id)
+        self.coin_ids = set(names.values()) | set(word_names.values()) | set(symbols.values())
+        self._names = AhoCorasick(names)
+        self._word_names = AhoCorasick(word_names)
+        self._symbols = AhoCorasick(symbols)
+        
+    def match(self, *texts):
+        """Return the sorted coin ids mentioned in any of the given texts"""
+        found = set()
+        for text in texts:
+            if not text:
+                continue
+            found.update(self._find(self._names, text.lower()))
+            found.update(self._find(self._symbols, text))
+            if self._word_names.goto[0] and not _is_title_case(text):
+                found.update(self._find(self._word_names, text, mid_sentence=True))
+        return sorted(found)
+    
+    def _find(self, automaton, text, mid_sentence=False):
+        """Whole-word matches, preferring the longest at each position ("Bitcoin Cash" over "Bitcoin")"""
+        matches = [
+            (start, end, value) for start, end, value in automaton.iter_matches(text)
+            if _is_boundary(text, start - 1) and _is_boundary(text, end)
+            and not (mid_sentence and _starts_sentence(text, start))
+        ]
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        covered_until = 0
+        for start, end, value in matches:
+            if start >= covered_until:
+                covered_until = end
+                yield value
+
+def _is_boundary(text, index):
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+def _starts_sentence(text, index):
+    """Whether the word at `index` is the first of a sentence, where any word is capitalized"""
+    index -= 1
+    while index >= 0 and text[index] in ' \t"\'(\u201c\u2018':
+        index -= 1
+    return index < 0 or text[index] in '.!?:;\n\u2022-\u2013\u2014|'
+
+def _is_title_case(text):
+    """Whether most longer words are capitalized, as in many headlines"""
+    words = [word for word in text.split() if len(word) > 3 and word[0].isalpha()]
+    return len(words) >= 3 and sum(word[0].isupper() for word in words) > len(words) * 0.6
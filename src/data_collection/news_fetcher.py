@@ -5,6 +5,41 @@ from .api_clients import CryptoCompareClient, CryptoPanicClient, CoinGeckoClient
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def normalize_cryptocompare_item(item, collected_at=None):
+    """Convert a raw CryptoCompare article to the common news schema"""
+    return {
+        'source': 'cryptocompare',
+        'title': item.get('title', ''),
+        'body': item.get('body', ''),
+        'published_at': item.get('published_on'),
+        'url': item.get('url', ''),
+        'source_name': item.get('source', ''),
+        'categories': item.get('categories', ''),
+        'collected_at': collected_at or datetime.now().isoformat()
+    }
+
+def normalize_cryptopanic_item(item, collected_at=None):
+    """Convert a raw CryptoPanic post to the common news schema"""
+    # Extract currency codes properly from the currencies list of dictionaries
+    currencies = []
+    for currency in item.get('currencies') or []:
+        if isinstance(currency, dict) and 'code' in currency:
+            currencies.append(currency['code'])
+        elif isinstance(currency, str):
+            currencies.append(currency)
+    
+    source = item.get('source')
+    return {
+        'source': 'cryptopanic',
+        'title': item.get('title', ''),
+        'body': '',  # CryptoPanic doesn't provide full body in free tier
+        'published_at': item.get('published_at'),
+        'url': item.get('url', ''),
+        'source_name': source.get('title', '') if isinstance(source, dict) else (source or ''),
+        'categories': ', '.join(currencies),  # Now using our properly processed currencies list
+        'collected_at': collected_at or datetime.now().isoformat()
+    }
+
 class NewsFetcher:
     def __init__(self, config_path="config/api_config.json"):
         self.cryptocompare = CryptoCompareClient(config_path)
@@ -19,45 +54,19 @@ class NewsFetcher:
         
         # Get news from CryptoCompare
         logger.info("Fetching news from CryptoCompare...")
-        cc_news = self.cryptocompare.get_latest_news(limit=limit)
+        cc_news = self.cryptocompare.get_latest_news(limit=limit) or []
         logger.info(f"Retrieved {len(cc_news)} news items from CryptoCompare")
         
         for item in cc_news:
-            all_news.append({
-                'source': 'cryptocompare',
-                'title': item.get('title', ''),
-                'body': item.get('body', ''),
-                'published_at': item.get('published_on'),
-                'url': item.get('url', ''),
-                'source_name': item.get('source', ''),
-                'categories': item.get('categories', ''),
-                'collected_at': datetime.now().isoformat()
-            })
+            all_news.append(normalize_cryptocompare_item(item))
         
         # Get news from CryptoPanic
         logger.info("Fetching news from CryptoPanic...")
-        cp_news = self.cryptopanic.get_news(limit=limit)
+        cp_news = self.cryptopanic.get_news(limit=limit) or []
         logger.info(f"Retrieved {len(cp_news)} news items from CryptoPanic")
         
         for item in cp_news:
-            # Extract currency codes properly from the currencies list of dictionaries
-            currencies = []
-            for currency in item.get('currencies', []):
-                if isinstance(currency, dict) and 'code' in currency:
-                    currencies.append(currency['code'])
-                elif isinstance(currency, str):
-                    currencies.append(currency)
-            
-            all_news.append({
-                'source': 'cryptopanic',
-                'title': item.get('title', ''),
-                'body': '',  # CryptoPanic doesn't provide full body in free tier
-                'published_at': item.get('published_at'),
-                'url': item.get('url', ''),
-                'source_name': item.get('source', {}).get('title', ''),
-                'categories': ', '.join(currencies),  # Now using our properly processed currencies list
-                'collected_at': datetime.now().isoformat()
-            })
+            all_news.append(normalize_cryptopanic_item(item))
             
         logger.info(f"Collected {len(all_news)} news items in total")
         return all_news
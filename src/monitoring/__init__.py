@@ -0,0 +1,3 @@
+"""
+Monitoring module for collecting runtime metrics and profiling pipeline stages.
+"""
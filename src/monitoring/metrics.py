@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from fast DB queries up to slow LLM completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Metric:
+    """Base class for a labelled metric family."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.label_names)
+
+    def _format_labels(self, key, extra=None):
+        pairs = list(zip(self.label_names, key))
+        if extra:
+            pairs.extend(extra)
+        if not pairs:
+            return ""
+        escaped = []
+        for label, value in pairs:
+            value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+            escaped.append(f'{label}="{value}"')
+        return "{" + ",".join(escaped) + "}"
+
+
+class Counter(_Metric):
+    """Monotonically increasing value, e.g. number of requests."""
+
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(zip(self.label_names, key)), "value": value}
+                    for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, e.g. rows/sec of the last batch."""
+
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the wrapped block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, state in self._values.items():
+                for bound, count in zip(self.buckets, state["counts"]):
+                    lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{self.name}_bucket{self._format_labels(key, [('le', '+Inf')])} {state['count']}")
+                lines.append(f"{self.name}_sum{self._format_labels(key)} {state['sum']}")
+                lines.append(f"{self.name}_count{self._format_labels(key)} {state['count']}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return [{
+                "labels": dict(zip(self.label_names, key)),
+                "count": state["count"],
+                "sum": state["sum"],
+                "buckets": dict(zip([str(b) for b in self.buckets], state["counts"]))
+            } for key, state in self._values.items()]
+
+
+class MetricsRegistry:
+    """Holds all metric families of the process and exports them."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.started_at = datetime.now().isoformat()
+
+    def _get_or_create(self, cls, name, help_text, label_names, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, label_names, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def gauge(self, name, help_text, label_names=()):
+        return self._get_or_create(Gauge, name, help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Return all metrics as a JSON-serialisable dictionary."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "started_at": self.started_at,
+            "generated_at": datetime.now().isoformat(),
+            "metrics": {
+                metric.name: {
+                    "type": metric.metric_type,
+                    "help": metric.help_text,
+                    "values": metric.snapshot()
+                } for metric in metrics
+            }
+        }
+
+    def write_snapshot(self, path):
+        """Write a JSON snapshot of all metrics to the given path."""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            logger.info(f"Metrics snapshot written to {path}")
+            return path
+        except Exception as e:
+            logger.error(f"Error writing metrics snapshot: {e}")
+            return None
+
+
+registry = MetricsRegistry()
+
+# Outgoing API calls (CryptoCompare, CryptoPanic, CoinGecko)
+API_REQUEST_SECONDS = registry.histogram(
+    "whatscrypto_api_request_seconds", "Latency of outgoing API requests", ["provider"])
+API_RESPONSES_TOTAL = registry.counter(
+    "whatscrypto_api_responses_total", "API responses by status code", ["provider", "status"])
+API_RESPONSE_BYTES = registry.counter(
+    "whatscrypto_api_response_bytes_total", "Bytes received from APIs", ["provider"])
+
+# Database
+DB_ROWS_INSERTED = registry.counter(
+    "whatscrypto_db_rows_inserted_total", "Rows inserted into the database", ["table"])
+DB_INSERT_SECONDS = registry.histogram(
+    "whatscrypto_db_insert_seconds", "Duration of database insert batches", ["table"])
+DB_INSERT_ROWS_PER_SECOND = registry.gauge(
+    "whatscrypto_db_insert_rows_per_second", "Insert throughput of the last batch", ["table"])
+DB_QUERY_SECONDS = registry.histogram(
+    "whatscrypto_db_query_seconds", "Duration of database queries", ["query"])
+
+# LLM analysis
+LLM_REQUEST_SECONDS = registry.histogram(
+    "whatscrypto_llm_request_seconds", "Latency of LLM completion requests", ["model"])
+LLM_TOKENS_TOTAL = registry.counter(
+    "whatscrypto_llm_tokens_total", "LLM tokens used", ["model", "kind"])
+LLM_COST_USD_TOTAL = registry.counter(
+    "whatscrypto_llm_cost_usd_total", "Estimated LLM cost in USD", ["model"])
+
+# Reports
+REPORT_RENDER_SECONDS = registry.histogram(
+    "whatscrypto_report_render_seconds", "Time to render a report", ["format"])
+
+# Read-only HTTP API
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "whatscrypto_http_request_seconds", "Time to answer HTTP API requests", ["route"])
+HTTP_RESPONSES_TOTAL = registry.counter(
+    "whatscrypto_http_responses_total", "HTTP API responses by status code", ["route", "status"])
+HTTP_CACHE_TOTAL = registry.counter(
+    "whatscrypto_http_cache_total", "HTTP API response cache lookups", ["result"])
+SSE_SUBSCRIBERS = registry.gauge(
+    "whatscrypto_sse_subscribers", "Clients connected to the /events stream")
+SSE_DISCONNECTS_TOTAL = registry.counter(
+    "whatscrypto_sse_disconnects_total", "Event stream clients disconnected by the server", ["reason"])
+
+# Read replica
+REPLICA_SYNC_SECONDS = registry.histogram(
+    "whatscrypto_replica_sync_seconds", "Time to snapshot or sync the read replica", ["mode"])
+REPLICA_ROWS_TOTAL = registry.counter(
+    "whatscrypto_replica_rows_total", "Changed rows applied to the read replica")
+
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve the registry on http://host:port/metrics from a background thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.error(f"Could not start metrics server on {host}:{port}: {e}")
+        return None
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,105 @@
+import cProfile
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class StageProfiler:
+    """Profiles pipeline stages with cProfile and tracemalloc.
+
+    Each profiled cycle gets its own directory under `output_root` holding a
+    `<stage>.pstats` file, a `<stage>_alloc.txt` file with the top allocation
+    diffs and a `summary.json` with durations and memory usage per stage.
+    """
+
+    def __init__(self, output_root="data/profiles", top_n=25, every=1, enabled=True):
+        self.enabled = enabled
+        self.output_root = output_root
+        self.top_n = top_n
+        self.every = max(1, every)
+        self.cycle = 0
+        self.output_dir = None
+        self._summary = []
+
+    @property
+    def active(self):
+        return self.output_dir is not None
+
+    def begin_cycle(self):
+        """Start a new cycle; returns True if this cycle is sampled."""
+        self.cycle += 1
+        if not self.enabled or (self.cycle - 1) % self.every != 0:
+            self.output_dir = None
+            return False
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.output_dir = os.path.join(self.output_root, timestamp)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._summary = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        logger.info(f"Profiling cycle {self.cycle} into {self.output_dir}")
+        return True
+
+    def end_cycle(self):
+        """Write the cycle summary and stop tracing allocations."""
+        if not self.active:
+            return None
+        summary_path = os.path.join(self.output_dir, "summary.json")
+        try:
+            with open(summary_path, "w") as f:
+                json.dump({"cycle": self.cycle, "stages": self._summary}, f, indent=2)
+        except Exception as e:
+            logger.error(f"Error writing profile summary: {e}")
+        tracemalloc.stop()
+        output_dir, self.output_dir = self.output_dir, None
+        logger.info(f"Profile written to {output_dir}")
+        return output_dir
+
+    @contextmanager
+    def stage(self, name):
+        """Profile the wrapped block as stage `name` if the current cycle is sampled."""
+        if not self.active:
+            yield
+            return
+        
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            self._write_stage(name, profile, before, after)
+            self._summary.append({
+                "stage": name,
+                "seconds": round(duration, 6),
+                "traced_bytes": current,
+                "peak_bytes": peak
+            })
+
+    def _write_stage(self, name, profile, before, after):
+        try:
+            profile.dump_stats(os.path.join(self.output_dir, f"{name}.pstats"))
+            
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                       tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+            diffs = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+            with open(os.path.join(self.output_dir, f"{name}_alloc.txt"), "w") as f:
+                f.write(f"Top {self.top_n} allocation differences for stage '{name}'\n\n")
+                for stat in diffs[:self.top_n]:
+                    f.write(f"{stat}\n")
+        except Exception as e:
+            logger.error(f"Error writing profile for stage {name}: {e}")
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from .database import NewsDatabase
+from src.data_collection.news_fetcher import normalize_cryptocompare_item, normalize_cryptopanic_item
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NEWS_FIELDS = ('source', 'title', 'body', 'published_at', 'url', 'source_name', 'categories', 'collected_at')
+
+def normalize_archived_item(item, collected_at=None):
+    """Convert an archived item (normalized or raw API format) to the common news schema"""
+    if not isinstance(item, dict):
+        return None
+    if item.get('source') in ('cryptocompare', 'cryptopanic') and 'url' in item:
+        return {field: item.get(field, '') for field in NEWS_FIELDS}
+    if 'published_on' in item:
+        return normalize_cryptocompare_item(item, collected_at)
+    if 'published_at' in item and ('currencies' in item or isinstance(item.get('source'), dict)):
+        return normalize_cryptopanic_item(item, collected_at)
+    return None
+
+def _parse_files(files):
+    """
+    Parse a chunk of archive files in a worker process.
+    
+    Args:
+        files: List of (path, size, mtime) tuples
+        
+    Returns:
+        (parsed, items, errors) where parsed is a list of (path, size, mtime, item_count)
+    """
+    parsed, items, errors = [], [], 0
+    for path, size, mtime in files:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            errors += 1
+            continue
+            
+        # Files hold a single item, a list of items or a raw API response
+        if isinstance(data, dict) and isinstance(data.get('Data'), list):
+            data = data['Data']
+        elif isinstance(data, dict) and isinstance(data.get('results'), list):
+            data = data['results']
+        if not isinstance(data, list):
+            data = [data]
+            
+        collected_at = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(mtime / 1e9))
+        count = 0
+        for entry in data:
+            item = normalize_archived_item(entry, collected_at)
+            if item and item.get('url'):
+                items.append(item)
+                count += 1
+        parsed.append((path, size, mtime, count))
+    return parsed, items, errors
+
+class ArchiveImporter:
+    """
+    Loads JSON news archives (e.g. from save_news_to_files) into the database.
+    
+    Files are parsed in a process pool and each chunk is inserted in one
+    transaction, with duplicates skipped on url. Imported files are recorded
+    with their size and mtime, so files that didn't change since the last
+    import are skipped without being opened. Files of a chunk whose insert
+    failed are not recorded, so the next run imports them again.
+    """
+    
+    def __init__(self, config_path="config/api_config.json", workers=None, files_per_chunk=1000):
+        self.db = NewsDatabase(config_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.files_per_chunk = files_per_chunk
+        
+    def scan(self, root):
+        """Find JSON files under `root` that are new or changed since their last import"""
+        imported = self.db.get_imported_files()
+        pending, skipped = [], 0
+        stack = [os.path.abspath(root)]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.json') and entry.is_file():
+                        stat = entry.stat()
+                        if imported.get(entry.path) == (stat.st_size, stat.st_mtime_ns):
+                            skipped += 1
+                        else:
+                            pending.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return pending, skipped
+    
+    def run(self, root):
+        """
+        Import every new or changed JSON file under `root`.
+        
+        Returns:
+            Dictionary with file, item and timing statistics
+        """
+        start = time.perf_counter()
+        pending, skipped = self.scan(root)
+        stats = {'files': len(pending), 'skipped_files': skipped, 'items': 0, 'saved': 0, 'errors': 0,
+                 'failed_files': 0}
+        logger.info(f"Found {len(pending)} files to import under {root} ({skipped} already imported)")
+        if not pending:
+            stats['seconds'] = time.perf_counter() - start
+            return stats
+            
+        chunks = [pending[i:i + self.files_per_chunk] for i in range(0, len(pending), self.files_per_chunk)]
+        done_files = 0
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # Keep a bounded number of chunks in flight so memory stays flat
+            chunk_iter = iter(chunks)
+            in_flight = set()
+            while True:
+                while len(in_flight) < self.workers * 2:
+                    chunk = next(chunk_iter, None)
+                    if chunk is None:
+                        break
+                    in_flight.add(executor.submit(_parse_files, chunk))
+                if not in_flight:
+                    break
+                    
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    parsed, items, errors = future.result()
+                    try:
+                        if items:
+                            stats['saved'] += self.db.save_news(items, raise_errors=True)
+                    except Exception as e:
+                        # Left unrecorded, so these files are retried by the next import
+                        logger.error(f"Could not save {len(items)} items from {len(parsed)} files, "
+                                     f"not marking them imported: {e}")
+                        stats['failed_files'] += len(parsed)
+                    else:
+                        self.db.mark_files_imported(parsed)
+                    stats['items'] += len(items)
+                    stats['errors'] += errors
+                    done_files += len(parsed) + errors
+                    
+                    elapsed = time.perf_counter() - start
+                    logger.info(f"Imported {done_files}/{len(pending)} files, {stats['items']} items "
+                                f"({done_files / elapsed:.0f} files/s, {stats['items'] / elapsed:.0f} items/s)")
+        
+        stats['seconds'] = time.perf_counter() - start
+        logger.info(f"Import finished: {stats['saved']} new items from {stats['files']} files "
+                    f"in {stats['seconds']:.1f}s ({stats['errors']} unreadable files, "
+                    f"{stats['failed_files']} to retry)")
+        return stats
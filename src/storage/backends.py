@@ -0,0 +1,405 @@
+import logging
+import time
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NEWS_COLUMNS = ('id', 'source', 'title', 'body', 'published_at', 'published_ts', 'url',
+                'source_name', 'categories', 'collected_at', 'analyzed')
+# Columns written on ingest, in the order rows are passed to ingest_news
+INSERT_COLUMNS = ('source', 'title', 'body', 'published_at', 'published_ts', 'url',
+                  'source_name', 'categories', 'collected_at')
+
+class StorageBackend:
+    """
+    Operations every storage backend provides to NewsDatabase.
+    
+    Rows are plain tuples: ingest_news takes tuples in INSERT_COLUMNS order and
+    the query methods return tuples in NEWS_COLUMNS order.
+    """
+    name = "base"
+    
+    def ingest_news(self, rows):
+        """Bulk insert news rows, skipping duplicate urls; returns the number of new rows"""
+        raise NotImplementedError
+    
+    def query_window(self, filters, after_cursor, limit):
+        """Return up to `limit` rows newest first, strictly after the (published_ts, id) cursor"""
+        raise NotImplementedError
+    
+    def save_analysis(self, analysis_data, created_at, news_ids, kind="global"):
+        """
+        Store a JSON analysis, mark the news rows in `news_ids` as analyzed and return the analysis id.
+        `kind` is "global" for market-wide analyses and "coins" for coin/watchlist-focused ones.
+        """
+        raise NotImplementedError
+    
+    def latest_analysis(self, kind="global"):
+        """Return (analysis_data, created_at) of the newest analysis of `kind`, or None"""
+        raise NotImplementedError
+    
+    def search_news(self, query, limit):
+        """Return rows whose title or body contains `query`, newest first"""
+        raise NotImplementedError
+    
+    def lease_store(self):
+        """
+        Return the store RunCoordinator keeps its run leases in, or None to use
+        the SQLite bookkeeping file. Backends shared across hosts provide their own.
+        """
+        return None
+
+def _like_pattern(query):
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+class SQLiteBackend(StorageBackend):
+    """Default backend on the local SQLite file managed by NewsDatabase"""
+    name = "sqlite"
+    
+    def __init__(self, connect):
+        self._connect = connect
+        
+    def ingest_news(self, rows):
+        conn = self._connect()
+        try:
+            # rowcount counts only the inserted news rows; total_changes would also
+            # count rows written by triggers, such as the replica changelog
+            cursor = conn.executemany(f'''
+            INSERT OR IGNORE INTO news ({', '.join(INSERT_COLUMNS)})
+            VALUES ({', '.join('?' for _ in INSERT_COLUMNS)})
+            ''', rows)
+            conn.commit()
+            return max(cursor.rowcount, 0)
+        finally:
+            conn.close()
+            
+    def query_window(self, filters, after_cursor, limit):
+        conditions, params = [], []
+        if filters.get('source'):
+            conditions.append("source = ?")
+            params.append(filters['source'])
+        if filters.get('analyzed') is not None:
+            conditions.append("analyzed = ?")
+            params.append(1 if filters['analyzed'] else 0)
+        if filters.get('since_ts') is not None:
+            conditions.append("published_ts > ?")
+            params.append(filters['since_ts'])
+        if filters.get('until_ts') is not None:
+            conditions.append("published_ts <= ?")
+            params.append(filters['until_ts'])
+        if filters.get('coin'):
+            conditions.append("id IN (SELECT news_id FROM news_coins WHERE coin_id = ?)")
+            params.append(filters['coin'])
+        if filters.get('coins'):
+            coins = list(filters['coins'])
+            conditions.append(f"id IN (SELECT news_id FROM news_coins WHERE coin_id IN ({', '.join('?' for _ in coins)}))")
+            params.extend(coins)
+        if after_cursor is not None:
+            conditions.append("(published_ts, id) < (?, ?)")
+            params.extend(after_cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        conn = self._connect()
+        try:
+            return conn.execute(f'''
+            SELECT {', '.join(NEWS_COLUMNS)} FROM news
+            {where}
+            ORDER BY published_ts DESC, id DESC
+            LIMIT ?
+            ''', params + [limit]).fetchall()
+        finally:
+            conn.close()
+            
+    def save_analysis(self, analysis_data, created_at, news_ids, kind="global"):
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+            INSERT INTO news_analysis (analysis_data, created_at, kind)
+            VALUES (?, ?, ?)
+            ''', (analysis_data, created_at, kind))
+            analysis_id = cursor.lastrowid
+            
+            # Mark only the news items this analysis covered
+            for offset in range(0, len(news_ids), 500):
+                chunk = news_ids[offset:offset + 500]
+                conn.execute(f'''
+                UPDATE news
+                SET analyzed = 1
+                WHERE id IN ({', '.join('?' for _ in chunk)})
+                ''', chunk)
+            conn.commit()
+            return analysis_id
+        finally:
+            conn.close()
+            
+    def latest_analysis(self, kind="global"):
+        conn = self._connect()
+        try:
+            return conn.execute('''
+            SELECT analysis_data, created_at FROM news_analysis
+            WHERE kind = ?
+            ORDER BY created_at DESC
+            LIMIT 1
+            ''', (kind,)).fetchone()
+        finally:
+            conn.close()
+            
+    def search_news(self, query, limit):
+        pattern = _like_pattern(query)
+        conn = self._connect()
+        try:
+            return conn.execute(f'''
+            SELECT {', '.join(NEWS_COLUMNS)} FROM news
+            WHERE title LIKE ? ESCAPE '\\'
+               OR (CASE WHEN typeof(body) = 'blob' THEN news_body(body) ELSE body END) LIKE ? ESCAPE '\\'
+            ORDER BY published_ts DESC, id DESC
+            LIMIT ?
+            ''', (pattern, pattern, limit)).fetchall()
+        finally:
+            conn.close()
+
+class SQLAlchemyBackend(StorageBackend):
+    """
+    Backend for any database SQLAlchemy supports, e.g. a PostgreSQL store shared by several collectors.
+    
+    Configured with {"type": "sqlalchemy", "url": "postgresql+psycopg2://...", "pool_size": 5}.
+    Inserts use the dialect's native upsert (ON CONFLICT DO NOTHING on PostgreSQL
+    and SQLite, INSERT IGNORE on MySQL/MariaDB) in a single statement per batch.
+    """
+    name = "sqlalchemy"
+    
+    def __init__(self, url, pool_size=5, max_overflow=10, echo=False):
+        import sqlalchemy as sa
+        
+        self.sa = sa
+        options = {"pool_pre_ping": True, "echo": echo}
+        if not url.startswith("sqlite"):
+            options.update(pool_size=pool_size, max_overflow=max_overflow)
+        self.engine = sa.create_engine(url, **options)
+        
+        self.metadata = sa.MetaData()
+        self.news = sa.Table(
+            "news", self.metadata,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("source", sa.String(64)),
+            sa.Column("title", sa.Text),
+            sa.Column("body", sa.Text),
+            sa.Column("published_at", sa.String(64)),
+            sa.Column("published_ts", sa.BigInteger),
+            sa.Column("url", sa.String(1024), unique=True),
+            sa.Column("source_name", sa.String(255)),
+            sa.Column("categories", sa.Text),
+            sa.Column("collected_at", sa.String(64)),
+            sa.Column("analyzed", sa.Boolean, default=False, nullable=False),
+            sa.Index("idx_news_published", "published_ts", "id"),
+            sa.Index("idx_news_analyzed", "analyzed", "published_ts"),
+        )
+        self.news_analysis = sa.Table(
+            "news_analysis", self.metadata,
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("analysis_data", sa.Text),
+            sa.Column("created_at", sa.String(64), index=True),
+            sa.Column("kind", sa.String(16), nullable=False, server_default="global"),
+        )
+        self.run_leases = sa.Table(
+            "run_leases", self.metadata,
+            sa.Column("name", sa.String(64), primary_key=True),
+            sa.Column("owner", sa.String(255)),
+            sa.Column("expires_at", sa.Float),
+            sa.Column("acquired_at", sa.String(64)),
+            sa.Column("generation", sa.Integer, nullable=False, default=0),
+            sa.Column("result", sa.Text),
+            sa.Column("finished_at", sa.String(64)),
+        )
+        self.metadata.create_all(self.engine)
+        self._migrate_analysis()
+        self._columns = [self.news.c[name] for name in NEWS_COLUMNS]
+        
+    def _insert_ignore(self, table=None, key="url"):
+        table = self.news if table is None else table
+        dialect = self.engine.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+            return insert(table).on_conflict_do_nothing(index_elements=[key])
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+            return insert(table).on_conflict_do_nothing(index_elements=[key])
+        if dialect in ("mysql", "mariadb"):
+            return table.insert().prefix_with("IGNORE")
+        return None
+        
+    def ingest_news(self, rows):
+        records = [dict(zip(INSERT_COLUMNS, row), analyzed=False) for row in rows]
+        statement = self._insert_ignore()
+        if statement is None:
+            return self._ingest_one_by_one(records)
+            
+        with self.engine.begin() as conn:
+            if self.engine.dialect.insert_executemany_returning:
+                # RETURNING only yields rows that were actually inserted
+                return len(conn.execute(statement.returning(self.news.c.id), records).all())
+            return max(conn.execute(statement, records).rowcount, 0)
+            
+    def _ingest_one_by_one(self, records):
+        """Fallback for dialects without a native upsert"""
+        saved = 0
+        for record in records:
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(self.news.insert(), record)
+                saved += 1
+            except self.sa.exc.IntegrityError:
+                continue
+        return saved
+        
+    def query_window(self, filters, after_cursor, limit):
+        sa, news = self.sa, self.news
+        if filters.get('coin') or filters.get('coins'):
+            raise ValueError("The coin filter needs the news_coins index, which only the sqlite backend has")
+        statement = sa.select(*self._columns)
+        if filters.get('source'):
+            statement = statement.where(news.c.source == filters['source'])
+        if filters.get('analyzed') is not None:
+            statement = statement.where(news.c.analyzed == bool(filters['analyzed']))
+        if filters.get('since_ts') is not None:
+            statement = statement.where(news.c.published_ts > filters['since_ts'])
+        if filters.get('until_ts') is not None:
+            statement = statement.where(news.c.published_ts <= filters['until_ts'])
+        if after_cursor is not None:
+            published_ts, news_id = after_cursor
+            statement = statement.where(sa.or_(
+                news.c.published_ts < published_ts,
+                sa.and_(news.c.published_ts == published_ts, news.c.id < news_id)
+            ))
+        statement = statement.order_by(news.c.published_ts.desc(), news.c.id.desc()).limit(limit)
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(statement)]
+            
+    def _migrate_analysis(self):
+        """Add the kind column to a news_analysis table created before it existed"""
+        columns = [column["name"] for column in self.sa.inspect(self.engine).get_columns("news_analysis")]
+        if "kind" in columns:
+            return
+        logger.info("Adding kind column to news_analysis table")
+        with self.engine.begin() as conn:
+            conn.execute(self.sa.text("ALTER TABLE news_analysis ADD COLUMN kind VARCHAR(16) NOT NULL DEFAULT 'global'"))
+            # Coin-focused analyses carry their coins in the JSON
+            conn.execute(self.sa.text("UPDATE news_analysis SET kind = 'coins' WHERE analysis_data LIKE '%\"coins\": [%'"))
+            
+    def save_analysis(self, analysis_data, created_at, news_ids, kind="global"):
+        with self.engine.begin() as conn:
+            result = conn.execute(self.news_analysis.insert().values(
+                analysis_data=analysis_data, created_at=created_at, kind=kind
+            ))
+            for offset in range(0, len(news_ids), 500):
+                chunk = news_ids[offset:offset + 500]
+                conn.execute(self.news.update().where(self.news.c.id.in_(chunk)).values(analyzed=True))
+            return result.inserted_primary_key[0]
+            
+    def latest_analysis(self, kind="global"):
+        statement = (self.sa.select(self.news_analysis.c.analysis_data, self.news_analysis.c.created_at)
+                     .where(self.news_analysis.c.kind == kind)
+                     .order_by(self.news_analysis.c.created_at.desc()).limit(1))
+        with self.engine.connect() as conn:
+            row = conn.execute(statement).first()
+        return tuple(row) if row else None
+        
+    def search_news(self, query, limit):
+        sa, news = self.sa, self.news
+        pattern = _like_pattern(query)
+        statement = (sa.select(*self._columns)
+                     .where(sa.or_(news.c.title.ilike(pattern, escape='\\'), news.c.body.ilike(pattern, escape='\\')))
+                     .order_by(news.c.published_ts.desc(), news.c.id.desc())
+                     .limit(limit))
+        with self.engine.connect() as conn:
+            return [tuple(row) for row in conn.execute(statement)]
+
+    def lease_store(self):
+        return SQLAlchemyLeaseStore(self)
+
+class SQLAlchemyLeaseStore:
+    """run_leases table in the shared database, so collectors on different hosts coordinate"""
+    
+    def __init__(self, backend):
+        self.backend = backend
+        self.sa = backend.sa
+        self.engine = backend.engine
+        self.table = backend.run_leases
+        
+    def _ensure_row(self, name):
+        record = {"name": name, "owner": None, "expires_at": 0, "generation": 0}
+        statement = self.backend._insert_ignore(self.table, "name")
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(statement if statement is not None else self.table.insert(), record)
+        except self.sa.exc.IntegrityError:
+            pass
+            
+    def acquire(self, name, owner, ttl):
+        """Take the lease if it's free or expired; returns (acquired, current generation)"""
+        sa, table = self.sa, self.table
+        self._ensure_row(name)
+        now = time.time()
+        with self.engine.begin() as conn:
+            row = conn.execute(sa.select(table.c.owner, table.c.expires_at, table.c.generation)
+                               .where(table.c.name == name).with_for_update()).first()
+            if row.owner is not None and row.expires_at >= now and row.owner != owner:
+                return False, row.generation
+            # The conditional update keeps the take-over atomic on databases without row locks
+            taken = conn.execute(
+                table.update()
+                .where(table.c.name == name)
+                .where(sa.or_(table.c.owner.is_(None), table.c.expires_at < now, table.c.owner == owner))
+                .values(owner=owner, expires_at=now + ttl, acquired_at=datetime.now().isoformat())
+            ).rowcount
+            if not taken:
+                return False, row.generation
+            if row.owner is not None and row.owner != owner:
+                logger.warning(f"Taking over expired {name} lease of {row.owner}")
+            return True, row.generation
+            
+    def renew(self, name, owner, ttl):
+        """Extend a lease we hold; returns False if it was lost"""
+        table = self.table
+        with self.engine.begin() as conn:
+            return conn.execute(
+                table.update().where(table.c.name == name).where(table.c.owner == owner)
+                .values(expires_at=time.time() + ttl)
+            ).rowcount > 0
+            
+    def release(self, name, owner, result=None, completed=False):
+        """Give up the lease; a completed run publishes its JSON result and bumps the generation"""
+        table = self.table
+        values = {"owner": None, "expires_at": 0}
+        if completed:
+            values.update(generation=table.c.generation + 1, result=result,
+                          finished_at=datetime.now().isoformat())
+        with self.engine.begin() as conn:
+            conn.execute(table.update().where(table.c.name == name).where(table.c.owner == owner).values(**values))
+            
+    def read(self, name):
+        """Return (owner, expires_at, generation, result) of the lease, or None"""
+        table = self.table
+        statement = (self.sa.select(table.c.owner, table.c.expires_at, table.c.generation, table.c.result)
+                     .where(table.c.name == name))
+        with self.engine.connect() as conn:
+            row = conn.execute(statement).first()
+        return tuple(row) if row else None
+
+def create_backend(db_type, storage_config, connect=None):
+    """Create the backend configured in the data_storage config section"""
+    if db_type == "sqlite":
+        return SQLiteBackend(connect)
+    if db_type == "sqlalchemy":
+        url = storage_config.get("url")
+        if not url:
+            raise ValueError("data_storage.url is required for the sqlalchemy backend")
+        return SQLAlchemyBackend(
+            url,
+            pool_size=storage_config.get("pool_size", 5),
+            max_overflow=storage_config.get("max_overflow", 10),
+            echo=storage_config.get("echo", False)
+        )
+    raise ValueError(f"Unsupported database type: {db_type}")
@@ -0,0 +1,158 @@
+import logging
+import re
+import sqlite3
+import zlib
+from collections import Counter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_BODY_COMPRESSION = {
+    "enabled": False,
+    "level": 6,
+    # Shorter bodies stay TEXT; the gain wouldn't pay for the decompression
+    "min_length": 200,
+    # zlib looks back at most 32 KiB, so a larger dictionary is never used
+    "dict_size": 32768,
+    "train_bytes": 1000000,
+}
+
+# Compressed bodies are BLOBs of MAGIC + 4-byte dictionary key + raw deflate stream
+MAGIC = b"Z1"
+NO_DICTIONARY = b"\0\0\0\0"
+
+# Preset dictionaries by key; blobs name the dictionary they were compressed with
+_dictionaries = {NO_DICTIONARY: None}
+# Databases to reload from when a blob names an unknown dictionary, e.g. one
+# another process trained after this one loaded them
+_sources = set()
+# Compressors/decompressors already primed with a dictionary; copying one is
+# much cheaper than loading 32 KiB of dictionary for every body
+_primed = {}
+_keys = {}
+
+def dictionary_key(dictionary):
+    key = _keys.get(dictionary)
+    if key is None:
+        # OpenSSL-backed hashlib is slow to import; read-only commands never get here
+        import hashlib
+        key = _keys[dictionary] = hashlib.sha1(dictionary).digest()[:4]
+    return key
+
+def register_dictionary(dictionary):
+    """Make a dictionary available for decompression and return its key"""
+    key = dictionary_key(dictionary)
+    _dictionaries[key] = dictionary
+    return key
+
+def load_dictionaries(conn, after_id=0, db_path=None):
+    """
+    Register the dictionaries stored in the body_dictionaries table.
+    
+    Returns:
+        List of (id, dictionary) rows with id > after_id, oldest first
+    """
+    if db_path:
+        _sources.add(db_path)
+    rows = conn.execute("SELECT id, dictionary FROM body_dictionaries WHERE id > ? ORDER BY id", (after_id,)).fetchall()
+    for _, dictionary in rows:
+        register_dictionary(dictionary)
+    return rows
+
+def encode_body(text, dictionary=None, level=6, min_length=200):
+    """
+    Compress an article body.
+    
+    Returns:
+        A BLOB (bytes) when compression pays off, otherwise the text unchanged
+    """
+    if not text or len(text) < min_length:
+        return text
+    raw = text.encode("utf-8")
+    key = dictionary_key(dictionary) if dictionary else NO_DICTIONARY
+    primed = _primed.get(("compress", key, level))
+    if primed is None:
+        if dictionary:
+            primed = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary)
+        else:
+            primed = zlib.compressobj(level, zlib.DEFLATED, -15)
+        _primed[("compress", key, level)] = primed
+    compressor = primed.copy()
+    compressed = MAGIC + key + compressor.compress(raw) + compressor.flush()
+    return compressed if len(compressed) < len(raw) else text
+
+def _decompressor(value):
+    key = bytes(value[2:6])
+    if key not in _dictionaries:
+        for db_path in list(_sources):
+            conn = sqlite3.connect(db_path)
+            try:
+                load_dictionaries(conn)
+            finally:
+                conn.close()
+    if key not in _dictionaries:
+        raise ValueError(f"Unknown body dictionary {key.hex()}; was it deleted from body_dictionaries?")
+    primed = _primed.get(("decompress", key))
+    if primed is None:
+        dictionary = _dictionaries[key]
+        primed = zlib.decompressobj(-15, zdict=dictionary) if dictionary else zlib.decompressobj(-15)
+        _primed[("decompress", key)] = primed
+    return primed.copy()
+
+def decode_body(value):
+    """Return the text of a stored body, decompressing it if it is a BLOB"""
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    value = bytes(value)
+    if value[:2] != MAGIC:
+        return value.decode("utf-8", "replace")
+    decompressor = _decompressor(value)
+    return (decompressor.decompress(value[6:]) + decompressor.flush()).decode("utf-8")
+
+def decode_body_prefix(value, chars):
+    """First `chars` characters of a stored body, decompressing no more than needed"""
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        return (value or "")[:chars]
+    value = bytes(value)
+    if value[:2] != MAGIC:
+        return value.decode("utf-8", "replace")[:chars]
+    # UTF-8 needs at most 4 bytes per character; a cut-off last character is dropped
+    data = _decompressor(value).decompress(value[6:], chars * 4)
+    return data.decode("utf-8", "ignore")[:chars]
+
+def register_functions(conn):
+    """Register news_body(body) on a SQLite connection, so SQL can search compressed bodies"""
+    conn.create_function("news_body", 1, decode_body, deterministic=True)
+    return conn
+
+def train_dictionary(samples, size=32768):
+    """
+    Build a zlib preset dictionary from sample bodies.
+    
+    Word n-grams that repeat across the samples are scored by the bytes they
+    would save (occurrences x length) and packed until `size` bytes, with the
+    most valuable last, where deflate reaches them with the shortest distances.
+    
+    Returns:
+        Dictionary bytes (empty if the samples have nothing in common)
+    """
+    counts = Counter()
+    for text in samples:
+        words = re.findall(r"\S+\s*", text)
+        for n in (1, 2, 4, 8):
+            for start in range(len(words) - n + 1):
+                counts["".join(words[start:start + n])] += 1
+    
+    candidates = sorted(((count * len(gram), gram) for gram, count in counts.items()
+                         if count > 1 and len(gram) >= 6), reverse=True)
+    chosen, total, packed = [], 0, ""
+    for _, gram in candidates[:20000]:
+        if total + len(gram) > size:
+            continue
+        # Skip fragments of strings already in the dictionary
+        if gram in packed:
+            continue
+        chosen.append(gram)
+        total += len(gram)
+        packed += gram
+    return "".join(reversed(chosen)).encode("utf-8")[:size]
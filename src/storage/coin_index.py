@@ -0,0 +1,125 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from src.data_collection.api_clients import CoinGeckoClient
+from src.data_collection.coin_matcher import CoinMatcher
+from .body_codec import decode_body
+from .database import NewsDatabase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_COIN_INDEX = {
+    "top_coins": 250,
+    "refresh_hours": 24,
+    "batch_size": 1000,
+}
+
+# Used until the first successful CoinGecko fetch, so offline installs still get an index
+FALLBACK_COINS = [
+    {'id': 'bitcoin', 'symbol': 'btc', 'name': 'Bitcoin'},
+    {'id': 'ethereum', 'symbol': 'eth', 'name': 'Ethereum'},
+    {'id': 'tether', 'symbol': 'usdt', 'name': 'Tether'},
+    {'id': 'binancecoin', 'symbol': 'bnb', 'name': 'BNB'},
+    {'id': 'solana', 'symbol': 'sol', 'name': 'Solana'},
+    {'id': 'ripple', 'symbol': 'xrp', 'name': 'XRP'},
+    {'id': 'usd-coin', 'symbol': 'usdc', 'name': 'USDC'},
+    {'id': 'dogecoin', 'symbol': 'doge', 'name': 'Dogecoin'},
+    {'id': 'cardano', 'symbol': 'ada', 'name': 'Cardano'},
+    {'id': 'tron', 'symbol': 'trx', 'name': 'TRON'},
+    {'id': 'avalanche-2', 'symbol': 'avax', 'name': 'Avalanche'},
+    {'id': 'chainlink', 'symbol': 'link', 'name': 'Chainlink'},
+    {'id': 'polkadot', 'symbol': 'dot', 'name': 'Polkadot'},
+    {'id': 'litecoin', 'symbol': 'ltc', 'name': 'Litecoin'},
+]
+
+class CoinIndexer:
+    """
+    Ingest stage that fills the news_coins mention index.
+    
+    Articles are scanned once, in id order after a watermark, with a matcher
+    compiled from the CoinGecko list of the `top_coins` coins by market cap.
+    Configure it in the "coin_index" section of the config file.
+    """
+    
+    def __init__(self, config_path="config/api_config.json", db=None):
+        self.db = db or NewsDatabase(config_path)
+        self.settings = dict(DEFAULT_COIN_INDEX, **self.db.config.get("coin_index", {}))
+        self.client = CoinGeckoClient(config_path)
+        self._matcher = None
+        
+    def refresh_coins(self, force=False):
+        """Update the stored coin list from CoinGecko when it is older than refresh_hours"""
+        updated_at = self.db.get_state("coin_list_updated_at")
+        if not force and updated_at and datetime.now() - datetime.fromisoformat(updated_at) < timedelta(
+                hours=self.settings["refresh_hours"]):
+            return False
+            
+        coins = self.client.get_coin_list(top=self.settings["top_coins"])
+        if not coins:
+            logger.warning("Could not fetch the CoinGecko coin list; keeping the current one")
+            if not self.db.get_coin_list():
+                # Not marked as updated, so the next run tries CoinGecko again
+                self.db.save_coin_list(FALLBACK_COINS)
+            return False
+        self.db.save_coin_list(coins)
+        self.db.set_state("coin_list_updated_at", datetime.now().isoformat())
+        self._matcher = None
+        logger.info(f"Coin list refreshed with {len(coins)} coins")
+        return True
+    
+    @property
+    def matcher(self):
+        if self._matcher is None:
+            self._matcher = CoinMatcher(self.db.get_coin_list() or FALLBACK_COINS)
+        return self._matcher
+    
+    def index_pending(self):
+        """
+        Match all articles added since the last run.
+        
+        Returns:
+            Number of articles scanned
+        """
+        self.refresh_coins()
+        matcher = self.matcher
+        start = time.perf_counter()
+        scanned = mentions = 0
+        last_id = int(self.db.get_state("coin_index_last_news_id", 0))
+        while True:
+            conn = self.db._get_connection()
+            try:
+                rows = conn.execute('''
+                SELECT id, title, body FROM news WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, self.settings["batch_size"])).fetchall()
+                if not rows:
+                    break
+                    
+                pairs = [(news_id, coin_id) for news_id, title, body in rows
+                         for coin_id in matcher.match(title, decode_body(body))]
+                conn.executemany("INSERT OR IGNORE INTO news_coins (news_id, coin_id) VALUES (?, ?)", pairs)
+                # Committed together with the mentions, so a crash never skips or repeats a batch
+                conn.execute("INSERT OR REPLACE INTO maintenance_state (key, value) VALUES ('coin_index_last_news_id', ?)",
+                             (str(rows[-1][0]),))
+                conn.commit()
+            finally:
+                conn.close()
+            last_id = rows[-1][0]
+            scanned += len(rows)
+            mentions += len(pairs)
+            
+        if scanned:
+            logger.info(f"Indexed {mentions} coin mentions in {scanned} articles in {time.perf_counter() - start:.2f}s")
+        return scanned
+    
+    def rebuild(self):
+        """Re-match every article, e.g. after the coin list changed"""
+        self.refresh_coins(force=True)
+        conn = self.db._get_connection()
+        try:
+            conn.execute("DELETE FROM news_coins")
+            conn.execute("DELETE FROM maintenance_state WHERE key = 'coin_index_last_news_id'")
+            conn.commit()
+        finally:
+            conn.close()
+        return self.index_pending()
@@ -0,0 +1,60 @@
+import logging
+import queue
+import sqlite3
+from .body_codec import register_functions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class PooledConnection:
+    """Connection handed out by a pool; close() returns it to the pool instead of closing it"""
+    
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections shared between threads.
+    
+    Opening a connection costs a file open plus schema parsing on first use;
+    a long-running reader such as the HTTP API reuses a handful of them
+    instead. With read_only=True the connections refuse writes
+    (PRAGMA query_only), so a bug in a read path can't modify the database.
+    """
+    
+    def __init__(self, db_path, size=4, read_only=True, timeout=30):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            conn = register_functions(sqlite3.connect(db_path, timeout=timeout, check_same_thread=False))
+            if read_only:
+                conn.execute("PRAGMA query_only = 1")
+            self._idle.put(conn)
+    
+    def connect(self):
+        """Borrow a connection, waiting until one is free"""
+        return PooledConnection(self, self._idle.get())
+    
+    def release(self, conn):
+        # End a read transaction left open so the connection sees the next commit
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+    
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
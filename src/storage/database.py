@@ -2,45 +2,107 @@ import json
 import sqlite3
 import os
 import logging
-from datetime import datetime
-import pandas as pd
+import time
+from datetime import datetime, timezone
+from src.config import load_config
+from src.monitoring.metrics import DB_ROWS_INSERTED, DB_INSERT_SECONDS, DB_INSERT_ROWS_PER_SECOND, DB_QUERY_SECONDS
+from .backends import NEWS_COLUMNS, create_backend
+from .body_codec import (DEFAULT_BODY_COMPRESSION, decode_body, decode_body_prefix, encode_body,
+                         load_dictionaries, register_dictionary, register_functions)
+from .events import broadcaster
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def to_epoch(value, default=None):
+    """Convert a published_at value (epoch number or ISO 8601 string) to epoch seconds"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    value = str(value).strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return default
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+class NewsRecord:
+    """Lightweight read-only view of a news row; a compressed body is decompressed on first access"""
+    __slots__ = tuple('_body' if name == 'body' else name for name in NEWS_COLUMNS)
+    
+    def __init__(self, row):
+        for name, value in zip(self.__slots__, row):
+            setattr(self, name, value)
+            
+    @property
+    def body(self):
+        if isinstance(self._body, bytes):
+            self._body = decode_body(self._body)
+        return self._body
+    
+    def body_prefix(self, chars):
+        """First `chars` characters of the body, decompressing no more than needed"""
+        return decode_body_prefix(self._body, chars)
+    
+    def __getitem__(self, key):
+        return getattr(self, key)
+    
+    @property
+    def cursor(self):
+        """Keyset cursor to resume iteration after this record"""
+        return (self.published_ts, self.id)
+    
+    def to_dict(self):
+        return {name: getattr(self, name) for name in NEWS_COLUMNS}
+
 class NewsDatabase:
     def __init__(self, config_path="config/api_config.json"):
-        self.config = self._load_config(config_path)
-        self.db_type = self.config.get("data_storage", {}).get("type", "sqlite")
-        self.db_path = self.config.get("data_storage", {}).get("path", "data/crypto_news.db")
+        self.config = load_config(config_path)
+        storage_config = self.config.get("data_storage", {})
+        self.db_type = storage_config.get("type", "sqlite")
+        self.db_path = storage_config.get("path", "data/crypto_news.db")
+        self.pool = None
+        self.body_compression = dict(DEFAULT_BODY_COMPRESSION, **self.config.get("body_compression", {}))
+        # Preset dictionary new bodies are compressed with (the latest trained one)
+        self.body_dictionary = None
+        self._body_dictionary_id = 0
+        self._event_matcher = None
+        self._event_matcher_version = None
         
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        
-        if self.db_type == "sqlite":
-            self._init_sqlite()
+        self._init_sqlite()
             
-    def _load_config(self, config_path):
-        try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading config: {e}")
-            return {}
+        # News ingest, windowed reads, analyses and search go through the backend;
+        # the remaining bookkeeping tables (state, checkpoints, coins, jobs, ...)
+        # always live in the SQLite file at data_storage.path, whatever the backend
+        self.backend = create_backend(self.db_type, storage_config, self._get_connection)
     
     def _get_connection(self):
-        """Get a database connection."""
-        if self.db_type == "sqlite":
-            return sqlite3.connect(self.db_path)
-        else:
-            logger.error(f"Unsupported database type: {self.db_type}")
-            return None
+        """Get a connection to the SQLite file (the news store itself with the sqlite backend)."""
+        if self.pool is not None:
+            return self.pool.connect()
+        return register_functions(sqlite3.connect(self.db_path))
             
+    def use_pool(self, pool):
+        """Borrow connections from a ConnectionPool instead of opening one per call"""
+        self.pool = pool
+        
     def _init_sqlite(self):
         """Initialize SQLite database with necessary tables"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
+        # Only takes effect on a new, empty database; existing ones are converted by maintenance
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL lets readers and the maintenance job run alongside the ingest writer
+        cursor.execute("PRAGMA journal_mode = WAL")
+        
         # Create news table
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS news (
@@ -57,98 +119,422 @@ class NewsDatabase:
         )
         ''')
         
-        # Create coin_updates table
+        # Progress of historical backfills, one row per resumable job
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+            job TEXT PRIMARY KEY,
+            source TEXT,
+            cursor INTEGER,
+            target INTEGER,
+            done BOOLEAN DEFAULT 0,
+            items INTEGER DEFAULT 0,
+            updated_at TEXT
+        )
+        ''')
+        
+        # Archive files already loaded by the bulk importer
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS imported_files (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime INTEGER,
+            items INTEGER,
+            imported_at TEXT
+        )
+        ''')
+        
+        # Coin metadata is stored once per distinct content; every fetch only adds a snapshot row
         cursor.execute('''
-        CREATE TABLE IF NOT EXISTS coin_updates (
+        CREATE TABLE IF NOT EXISTS coin_versions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             coin_id TEXT,
+            content_hash TEXT,
             name TEXT,
             description TEXT,
             links TEXT,
+            first_seen_at TEXT,
+            UNIQUE (coin_id, content_hash)
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS coin_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            coin_id TEXT,
+            version_id INTEGER REFERENCES coin_versions (id),
             last_updated TEXT,
             collected_at TEXT
         )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_coin_snapshots_coin ON coin_snapshots (coin_id, collected_at)")
+        
+        # Daily article counts kept after raw bodies are trimmed
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS news_daily_source_counts (
+            day TEXT,
+            source TEXT,
+            article_count INTEGER DEFAULT 0,
+            PRIMARY KEY (day, source)
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS news_daily_coin_counts (
+            day TEXT,
+            coin TEXT,
+            article_count INTEGER DEFAULT 0,
+            PRIMARY KEY (day, coin)
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS news_analysis (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            analysis_data TEXT,
+            created_at TEXT,
+            kind TEXT NOT NULL DEFAULT 'global'
+        )
+        ''')
+        
+        # Coins known to the mention index and the articles mentioning them
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS coins (
+            coin_id TEXT PRIMARY KEY,
+            symbol TEXT,
+            name TEXT,
+            rank INTEGER,
+            updated_at TEXT
+        )
+        ''')
+        
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS news_coins (
+            news_id INTEGER,
+            coin_id TEXT,
+            PRIMARY KEY (news_id, coin_id)
+        ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_coins_coin ON news_coins (coin_id, news_id)")
+        
+        # Story cluster of each analyzed article, with its cached term counts
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS news_clusters (
+            news_id INTEGER PRIMARY KEY,
+            cluster_id INTEGER,
+            terms TEXT
+        )
+        ''')
+        
+        # Durable work queue shared by the --worker processes
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT,
+            payload TEXT,
+            status TEXT DEFAULT 'queued',
+            dedupe_key TEXT,
+            attempts INTEGER DEFAULT 0,
+            max_attempts INTEGER DEFAULT 3,
+            available_at REAL,
+            lease_owner TEXT,
+            lease_expires REAL,
+            last_error TEXT,
+            created_at TEXT,
+            updated_at TEXT
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (kind, status, available_at)")
+        # At most one unfinished job per dedupe key
+        cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedupe ON jobs (dedupe_key)
+        WHERE dedupe_key IS NOT NULL AND status IN ('queued', 'running')
+        ''')
+        
+        # Run locks: one lease row per named run, with the result of its last completion
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS run_leases (
+            name TEXT PRIMARY KEY,
+            owner TEXT,
+            expires_at REAL,
+            acquired_at TEXT,
+            generation INTEGER DEFAULT 0,
+            result TEXT,
+            finished_at TEXT
+        )
+        ''')
+        
+        # Small key/value store for job watermarks
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''')
+        
+        # Preset dictionaries of compressed news bodies; never deleted, old bodies still need them
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS body_dictionaries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dict_key BLOB UNIQUE,
+            dictionary BLOB,
+            sample_bytes INTEGER,
+            created_at TEXT
+        )
+        ''')
+        
+        self._migrate_news_sqlite(cursor)
+        self._migrate_coin_updates_sqlite(cursor)
+        self._migrate_analysis_sqlite(cursor)
+        
+        self._load_body_dictionaries(conn)
         
         conn.commit()
         conn.close()
         
-    def save_news(self, news_items):
-        """Save news items to the database"""
+    def _load_body_dictionaries(self, conn):
+        """Pick up dictionaries trained since the last call, also by other processes"""
+        rows = load_dictionaries(conn, self._body_dictionary_id, self.db_path)
+        if rows:
+            self._body_dictionary_id, self.body_dictionary = rows[-1]
+        
+    def save_body_dictionary(self, dictionary, sample_bytes=0):
+        """Store a trained body dictionary; new bodies are compressed with it from now on"""
+        key = register_dictionary(dictionary)
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+            INSERT OR IGNORE INTO body_dictionaries (dict_key, dictionary, sample_bytes, created_at)
+            VALUES (?, ?, ?, ?)
+            ''', (key, dictionary, sample_bytes, datetime.now().isoformat()))
+            conn.commit()
+            self._load_body_dictionaries(conn)
+        finally:
+            conn.close()
+        return key
+        
+    def _body_encoder(self):
+        """Function mapping a body to its stored form, or None while compression is disabled"""
+        settings = self.body_compression
+        if not settings["enabled"] or self.db_type != "sqlite":
+            return None
+        conn = self._get_connection()
+        try:
+            self._load_body_dictionaries(conn)
+        finally:
+            conn.close()
+        dictionary = self.body_dictionary
+        return lambda body: encode_body(body, dictionary, settings["level"], settings["min_length"])
+        
+    def _migrate_news_sqlite(self, cursor):
+        """Add the numeric published_ts column used for ordering and keyset pagination"""
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(news)")]
+        if 'published_ts' not in columns:
+            logger.info("Adding published_ts column to news table")
+            cursor.execute("ALTER TABLE news ADD COLUMN published_ts INTEGER")
+            rows = cursor.execute("SELECT id, published_at, collected_at FROM news").fetchall()
+            cursor.executemany("UPDATE news SET published_ts = ? WHERE id = ?", [
+                (to_epoch(published_at, to_epoch(collected_at, 0)), news_id)
+                for news_id, published_at, collected_at in rows
+            ])
+            
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_published ON news (published_ts, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_analyzed ON news (analyzed, published_ts)")
+        
+    def _migrate_analysis_sqlite(self, cursor):
+        """Add the kind column that tells market-wide analyses from coin/watchlist-focused ones"""
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(news_analysis)")]
+        if 'kind' not in columns:
+            logger.info("Adding kind column to news_analysis table")
+            cursor.execute("ALTER TABLE news_analysis ADD COLUMN kind TEXT NOT NULL DEFAULT 'global'")
+            # Coin-focused analyses carry their coins in the JSON
+            cursor.execute('''
+            UPDATE news_analysis SET kind = 'coins'
+            WHERE json_valid(analysis_data) AND json_type(analysis_data, '$.coins') = 'array'
+            ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_news_analysis_kind ON news_analysis (kind, created_at)")
+        
+    def _migrate_coin_updates_sqlite(self, cursor):
+        """Move rows of the old full-copy coin_updates table into versions and snapshots"""
+        kind = cursor.execute("SELECT type FROM sqlite_master WHERE name = 'coin_updates'").fetchone()
+        if kind and kind[0] == 'table':
+            rows = cursor.execute('''
+            SELECT coin_id, name, description, links, last_updated, collected_at
+            FROM coin_updates ORDER BY id
+            ''').fetchall()
+            logger.info(f"Migrating {len(rows)} coin_updates rows to content-addressed storage")
+            for coin_id, name, description, links, last_updated, collected_at in rows:
+                try:
+                    links = json.loads(links) if links else {}
+                except json.JSONDecodeError:
+                    pass
+                version_id = self._upsert_coin_version(cursor, coin_id, name, description, links, collected_at)
+                cursor.execute('''
+                INSERT INTO coin_snapshots (coin_id, version_id, last_updated, collected_at)
+                VALUES (?, ?, ?, ?)
+                ''', (coin_id, version_id, last_updated, collected_at))
+            cursor.execute("DROP TABLE coin_updates")
+            kind = None
+            
+        if not kind:
+            # Read-only view with the old row layout for existing queries
+            cursor.execute('''
+            CREATE VIEW coin_updates AS
+            SELECT s.id, s.coin_id, v.name, v.description, v.links, s.last_updated, s.collected_at
+            FROM coin_snapshots s JOIN coin_versions v ON v.id = s.version_id
+            ''')
+            
+    def _upsert_coin_version(self, cursor, coin_id, name, description, links, seen_at):
+        """Return the id of the version with this content, inserting it if it's new"""
+        import hashlib
+        
+        links_json = json.dumps(links, sort_keys=True)
+        content_hash = hashlib.sha256(
+            json.dumps([name, description, links_json]).encode('utf-8')
+        ).hexdigest()
+        cursor.execute('''
+        INSERT OR IGNORE INTO coin_versions (coin_id, content_hash, name, description, links, first_seen_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (coin_id, content_hash, name, description, links_json, seen_at))
+        if cursor.rowcount > 0:
+            return cursor.lastrowid
+        return cursor.execute(
+            "SELECT id FROM coin_versions WHERE coin_id = ? AND content_hash = ?", (coin_id, content_hash)
+        ).fetchone()[0]
+        
+    def save_news(self, news_items, raise_errors=False):
+        """
+        Save news items to the database.
+        
+        Args:
+            news_items: Items in the NewsFetcher schema
+            raise_errors: Re-raise a failed insert instead of logging it and returning 0
+            
+        Returns:
+            Number of new items (duplicate urls are skipped)
+        """
         if not news_items:
             logger.warning("No news items to save")
             return 0
             
-        if self.db_type == "sqlite":
-            return self._save_news_sqlite(news_items)
-        else:
-            logger.error(f"Unsupported database type: {self.db_type}")
-            return 0
-            
-    def _save_news_sqlite(self, news_items):
-        """Save news items to SQLite database"""
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        start = time.perf_counter()
+        now = datetime.now().isoformat()
+        encode = self._body_encoder()
+        rows = []
+        for item in news_items:
+            collected_at = item.get('collected_at', now)
+            rows.append((
+                item.get('source', ''),
+                item.get('title', ''),
+                encode(item.get('body', '')) if encode else item.get('body', ''),
+                item.get('published_at', ''),
+                to_epoch(item.get('published_at'), to_epoch(collected_at, 0)),
+                item.get('url', ''),
+                item.get('source_name', ''),
+                item.get('categories', ''),
+                collected_at
+            ))
+        
+        # New rows get ids above the current maximum; only looked up while someone listens for events
+        publish_after_id = self._max_news_id() if broadcaster.enabled and self.db_type == "sqlite" else None
         
+        # One bulk statement in a single transaction; duplicates on url are skipped
         saved_count = 0
-        for item in news_items:
-            try:
-                cursor.execute('''
-                INSERT OR IGNORE INTO news 
-                (source, title, body, published_at, url, source_name, categories, collected_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    item.get('source', ''),
-                    item.get('title', ''),
-                    item.get('body', ''),
-                    item.get('published_at', ''),
-                    item.get('url', ''),
-                    item.get('source_name', ''),
-                    item.get('categories', ''),
-                    item.get('collected_at', datetime.now().isoformat())
-                ))
-                if cursor.rowcount > 0:
-                    saved_count += 1
-            except Exception as e:
-                logger.error(f"Error saving news item: {e}")
-                
-        conn.commit()
-        conn.close()
+        try:
+            saved_count = self.backend.ingest_news(rows)
+        except Exception as e:
+            logger.error(f"Error saving news items: {e}")
+            if raise_errors:
+                raise
         
+        if saved_count and publish_after_id is not None:
+            self._publish_news(publish_after_id, [row[5] for row in rows])
+        self._record_insert("news", saved_count, start)
         logger.info(f"Saved {saved_count} new news items to database")
         return saved_count
         
+    def _max_news_id(self):
+        conn = self._get_connection()
+        try:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM news").fetchone()[0]
+        finally:
+            conn.close()
+            
+    def _publish_news(self, after_id, urls):
+        """Publish a "news" change event for every row of `urls` inserted after `after_id`"""
+        try:
+            conn = self._get_connection()
+            try:
+                rows = []
+                # Matching on url too skips rows a concurrent writer inserted meanwhile
+                for offset in range(0, len(urls), 500):
+                    chunk = urls[offset:offset + 500]
+                    rows.extend(conn.execute(f'''
+                    SELECT id, source, title, body, published_at, published_ts, url, source_name, categories
+                    FROM news WHERE id > ? AND url IN ({', '.join('?' for _ in chunk)})
+                    ''', [after_id] + chunk).fetchall())
+            finally:
+                conn.close()
+                
+            matcher = self._coin_matcher()
+            for news_id, source, title, body, published_at, published_ts, url, source_name, categories in sorted(rows):
+                coins = matcher.match(title, decode_body(body))
+                broadcaster.publish("news", {
+                    'id': news_id,
+                    'source': source,
+                    'title': title,
+                    'url': url,
+                    'source_name': source_name,
+                    'published_at': published_at,
+                    'published_ts': published_ts,
+                    'categories': categories,
+                    'coins': coins
+                }, coins=coins, source=source)
+        except Exception as e:
+            logger.error(f"Error publishing news events: {e}")
+            
+    def _coin_matcher(self):
+        """CoinMatcher over the indexed coin list, rebuilt when the list changes"""
+        from src.data_collection.coin_matcher import CoinMatcher
+        
+        conn = self._get_connection()
+        try:
+            version = conn.execute("SELECT MAX(updated_at), COUNT(*) FROM coins").fetchone()
+        finally:
+            conn.close()
+        if self._event_matcher is None or version != self._event_matcher_version:
+            self._event_matcher = CoinMatcher(self.get_coin_list())
+            self._event_matcher_version = version
+        return self._event_matcher
+        
     def save_coin_updates(self, coin_updates):
         """Save coin updates to the database"""
         if not coin_updates:
             return 0
-            
-        if self.db_type == "sqlite":
-            return self._save_coin_updates_sqlite(coin_updates)
-        else:
-            logger.error(f"Unsupported database type: {self.db_type}")
-            return 0
+        return self._save_coin_updates_sqlite(coin_updates)
             
     def _save_coin_updates_sqlite(self, coin_updates):
         """Save coin updates to SQLite database"""
+        start = time.perf_counter()
         conn = self._get_connection()
         cursor = conn.cursor()
         
         saved_count = 0
         for coin_id, update in coin_updates.items():
             try:
-                cursor.execute('''
-                INSERT INTO coin_updates 
-                (coin_id, name, description, links, last_updated, collected_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
+                collected_at = datetime.now().isoformat()
+                # Unchanged metadata resolves to the existing version, so only a small snapshot row is written
+                version_id = self._upsert_coin_version(
+                    cursor,
                     coin_id,
                     update.get('name', ''),
                     update.get('description', ''),
-                    json.dumps(update.get('links', {})),
-                    update.get('last_updated', ''),
-                    datetime.now().isoformat()
-                ))
+                    update.get('links', {}),
+                    collected_at
+                )
+                cursor.execute('''
+                INSERT INTO coin_snapshots (coin_id, version_id, last_updated, collected_at)
+                VALUES (?, ?, ?, ?)
+                ''', (coin_id, version_id, update.get('last_updated', ''), collected_at))
                 saved_count += 1
             except Exception as e:
                 logger.error(f"Error saving coin update: {e}")
@@ -156,54 +542,338 @@ class NewsDatabase:
         conn.commit()
         conn.close()
         
+        self._record_insert("coin_snapshots", saved_count, start)
         logger.info(f"Saved {saved_count} coin updates to database")
         return saved_count
         
-    def get_recent_news(self, limit=100):
-        """Get the most recent news items from the database"""
-        if self.db_type == "sqlite":
-            conn = self._get_connection()
-            df = pd.read_sql_query(f"SELECT * FROM news ORDER BY published_at DESC LIMIT {limit}", conn)
+    def get_coin_history(self, coin_id, limit=None):
+        """
+        Rebuild the timeline of a coin's metadata from its snapshots.
+        
+        Args:
+            coin_id: CoinGecko coin id, e.g. "bitcoin"
+            limit: Only return the most recent `limit` snapshots
+            
+        Returns:
+            List of dictionaries in chronological order with the full metadata of
+            each snapshot; `changed` is True where the content differs from the
+            previous snapshot
+        """
+        conn = self._get_connection()
+        try:
+            with DB_QUERY_SECONDS.time(query="coin_history"):
+                rows = conn.execute(f'''
+                SELECT s.id, s.version_id, v.name, v.description, v.links, s.last_updated, s.collected_at
+                FROM coin_snapshots s JOIN coin_versions v ON v.id = s.version_id
+                WHERE s.coin_id = ?
+                ORDER BY s.collected_at DESC, s.id DESC
+                {'LIMIT ?' if limit else ''}
+                ''', (coin_id, limit) if limit else (coin_id,)).fetchall()
+        finally:
             conn.close()
-            return df
-        else:
-            logger.error(f"Unsupported database type: {self.db_type}")
-            return pd.DataFrame()
+            
+        history = []
+        previous_version = None
+        # Descriptions are shared between snapshots of the same version, so parse links once per version
+        links_cache = {}
+        for snapshot_id, version_id, name, description, links, last_updated, collected_at in reversed(rows):
+            if version_id not in links_cache:
+                links_cache[version_id] = json.loads(links) if links else {}
+            history.append({
+                'coin_id': coin_id,
+                'name': name,
+                'description': description,
+                'links': links_cache[version_id],
+                'last_updated': last_updated,
+                'collected_at': collected_at,
+                'version_id': version_id,
+                'changed': version_id != previous_version
+            })
+            previous_version = version_id
+        return history
     
-    def get_latest_analysis(self):
-        """Get the most recent analysis from the database"""
-        if self.db_type == "sqlite":
-            conn = self._get_connection()
-            cursor = conn.cursor()
+    def get_backfill_checkpoints(self, prefix):
+        """Get backfill checkpoints whose job name starts with `prefix`"""
+        conn = self._get_connection()
+        try:
+            rows = conn.execute('''
+            SELECT job, source, cursor, target, done, items FROM backfill_checkpoints
+            WHERE job LIKE ? ORDER BY job
+            ''', (prefix + '%',)).fetchall()
+        finally:
+            conn.close()
+        return [dict(zip(('job', 'source', 'cursor', 'target', 'done', 'items'), row)) for row in rows]
+    
+    def save_backfill_checkpoint(self, job, source, cursor, target, done=False, items=0):
+        """Create or update the checkpoint of a backfill job"""
+        conn = self._get_connection()
+        try:
+            conn.execute('''
+            INSERT INTO backfill_checkpoints (job, source, cursor, target, done, items, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job) DO UPDATE SET
+                cursor = excluded.cursor, done = excluded.done,
+                items = excluded.items, updated_at = excluded.updated_at
+            ''', (job, source, cursor, target, 1 if done else 0, items, datetime.now().isoformat()))
+            conn.commit()
+        finally:
+            conn.close()
+        
+    def get_imported_files(self):
+        """Get {path: (size, mtime)} of archive files that were already imported"""
+        conn = self._get_connection()
+        try:
+            rows = conn.execute("SELECT path, size, mtime FROM imported_files").fetchall()
+        finally:
+            conn.close()
+        return {path: (size, mtime) for path, size, mtime in rows}
+    
+    def mark_files_imported(self, files):
+        """Record imported archive files given as (path, size, mtime, items) tuples"""
+        if not files:
+            return
+        imported_at = datetime.now().isoformat()
+        conn = self._get_connection()
+        try:
+            conn.executemany('''
+            INSERT OR REPLACE INTO imported_files (path, size, mtime, items, imported_at)
+            VALUES (?, ?, ?, ?, ?)
+            ''', [(path, size, mtime, items, imported_at) for path, size, mtime, items in files])
+            conn.commit()
+        finally:
+            conn.close()
+        
+    def save_coin_list(self, coins):
+        """Replace the coin list used by the mention index; `coins` is ordered by importance"""
+        updated_at = datetime.now().isoformat()
+        conn = self._get_connection()
+        try:
+            conn.execute("DELETE FROM coins")
+            conn.executemany('''
+            INSERT OR IGNORE INTO coins (coin_id, symbol, name, rank, updated_at) VALUES (?, ?, ?, ?, ?)
+            ''', [(coin['id'], coin.get('symbol'), coin.get('name'), rank, updated_at)
+                  for rank, coin in enumerate(coins, 1) if coin.get('id')])
+            conn.commit()
+        finally:
+            conn.close()
             
-            try:
-                cursor.execute('''
-                SELECT analysis_data, created_at FROM news_analysis
-                ORDER BY created_at DESC
-                LIMIT 1
-                ''')
+    def get_coin(self, coin_id):
+        """Get {'id', 'symbol', 'name', 'rank'} of an indexed coin, or None"""
+        conn = self._get_connection()
+        try:
+            row = conn.execute("SELECT coin_id, symbol, name, rank FROM coins WHERE coin_id = ?", (coin_id,)).fetchone()
+        finally:
+            conn.close()
+        return {'id': row[0], 'symbol': row[1], 'name': row[2], 'rank': row[3]} if row else None
+    
+    def get_coin_list(self):
+        """Get the indexed coins as {'id', 'symbol', 'name'} dicts, most important first"""
+        conn = self._get_connection()
+        try:
+            rows = conn.execute("SELECT coin_id, symbol, name FROM coins ORDER BY rank").fetchall()
+        finally:
+            conn.close()
+        return [{'id': coin_id, 'symbol': symbol, 'name': name} for coin_id, symbol, name in rows]
+    
+    def resolve_coin(self, term):
+        """Map a coin id, ticker symbol or name (e.g. "solana", "SOL", "Solana") to a coin id"""
+        conn = self._get_connection()
+        try:
+            row = conn.execute('''
+            SELECT coin_id FROM coins
+            WHERE coin_id = lower(?) OR lower(symbol) = lower(?) OR lower(name) = lower(?)
+            ORDER BY coin_id = lower(?) DESC, rank
+            LIMIT 1
+            ''', (term, term, term, term)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else term.lower()
+    
+    def get_news_coins(self, news_ids):
+        """Get {news_id: [coin_id, ...]} from the mention index"""
+        if not news_ids or self.db_type != "sqlite":
+            return {}
+        mentions = {}
+        conn = self._get_connection()
+        try:
+            ids = list(news_ids)
+            # Chunked to stay below SQLite's bound parameter limit
+            for offset in range(0, len(ids), 500):
+                chunk = ids[offset:offset + 500]
+                rows = conn.execute(f'''
+                SELECT news_id, coin_id FROM news_coins
+                WHERE news_id IN ({', '.join('?' for _ in chunk)})
+                ORDER BY news_id, coin_id
+                ''', chunk).fetchall()
+                for news_id, coin_id in rows:
+                    mentions.setdefault(news_id, []).append(coin_id)
+        finally:
+            conn.close()
+        return mentions
+    
+    def get_news_clusters(self, news_ids):
+        """Get {news_id: (cluster_id, term_counts)} of articles that were already clustered"""
+        if not news_ids or self.db_type != "sqlite":
+            return {}
+        clusters = {}
+        conn = self._get_connection()
+        try:
+            ids = list(news_ids)
+            for offset in range(0, len(ids), 500):
+                chunk = ids[offset:offset + 500]
+                rows = conn.execute(f'''
+                SELECT news_id, cluster_id, terms FROM news_clusters
+                WHERE news_id IN ({', '.join('?' for _ in chunk)})
+                ''', chunk).fetchall()
+                for news_id, cluster_id, terms in rows:
+                    clusters[news_id] = (cluster_id, json.loads(terms) if terms else {})
+        finally:
+            conn.close()
+        return clusters
+    
+    def save_news_clusters(self, rows):
+        """Store (news_id, cluster_id, terms_json) cluster assignments"""
+        if not rows or self.db_type != "sqlite":
+            return
+        conn = self._get_connection()
+        try:
+            conn.executemany("INSERT OR REPLACE INTO news_clusters (news_id, cluster_id, terms) VALUES (?, ?, ?)", rows)
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get_coin_mention_counts(self, since_ts=None, limit=None):
+        """Get [(coin_id, article_count)] for articles published after since_ts, most mentioned first"""
+        if self.db_type != "sqlite":
+            return []
+        conn = self._get_connection()
+        try:
+            with DB_QUERY_SECONDS.time(query="coin_mention_counts"):
+                rows = conn.execute(f'''
+                SELECT nc.coin_id, COUNT(*) AS article_count
+                FROM news_coins nc JOIN news n ON n.id = nc.news_id
+                WHERE n.published_ts > ?
+                GROUP BY nc.coin_id
+                ORDER BY article_count DESC, nc.coin_id
+                {'LIMIT ?' if limit else ''}
+                ''', (since_ts or 0, limit) if limit else (since_ts or 0,)).fetchall()
+        finally:
+            conn.close()
+        return rows
+    
+    def get_state(self, key, default=None):
+        """Get a value from the maintenance_state key/value table"""
+        conn = self._get_connection()
+        try:
+            row = conn.execute("SELECT value FROM maintenance_state WHERE key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else default
+    
+    def set_state(self, key, value):
+        """Store a value in the maintenance_state key/value table"""
+        conn = self._get_connection()
+        try:
+            conn.execute("INSERT OR REPLACE INTO maintenance_state (key, value) VALUES (?, ?)", (key, str(value)))
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get_daily_counts(self, by="source", since_day=None):
+        """Get daily article counts per source or per coin from the rollup tables"""
+        table, column = ("news_daily_coin_counts", "coin") if by == "coin" else ("news_daily_source_counts", "source")
+        conn = self._get_connection()
+        try:
+            rows = conn.execute(f'''
+            SELECT day, {column}, article_count FROM {table}
+            WHERE day >= ? ORDER BY day, {column}
+            ''', (since_day or '',)).fetchall()
+        finally:
+            conn.close()
+        return [{'day': day, column: key, 'article_count': count} for day, key, count in rows]
+        
+    def _record_insert(self, table, row_count, start):
+        """Record insert metrics for a batch that started at `start`"""
+        elapsed = time.perf_counter() - start
+        DB_ROWS_INSERTED.inc(row_count, table=table)
+        DB_INSERT_SECONDS.observe(elapsed, table=table)
+        if elapsed > 0:
+            DB_INSERT_ROWS_PER_SECOND.set(row_count / elapsed, table=table)
+        
+    def get_recent_news(self, limit=100, as_dataframe=False):
+        """Get the most recent news items as a list of NewsRecord (or a DataFrame if requested)"""
+        records = list(self.iter_news(limit=limit))
+        if as_dataframe:
+            import pandas as pd
+            return pd.DataFrame([record.to_dict() for record in records], columns=NEWS_COLUMNS)
+        return records
+    
+    def iter_news(self, filters=None, after_cursor=None, batch_size=500, limit=None):
+        """
+        Stream news rows newest first using keyset pagination on (published_ts, id).
+        
+        Args:
+            filters: Optional dict with any of source, analyzed, since_ts, until_ts,
+                     coin (coin id) and coins (list of coin ids, any of them matches);
+                     coin filters are answered from the news_coins mention index
+            after_cursor: (published_ts, id) of the last record already seen
+            batch_size: Number of rows fetched per query
+            limit: Maximum number of records to yield
+            
+        Yields:
+            NewsRecord objects; memory use is bounded by batch_size
+        """
+        filters = filters or {}
+        remaining = limit
+        while remaining is None or remaining > 0:
+            page_size = batch_size if remaining is None else min(batch_size, remaining)
+            with DB_QUERY_SECONDS.time(query="iter_news"):
+                rows = self.backend.query_window(filters, after_cursor, page_size)
                 
-                result = cursor.fetchone()
-                if result:
-                    analysis_data, created_at = result
-                    return {"analysis": json.loads(analysis_data), "created_at": created_at}
-                else:
-                    return {"analysis": None, "message": "No analysis found"}
-            except Exception as e:
-                logger.error(f"Error retrieving latest analysis: {e}")
-                return {"error": str(e)}
-            finally:
-                conn.close()
-        else:
-            logger.error(f"Unsupported database type: {self.db_type}")
-            return {"error": "Unsupported database type"}
+            for row in rows:
+                yield NewsRecord(row)
+                
+            if len(rows) < page_size:
+                break
+            last = rows[-1]
+            after_cursor = (last[5], last[0])
+            if remaining is not None:
+                remaining -= len(rows)
+                
+    def search_news(self, query, limit=50):
+        """Get news whose title or body contains `query` (case-insensitive), newest first"""
+        if not query:
+            return []
+        with DB_QUERY_SECONDS.time(query="search_news"):
+            rows = self.backend.search_news(query, limit)
+        return [NewsRecord(row) for row in rows]
+    
+    def save_analysis(self, analysis_result, news_ids=None):
+        """Save an analysis result and mark the news it covered (`news_ids`) as analyzed; returns the analysis id"""
+        # Coin- and watchlist-focused analyses never stand in for the latest market-wide one
+        kind = "coins" if isinstance(analysis_result, dict) and analysis_result.get("coins") else "global"
+        return self.backend.save_analysis(json.dumps(analysis_result), datetime.now().isoformat(),
+                                          list(news_ids or []), kind)
+    
+    def get_latest_analysis(self, kind="global"):
+        """Get the most recent analysis of `kind` ("global" market-wide or "coins" coin-focused)"""
+        try:
+            with DB_QUERY_SECONDS.time(query="latest_analysis"):
+                result = self.backend.latest_analysis(kind)
+            if result:
+                analysis_data, created_at = result
+                return {"analysis": json.loads(analysis_data), "created_at": created_at}
+            else:
+                return {"analysis": None, "message": "No analysis found"}
+        except Exception as e:
+            logger.error(f"Error retrieving latest analysis: {e}")
+            return {"error": str(e)}
         
-    def save_news_to_files(self, news_items):
+    def save_news_to_files(self, news_items, save_path='data/news_data'):
         """Save news items as JSON files in the news_data directory"""
         if not news_items:
             return 0
         
-        save_path = 'data/news_data'
         os.makedirs(save_path, exist_ok=True)
         
         saved_count = 0
@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLAY_SIZE = 1000
+
+class ChangeEvent:
+    """One published change; `text` is the encoded Server-Sent Events frame"""
+    __slots__ = ('id', 'type', 'data', 'coins', 'source', 'text')
+    
+    def __init__(self, event_id, event_type, data, coins=None, source=None):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        # None means not about specific coins (e.g. a market-wide analysis)
+        self.coins = frozenset(coins) if coins is not None else None
+        self.source = source
+        self.text = f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+class Subscription:
+    """
+    A subscriber's filters and delivery callback.
+    
+    `notify(event)` is called on the publishing thread and must not block;
+    the SSE server hands events over to its event loop from there.
+    """
+    
+    def __init__(self, notify, coins=None, sources=None, types=None):
+        self.notify = notify
+        self.coins = frozenset(coins) if coins else None
+        self.sources = frozenset(sources) if sources else None
+        self.types = frozenset(types) if types else None
+    
+    def matches(self, event):
+        if self.types is not None and event.type not in self.types:
+            return False
+        if self.sources is not None and event.source is not None and event.source not in self.sources:
+            return False
+        if self.coins is not None and event.coins is not None and not self.coins & event.coins:
+            return False
+        return True
+
+class EventBroadcaster:
+    """
+    In-process fan-out of change events (new articles, saved analyses).
+    
+    Publishing is a no-op until something enables the broadcaster, e.g. the
+    HTTP API serving /events, so plain collector runs pay nothing. Events
+    get increasing ids and the last `replay_size` are kept, so a client that
+    reconnects with Last-Event-ID receives what it missed. Ids are based on
+    the clock, so they keep increasing across restarts of the process.
+    """
+    
+    def __init__(self, replay_size=DEFAULT_REPLAY_SIZE):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._replay = deque(maxlen=replay_size)
+        self._subscriptions = set()
+        self._listeners = []
+        # Events up to this id are unknown to this process: published before it
+        # started or pushed out of the replay buffer
+        self._lost_until = int(time.time() * 1000)
+        self._last_id = self._lost_until
+    
+    def enable(self, replay_size=None):
+        with self._lock:
+            if replay_size and replay_size != self._replay.maxlen:
+                if len(self._replay) > replay_size:
+                    self._lost_until = self._replay[-replay_size - 1].id
+                self._replay = deque(self._replay, maxlen=replay_size)
+            self.enabled = True
+    
+    def add_listener(self, callback):
+        """Call `callback(event)` for every event, regardless of filters"""
+        self._listeners.append(callback)
+    
+    def publish(self, event_type, data, coins=None, source=None):
+        """Publish an event to all matching subscribers; returns it, or None while disabled"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+            event = ChangeEvent(self._last_id, event_type, data, coins, source)
+            if len(self._replay) == self._replay.maxlen:
+                self._lost_until = self._replay[0].id
+            self._replay.append(event)
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                try:
+                    subscription.notify(event)
+                except Exception as e:
+                    # e.g. the subscriber's event loop is already closed
+                    logger.error(f"Dropping subscriber after delivery error: {e}")
+                    self.unsubscribe(subscription)
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Event listener failed: {e}")
+        return event
+    
+    def subscribe(self, subscription, last_event_id=None):
+        """
+        Register a subscription.
+        
+        Args:
+            subscription: Subscription to receive new events
+            last_event_id: Id of the last event the client saw, to resume after it
+        
+        Returns:
+            Tuple of (missed events matching the filters, whether events were
+            missed that the replay buffer no longer holds)
+        """
+        with self._lock:
+            # Registered under the lock, so no event falls between the backlog and live delivery
+            self._subscriptions.add(subscription)
+            if last_event_id is None:
+                return [], False
+            gap = last_event_id < self._lost_until
+            backlog = [event for event in self._replay if event.id > last_event_id and subscription.matches(event)]
+        return backlog, gap
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+    
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+# Process-wide broadcaster that NewsDatabase and LLMAnalyzer publish to
+broadcaster = EventBroadcaster()
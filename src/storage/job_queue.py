@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+from .database import NewsDatabase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = {
+    "visibility_timeout": 600,
+    "max_attempts": 3,
+    "retry_backoff": 30,
+}
+
+JOB_COLUMNS = ('id', 'kind', 'payload', 'attempts', 'max_attempts', 'lease_owner', 'lease_expires')
+
+class Job:
+    """A claimed job; `payload` is the decoded JSON payload"""
+    
+    def __init__(self, row):
+        self.id, self.kind, payload, self.attempts, self.max_attempts, self.lease_owner, self.lease_expires = row
+        self.payload = json.loads(payload) if payload else {}
+        
+    def __repr__(self):
+        return f"Job({self.id}, {self.kind}, attempt {self.attempts}/{self.max_attempts})"
+
+class JobQueue:
+    """
+    Durable job queue in the SQLite database.
+    
+    A worker claims a job by taking a lease for `visibility_timeout` seconds
+    inside a BEGIN IMMEDIATE transaction, so concurrent workers never claim
+    the same job. A job whose lease expires (the worker crashed or hung) becomes
+    claimable again; failures are retried with exponential backoff until
+    max_attempts is reached. Configure it in the "job_queue" config section.
+    """
+    
+    def __init__(self, config_path="config/api_config.json", db=None):
+        self.db = db or NewsDatabase(config_path)
+        self.settings = dict(DEFAULT_QUEUE, **self.db.config.get("job_queue", {}))
+        self.visibility_timeout = self.settings["visibility_timeout"]
+        
+    def _connect(self):
+        # Autocommit mode so every write below runs in an explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db.db_path, timeout=30, isolation_level=None)
+        return conn
+    
+    def enqueue(self, kind, payload=None, delay=0, dedupe_key=None, max_attempts=None):
+        """
+        Add a job.
+        
+        Args:
+            kind: Job type, e.g. "fetch", "analyze", "render"
+            payload: JSON-serializable job arguments
+            delay: Seconds before the job becomes claimable
+            dedupe_key: Skip the job if an unfinished job with this key exists
+            max_attempts: Attempts before the job is marked failed
+            
+        Returns:
+            The new job id, or None if it was deduplicated
+        """
+        now = datetime.now().isoformat()
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+            INSERT OR IGNORE INTO jobs (kind, payload, status, dedupe_key, max_attempts, available_at, created_at, updated_at)
+            VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)
+            ''', (kind, json.dumps(payload or {}), dedupe_key, max_attempts or self.settings["max_attempts"],
+                  time.time() + delay, now, now))
+            return cursor.lastrowid if cursor.rowcount else None
+        finally:
+            conn.close()
+            
+    def claim(self, kinds, worker_id):
+        """Lease the next due job of one of `kinds`, reclaiming expired leases; returns a Job or None"""
+        now = time.time()
+        placeholders = ', '.join('?' for _ in kinds)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            # Jobs whose lease expired on their last allowed attempt are given up
+            conn.execute(f'''
+            UPDATE jobs SET status = 'failed', last_error = 'lease expired', lease_owner = NULL, updated_at = ?
+            WHERE kind IN ({placeholders}) AND status = 'running' AND lease_expires < ? AND attempts >= max_attempts
+            ''', (datetime.now().isoformat(), *kinds, now))
+            row = conn.execute(f'''
+            SELECT id FROM jobs
+            WHERE kind IN ({placeholders})
+              AND ((status = 'queued' AND available_at <= ?) OR (status = 'running' AND lease_expires < ?))
+            ORDER BY available_at, id
+            LIMIT 1
+            ''', (*kinds, now, now)).fetchone()
+            if not row:
+                conn.execute("COMMIT")
+                return None
+            claimed = conn.execute(f'''
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated_at = ?
+            WHERE id = ?
+            RETURNING {', '.join(JOB_COLUMNS)}
+            ''', (worker_id, now + self.visibility_timeout, datetime.now().isoformat(), row[0])).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return Job(claimed)
+    
+    def heartbeat(self, job, worker_id):
+        """Extend the lease of a running job; returns False if the lease was lost"""
+        return self._update_owned(job, worker_id, "lease_expires = ?", (time.time() + self.visibility_timeout,))
+    
+    def complete(self, job, worker_id):
+        """Mark a job done; returns False if another worker has taken it over"""
+        return self._update_owned(job, worker_id, "status = 'done', lease_owner = NULL, last_error = NULL", ())
+    
+    def fail(self, job, worker_id, error):
+        """Release a failed job for a retry after a backoff, or mark it failed after max_attempts"""
+        if job.attempts >= job.max_attempts:
+            logger.error(f"{job} failed permanently: {error}")
+            return self._update_owned(job, worker_id, "status = 'failed', lease_owner = NULL, last_error = ?",
+                                      (str(error),))
+        retry_at = time.time() + self.settings["retry_backoff"] * 2 ** (job.attempts - 1)
+        logger.warning(f"{job} failed, retrying in {retry_at - time.time():.0f}s: {error}")
+        return self._update_owned(job, worker_id,
+                                  "status = 'queued', lease_owner = NULL, available_at = ?, last_error = ?",
+                                  (retry_at, str(error)))
+    
+    def _update_owned(self, job, worker_id, assignments, params):
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f'''
+            UPDATE jobs SET {assignments}, updated_at = ?
+            WHERE id = ? AND status = 'running' AND lease_owner = ?
+            ''', (*params, datetime.now().isoformat(), job.id, worker_id))
+            if cursor.rowcount == 0:
+                logger.warning(f"Lease on {job} was lost to another worker")
+            return cursor.rowcount > 0
+        finally:
+            conn.close()
+            
+    def stats(self):
+        """Get {kind: {status: count}} for monitoring"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status").fetchall()
+        finally:
+            conn.close()
+        stats = {}
+        for kind, status, count in rows:
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+def default_worker_id():
+    """host:pid:random, unique per worker process"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
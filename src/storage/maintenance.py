@@ -0,0 +1,297 @@
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from .body_codec import encode_body, train_dictionary
+from .database import NewsDatabase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Retention in days per data set; None keeps data forever
+DEFAULT_RETENTION = {
+    "news_body_days": None,
+    "coin_snapshots_days": None,
+    "news_analysis_days": None,
+    "jobs_days": 7,
+    "chunk_size": 500,
+    "vacuum_pages": 1000,
+    "interval_hours": 24,
+}
+
+class DatabaseMaintenance:
+    """
+    Scheduled retention, rollup and vacuum job for the SQLite database.
+    
+    Every step works in chunks of `chunk_size` rows with one short transaction
+    per chunk, so the ingest writer is never blocked for long. Configure it in
+    the "retention" section of the config file, e.g.
+    {"news_body_days": 30, "coin_snapshots_days": 180, "news_analysis_days": 365}
+    
+    With "body_compression": {"enabled": true} it also compresses bodies
+    still stored as text, e.g. those saved before compression was enabled.
+    """
+    
+    def __init__(self, config_path="config/api_config.json"):
+        self.db = NewsDatabase(config_path)
+        self.settings = dict(DEFAULT_RETENTION, **self.db.config.get("retention", {}))
+        self.chunk_size = self.settings["chunk_size"]
+        
+    def is_due(self):
+        """Check whether the configured interval has passed since the last run"""
+        last_run = self.db.get_state("maintenance_last_run")
+        if not last_run:
+            return True
+        return datetime.now() - datetime.fromisoformat(last_run) >= timedelta(hours=self.settings["interval_hours"])
+    
+    def run(self):
+        """
+        Run all maintenance steps.
+        
+        Returns:
+            Dictionary with the number of rows affected per step
+        """
+        start = time.perf_counter()
+        results = {
+            "rolled_up": self.update_rollups(),
+            "bodies_trimmed": self.trim_news_bodies(),
+            "bodies_compressed": self.compress_news_bodies() if self.db.body_compression["enabled"] else 0,
+            "snapshots_deleted": self.delete_old_coin_snapshots(),
+            "analyses_deleted": self.delete_old_analyses(),
+            "jobs_deleted": self.delete_finished_jobs(),
+            "pages_freed": self.incremental_vacuum()
+        }
+        self.db.set_state("maintenance_last_run", datetime.now().isoformat())
+        logger.info(f"Maintenance finished in {time.perf_counter() - start:.1f}s: {results}")
+        return results
+    
+    def _cutoff(self, days):
+        return datetime.now(timezone.utc) - timedelta(days=days)
+    
+    def _run_chunked(self, sql, params=()):
+        """Repeat a chunked UPDATE/DELETE statement until it affects no more rows"""
+        total = 0
+        while True:
+            conn = self.db._get_connection()
+            try:
+                affected = conn.execute(sql, tuple(params) + (self.chunk_size,)).rowcount
+                conn.commit()
+            finally:
+                conn.close()
+            total += affected
+            if affected < self.chunk_size:
+                return total
+            # Give a waiting writer the chance to take the lock between chunks
+            time.sleep(0.001)
+    
+    def update_rollups(self):
+        """Add news rows inserted since the last run to the daily count tables"""
+        last_id = int(self.db.get_state("rollup_last_news_id", 0))
+        total = 0
+        while True:
+            conn = self.db._get_connection()
+            try:
+                rows = conn.execute('''
+                SELECT id, source, published_ts, categories FROM news
+                WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, self.chunk_size)).fetchall()
+                if not rows:
+                    break
+                    
+                source_counts, coin_counts = Counter(), Counter()
+                for news_id, source, published_ts, categories in rows:
+                    day = datetime.fromtimestamp(published_ts or 0, tz=timezone.utc).strftime('%Y-%m-%d')
+                    source_counts[(day, source)] += 1
+                    for coin in self._coins_for(source, categories):
+                        coin_counts[(day, coin)] += 1
+                        
+                conn.executemany('''
+                INSERT INTO news_daily_source_counts (day, source, article_count) VALUES (?, ?, ?)
+                ON CONFLICT (day, source) DO UPDATE SET article_count = article_count + excluded.article_count
+                ''', [(day, source, count) for (day, source), count in source_counts.items()])
+                conn.executemany('''
+                INSERT INTO news_daily_coin_counts (day, coin, article_count) VALUES (?, ?, ?)
+                ON CONFLICT (day, coin) DO UPDATE SET article_count = article_count + excluded.article_count
+                ''', [(day, coin, count) for (day, coin), count in coin_counts.items()])
+                
+                # The watermark is committed with the counts, so a crash can't count rows twice
+                last_id = rows[-1][0]
+                conn.execute("INSERT OR REPLACE INTO maintenance_state (key, value) VALUES ('rollup_last_news_id', ?)",
+                             (str(last_id),))
+                conn.commit()
+            finally:
+                conn.close()
+            total += len(rows)
+        return total
+    
+    def _coins_for(self, source, categories):
+        """Coin codes of an article; only CryptoPanic categories are reliable currency codes"""
+        if source != 'cryptopanic' or not categories:
+            return []
+        return [code.strip().upper() for code in categories.split(',') if code.strip()]
+    
+    def trim_news_bodies(self):
+        """Drop the body of articles older than news_body_days, keeping title and metadata"""
+        days = self.settings["news_body_days"]
+        if not days:
+            return 0
+        cutoff_ts = int(self._cutoff(days).timestamp())
+        return self._run_chunked('''
+        UPDATE news SET body = '' WHERE id IN (
+            SELECT id FROM news WHERE published_ts < ? AND body != '' LIMIT ?
+        )
+        ''', (cutoff_ts,))
+    
+    def train_body_dictionary(self):
+        """
+        Train a new preset dictionary for body compression on the most recent bodies.
+        
+        Returns:
+            Size of the stored dictionary in bytes (0 if there are no bodies to learn from)
+        """
+        settings = self.db.body_compression
+        samples, sample_bytes = [], 0
+        conn = self.db._get_connection()
+        try:
+            for (body,) in conn.execute('''
+            SELECT news_body(body) FROM news WHERE length(body) >= ? ORDER BY id DESC
+            ''', (settings["min_length"],)):
+                samples.append(body)
+                sample_bytes += len(body)
+                if sample_bytes >= settings["train_bytes"]:
+                    break
+        finally:
+            conn.close()
+        dictionary = train_dictionary(samples, settings["dict_size"])
+        if not dictionary:
+            logger.warning("Not enough article bodies to train a compression dictionary")
+            return 0
+        self.db.save_body_dictionary(dictionary, sample_bytes)
+        logger.info(f"Trained a {len(dictionary)} byte body dictionary on {len(samples)} articles")
+        return len(dictionary)
+    
+    def compress_news_bodies(self, retrain=False):
+        """
+        Compress article bodies still stored as text, chunk by chunk.
+        
+        A dictionary is trained first if there is none yet (or `retrain` is set);
+        bodies already compressed keep the dictionary they were written with.
+        
+        Returns:
+            Number of bodies compressed
+        """
+        if self.db.body_dictionary is None or retrain:
+            self.train_body_dictionary()
+        settings = self.db.body_compression
+        last_id = total = 0
+        while True:
+            conn = self.db._get_connection()
+            try:
+                rows = conn.execute('''
+                SELECT id, body FROM news
+                WHERE id > ? AND typeof(body) = 'text' AND length(body) >= ?
+                ORDER BY id LIMIT ?
+                ''', (last_id, settings["min_length"], self.chunk_size)).fetchall()
+                if not rows:
+                    break
+                updates = []
+                for news_id, body in rows:
+                    encoded = encode_body(body, self.db.body_dictionary, settings["level"], settings["min_length"])
+                    if isinstance(encoded, bytes):
+                        updates.append((encoded, news_id))
+                conn.executemany("UPDATE news SET body = ? WHERE id = ?", updates)
+                conn.commit()
+            finally:
+                conn.close()
+            last_id = rows[-1][0]
+            total += len(updates)
+            time.sleep(0.001)
+        return total
+    
+    def delete_old_coin_snapshots(self):
+        """Delete coin snapshots older than coin_snapshots_days and versions no longer referenced"""
+        days = self.settings["coin_snapshots_days"]
+        if not days:
+            return 0
+        cutoff = self._cutoff(days).astimezone().replace(tzinfo=None).isoformat()
+        # The latest snapshot of every coin is kept regardless of age
+        deleted = self._run_chunked('''
+        DELETE FROM coin_snapshots WHERE id IN (
+            SELECT id FROM coin_snapshots
+            WHERE collected_at < ?
+            AND id NOT IN (SELECT MAX(id) FROM coin_snapshots GROUP BY coin_id)
+            LIMIT ?
+        )
+        ''', (cutoff,))
+        self._run_chunked('''
+        DELETE FROM coin_versions WHERE id IN (
+            SELECT id FROM coin_versions
+            WHERE id NOT IN (SELECT version_id FROM coin_snapshots)
+            LIMIT ?
+        )
+        ''')
+        return deleted
+    
+    def delete_finished_jobs(self):
+        """Delete done and failed queue jobs older than jobs_days"""
+        days = self.settings["jobs_days"]
+        if not days:
+            return 0
+        cutoff = self._cutoff(days).astimezone().replace(tzinfo=None).isoformat()
+        return self._run_chunked('''
+        DELETE FROM jobs WHERE id IN (
+            SELECT id FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ? LIMIT ?
+        )
+        ''', (cutoff,))
+    
+    def delete_old_analyses(self):
+        """Delete stored analyses older than news_analysis_days"""
+        days = self.settings["news_analysis_days"]
+        if not days:
+            return 0
+        conn = self.db._get_connection()
+        try:
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'news_analysis'").fetchone()
+        finally:
+            conn.close()
+        if not exists:
+            return 0
+        cutoff = self._cutoff(days).astimezone().replace(tzinfo=None).isoformat()
+        return self._run_chunked('''
+        DELETE FROM news_analysis WHERE id IN (
+            SELECT id FROM news_analysis WHERE created_at < ? LIMIT ?
+        )
+        ''', (cutoff,))
+    
+    def incremental_vacuum(self):
+        """Return free pages to the file system in small steps"""
+        conn = self.db._get_connection()
+        try:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            if mode != 2:
+                logger.warning("Database is not in incremental auto-vacuum mode; "
+                               "run `python main.py --maintenance --convert-vacuum` once to enable it")
+                return 0
+            freed = 0
+            while True:
+                free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if free_pages == 0:
+                    return freed
+                step = min(free_pages, self.settings["vacuum_pages"])
+                conn.execute(f"PRAGMA incremental_vacuum({step})").fetchall()
+                conn.commit()
+                freed += step
+                time.sleep(0.001)
+        finally:
+            conn.close()
+    
+    def convert_to_incremental_vacuum(self):
+        """Switch an existing database to incremental auto-vacuum (one blocking full VACUUM)"""
+        conn = self.db._get_connection()
+        try:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            logger.info("Running full VACUUM to enable incremental auto-vacuum; writers are blocked meanwhile")
+            conn.execute("VACUUM")
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        finally:
+            conn.close()
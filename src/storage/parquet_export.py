@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from .body_codec import decode_body
+from .database import NewsDatabase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Low-cardinality columns stored as Arrow dictionaries (pandas categoricals when read back)
+DICTIONARY_COLUMNS = ['source', 'source_name', 'categories', 'coin_id', 'name', 'kind', 'section', 'key']
+
+class ParquetExporter:
+    """
+    Incrementally exports news, coin snapshots and analyses to partitioned Parquet.
+    
+    Each table keeps an id watermark in the maintenance_state table, and only
+    rows added since the previous export are read and written as new files:
+    
+        <output_dir>/news/date=YYYY-MM-DD/source=<source>/part-<first id>-0.parquet
+        <output_dir>/coin_updates/date=YYYY-MM-DD/part-<first id>-0.parquet
+        <output_dir>/news_analysis/date=YYYY-MM-DD/part-<first id>-0.parquet
+    
+    The dataset can be read with pandas.read_parquet(f"{output_dir}/news").
+    
+    The export advances by id watermark only, so a row is written once, when
+    it is new, and later updates and deletes never reach the Parquet files:
+    `analyzed` keeps its value at export time, bodies trimmed by retention
+    stay complete and rows removed by retention stay exported. (Bodies
+    compressed later are unaffected, since they are exported decoded.) To pick
+    up such changes, delete the output directory and the export_*_last_id
+    keys in maintenance_state and export again.
+    """
+    
+    def __init__(self, config_path="config/api_config.json", output_dir="data/exports", batch_size=50000):
+        self.db = NewsDatabase(config_path)
+        self.output_dir = output_dir
+        self.batch_size = batch_size
+        
+    def run(self):
+        """
+        Export all rows added since the last run.
+        
+        Returns:
+            Dictionary with the number of rows exported per table, or None if pyarrow is missing
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            logger.error("Parquet export requires pyarrow (pip install pyarrow)")
+            return None
+            
+        start = time.perf_counter()
+        results = {
+            'news': self._export('news', '''
+                SELECT id, source, title, body, published_at, published_ts, url,
+                       source_name, categories, collected_at, analyzed
+                FROM news WHERE id > ? ORDER BY id LIMIT ?
+            ''', self._news_rows, ['date', 'source']),
+            'coin_updates': self._export('coin_updates', '''
+                SELECT s.id, s.coin_id, v.name, v.description, v.links, s.last_updated, s.collected_at
+                FROM coin_snapshots s JOIN coin_versions v ON v.id = s.version_id
+                WHERE s.id > ? ORDER BY s.id LIMIT ?
+            ''', self._coin_rows, ['date']),
+            'news_analysis': self._export('news_analysis', '''
+                SELECT id, analysis_data, created_at, kind FROM news_analysis
+                WHERE id > ? ORDER BY id LIMIT ?
+            ''', self._analysis_rows, ['date'])
+        }
+        logger.info(f"Parquet export finished in {time.perf_counter() - start:.1f}s: {results}")
+        return results
+    
+    def _export(self, table, query, to_rows, partition_cols):
+        """Export rows of `table` above its watermark batch by batch"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        state_key = f"export_{table}_last_id"
+        last_id = int(self.db.get_state(state_key, 0))
+        exported = 0
+        conn = self.db._get_connection()
+        try:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (table,)).fetchone():
+                return 0
+            while True:
+                batch = conn.execute(query, (last_id, self.batch_size)).fetchall()
+                if not batch:
+                    break
+                    
+                columns = to_rows(batch)
+                arrow_table = pa.table(columns)
+                for name in DICTIONARY_COLUMNS:
+                    if name in columns and name not in partition_cols:
+                        index = arrow_table.schema.get_field_index(name)
+                        if not pa.types.is_string(arrow_table.schema.field(index).type):
+                            continue
+                        arrow_table = arrow_table.set_column(index, name, arrow_table.column(name).dictionary_encode())
+                        
+                pq.write_to_dataset(
+                    arrow_table,
+                    root_path=os.path.join(self.output_dir, table),
+                    partition_cols=partition_cols,
+                    basename_template=f"part-{batch[0][0]}-{{i}}.parquet",
+                    existing_data_behavior='overwrite_or_ignore',
+                    compression='zstd',
+                    use_dictionary=[name for name in DICTIONARY_COLUMNS if name in columns]
+                )
+                
+                # Advance the watermark only after the files are written
+                last_id = batch[-1][0]
+                self.db.set_state(state_key, last_id)
+                exported += len(columns['id'])
+                if len(batch) < self.batch_size:
+                    break
+        finally:
+            conn.close()
+        return exported
+    
+    def _columns(self, names, rows):
+        return {name: list(values) for name, values in zip(names, zip(*rows))}
+    
+    def _news_rows(self, batch):
+        columns = self._columns(['id', 'source', 'title', 'body', 'published_at', 'published_ts', 'url',
+                                 'source_name', 'categories', 'collected_at', 'analyzed'], batch)
+        # Compressed bodies are exported as plain text
+        columns['body'] = [decode_body(value) for value in columns['body']]
+        # published_at mixes epoch numbers and ISO strings; published_ts is the typed column
+        columns['published_at'] = [str(value) if value is not None else None for value in columns['published_at']]
+        columns['analyzed'] = [bool(value) for value in columns['analyzed']]
+        columns['date'] = [datetime.fromtimestamp(ts or 0, tz=timezone.utc).strftime('%Y-%m-%d')
+                           for ts in columns['published_ts']]
+        return columns
+    
+    def _coin_rows(self, batch):
+        columns = self._columns(['id', 'coin_id', 'name', 'description', 'links', 'last_updated', 'collected_at'], batch)
+        columns['date'] = [(value or '')[:10] or 'unknown' for value in columns['collected_at']]
+        return columns
+    
+    def _analysis_rows(self, batch):
+        """Flatten each analysis into one row per section item"""
+        columns = {name: [] for name in ['id', 'analysis_id', 'created_at', 'kind', 'section', 'key', 'item_index',
+                                         'content', 'date']}
+        for analysis_id, analysis_data, created_at, kind in batch:
+            try:
+                analysis = json.loads(analysis_data)
+            except (TypeError, json.JSONDecodeError):
+                analysis = {'analysis': analysis_data}
+            if isinstance(analysis, dict) and isinstance(analysis.get('analysis'), dict):
+                analysis = analysis['analysis']
+            if not isinstance(analysis, dict):
+                analysis = {'analysis': analysis}
+                
+            for section, value in analysis.items():
+                if isinstance(value, list):
+                    entries = [(None, index, item) for index, item in enumerate(value)]
+                elif isinstance(value, dict):
+                    entries = [(key, index, item) for index, (key, item) in enumerate(value.items())]
+                else:
+                    entries = [(None, 0, value)]
+                for key, index, item in entries:
+                    columns['id'].append(analysis_id)
+                    columns['analysis_id'].append(analysis_id)
+                    columns['created_at'].append(created_at)
+                    columns['kind'].append(kind)
+                    columns['section'].append(section)
+                    columns['key'].append(key)
+                    columns['item_index'].append(index)
+                    columns['content'].append(item if isinstance(item, str) else json.dumps(item))
+                    columns['date'].append((created_at or '')[:10] or 'unknown')
+        return columns
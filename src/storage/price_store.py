@@ -0,0 +1,299 @@
+import logging
+import os
+import time
+import numpy as np
+from src.data_collection.api_clients import CoinGeckoClient
+from .database import NewsDatabase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRICES = {
+    "enabled": True,
+    "path": None,  # defaults to a "prices" directory next to the SQLite database
+    "vs_currency": "usd",
+    "backfill_days": 90,
+    # Lookups further than this from the nearest earlier sample return NaN
+    "max_gap_seconds": 7200,
+}
+
+# Fixed-width column files per coin; every file holds one value per sample
+COLUMNS = {
+    "ts": np.dtype("<i8"),
+    "price": np.dtype("<f8"),
+    "market_cap": np.dtype("<f8"),
+    "volume": np.dtype("<f8"),
+}
+
+# Windows around publication, in seconds, used for article returns
+DEFAULT_HORIZONS = (-3600, 3600, 4 * 3600, 24 * 3600)
+
+def horizon_label(seconds):
+    """Column suffix of a horizon, e.g. 3600 -> "1h", -86400 -> "-1d"""
+    sign = "-" if seconds < 0 else ""
+    seconds = abs(seconds)
+    if seconds % 86400 == 0:
+        return f"{sign}{seconds // 86400}d"
+    if seconds % 3600 == 0:
+        return f"{sign}{seconds // 3600}h"
+    return f"{sign}{seconds // 60}m"
+
+class PriceStore:
+    """
+    Columnar store of CoinGecko market_chart samples.
+    
+    Each coin has one directory with a raw little-endian file per column
+    (ts as int64 epoch seconds; price, market_cap and volume as float64),
+    sorted by ts. Files are only ever appended to and are read through
+    np.memmap, so queries touch just the pages they need and a reader never
+    loads a whole history into memory. A crash between column appends leaves
+    files of different lengths; readers use the shortest and the next append
+    truncates the rest, so the columns can't drift apart.
+    
+    Configure it in the "prices" section of the config file.
+    """
+    
+    def __init__(self, config_path="config/api_config.json", db=None):
+        self.db = db or NewsDatabase(config_path)
+        self.settings = dict(DEFAULT_PRICES, **self.db.config.get("prices", {}))
+        self.path = self.settings["path"] or os.path.join(os.path.dirname(self.db.db_path) or ".", "prices")
+        self.client = CoinGeckoClient(config_path)
+        # coin_id -> (file length, column memmaps), reopened when the files grow
+        self._maps = {}
+    
+    def _coin_dir(self, coin_id):
+        return os.path.join(self.path, coin_id)
+    
+    def _length(self, coin_id):
+        """Number of complete samples, i.e. the length of the shortest column"""
+        directory = self._coin_dir(coin_id)
+        lengths = []
+        for name, dtype in COLUMNS.items():
+            try:
+                lengths.append(os.path.getsize(os.path.join(directory, name)) // dtype.itemsize)
+            except OSError:
+                return 0
+        return min(lengths)
+    
+    def coins(self):
+        """Coin ids with stored samples"""
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name for name in os.listdir(self.path) if self._length(name))
+    
+    def series(self, coin_id):
+        """
+        Get all samples of a coin as read-only memory-mapped columns.
+        
+        Returns:
+            Dictionary of column name -> 1-D array, all of equal length (empty if unknown)
+        """
+        length = self._length(coin_id)
+        cached = self._maps.get(coin_id)
+        if cached and cached[0] == length:
+            return cached[1]
+        if not length:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        columns = {name: np.memmap(os.path.join(self._coin_dir(coin_id), name), dtype=dtype, mode="r", shape=(length,))
+                   for name, dtype in COLUMNS.items()}
+        self._maps[coin_id] = (length, columns)
+        return columns
+    
+    def last_ts(self, coin_id):
+        ts = self.series(coin_id)["ts"]
+        return int(ts[-1]) if len(ts) else None
+    
+    def append(self, coin_id, ts, price, market_cap=None, volume=None):
+        """
+        Append samples newer than the stored ones.
+        
+        Args:
+            coin_id: CoinGecko coin id
+            ts: Epoch seconds of the samples, in any order
+            price, market_cap, volume: Values per sample (market_cap/volume may be None)
+        
+        Returns:
+            Number of samples appended
+        """
+        ts = np.asarray(ts, dtype=COLUMNS["ts"])
+        values = {
+            "ts": ts,
+            "price": np.asarray(price, dtype=COLUMNS["price"]),
+            "market_cap": np.full(len(ts), np.nan) if market_cap is None else np.asarray(market_cap, dtype=COLUMNS["market_cap"]),
+            "volume": np.full(len(ts), np.nan) if volume is None else np.asarray(volume, dtype=COLUMNS["volume"]),
+        }
+        order = np.argsort(ts, kind="stable")
+        ts = ts[order]
+        # One sample per second, the latest value of a duplicate wins
+        keep = np.append(ts[1:] != ts[:-1], True) if len(ts) else np.zeros(0, dtype=bool)
+        last = self.last_ts(coin_id)
+        if last is not None:
+            keep &= ts > last
+        if not keep.any():
+            return 0
+        
+        directory = self._coin_dir(coin_id)
+        os.makedirs(directory, exist_ok=True)
+        length = self._length(coin_id)
+        for name, dtype in COLUMNS.items():
+            with open(os.path.join(directory, name), "ab") as f:
+                # Drop a partial tail left by an interrupted append
+                f.truncate(length * dtype.itemsize)
+                f.write(values[name][order][keep].astype(dtype, copy=False).tobytes())
+        return int(keep.sum())
+    
+    def ingest(self, coin_ids, days=None):
+        """
+        Fetch market_chart data for each coin and append what is new.
+        
+        Coins without data are backfilled `backfill_days`; others fetch only
+        the days since their last sample, so repeated runs stay cheap.
+        
+        Returns:
+            Dictionary of coin_id -> samples appended
+        """
+        start = time.perf_counter()
+        appended = {}
+        for coin_id in coin_ids:
+            last = self.last_ts(coin_id)
+            fetch_days = days
+            if fetch_days is None:
+                fetch_days = self.settings["backfill_days"] if last is None else \
+                    min(self.settings["backfill_days"], int((time.time() - last) // 86400) + 1)
+            chart = self.client.get_market_chart(coin_id, days=fetch_days, vs_currency=self.settings["vs_currency"])
+            if not chart:
+                continue
+            ts, price, market_cap, volume = chart
+            appended[coin_id] = self.append(coin_id, ts, price, market_cap, volume)
+        logger.info(f"Appended {sum(appended.values())} price samples for {len(appended)} coins "
+                    f"in {time.perf_counter() - start:.2f}s")
+        return appended
+    
+    def range(self, coin_id, start_ts=None, end_ts=None):
+        """Get the samples with start_ts <= ts < end_ts as zero-copy column views"""
+        columns = self.series(coin_id)
+        ts = columns["ts"]
+        lo = 0 if start_ts is None else int(np.searchsorted(ts, start_ts, side="left"))
+        hi = len(ts) if end_ts is None else int(np.searchsorted(ts, end_ts, side="left"))
+        return {name: column[lo:hi] for name, column in columns.items()}
+    
+    def resample(self, coin_id, interval, start_ts=None, end_ts=None):
+        """
+        Aggregate samples into OHLC bars of `interval` seconds.
+        
+        Returns:
+            Dictionary with ts (bar start), open, high, low, close and volume
+            (last value per bar; CoinGecko volumes are rolling 24h totals)
+        """
+        columns = self.range(coin_id, start_ts, end_ts)
+        ts, price = columns["ts"], columns["price"]
+        if not len(ts):
+            return {name: np.empty(0) for name in ("ts", "open", "high", "low", "close", "volume")}
+        buckets = ts // interval
+        starts = np.concatenate(([0], np.flatnonzero(buckets[1:] != buckets[:-1]) + 1))
+        ends = np.append(starts[1:], len(ts)) - 1
+        return {
+            "ts": buckets[starts] * interval,
+            "open": price[starts],
+            "high": np.maximum.reduceat(price, starts),
+            "low": np.minimum.reduceat(price, starts),
+            "close": price[ends],
+            "volume": columns["volume"][ends],
+        }
+    
+    def price_at(self, coin_id, ts):
+        """
+        Vectorized as-of lookup: the last price at or before each timestamp.
+        
+        Returns:
+            float64 array like `ts`; NaN where there is no sample within max_gap_seconds before
+        """
+        ts = np.asarray(ts, dtype=COLUMNS["ts"])
+        columns = self.series(coin_id)
+        sample_ts, price = columns["ts"], columns["price"]
+        result = np.full(ts.shape, np.nan)
+        if not len(sample_ts):
+            return result
+        index = np.searchsorted(sample_ts, ts, side="right") - 1
+        found = index >= 0
+        index = np.where(found, index, 0)
+        found &= ts - sample_ts[index] <= self.settings["max_gap_seconds"]
+        result[found] = price[index[found]]
+        return result
+    
+    def returns_around(self, coin_id, ts, horizons=DEFAULT_HORIZONS):
+        """
+        Price returns around each timestamp.
+        
+        A positive horizon h gives the move after the event, p(t + h) / p(t) - 1;
+        a negative one the run-up before it, p(t) / p(t + h) - 1.
+        
+        Returns:
+            Dictionary with "price" (p(t)) and "return_<h>" arrays, e.g. return_1h
+        """
+        ts = np.asarray(ts, dtype=COLUMNS["ts"])
+        base = self.price_at(coin_id, ts)
+        last = self.last_ts(coin_id)
+        result = {"price": base}
+        for horizon in horizons:
+            other = self.price_at(coin_id, ts + horizon)
+            # Horizons still in the future have no price yet
+            if horizon > 0 and last is not None:
+                other[ts + horizon > last] = np.nan
+            with np.errstate(divide="ignore", invalid="ignore"):
+                result[f"return_{horizon_label(horizon)}"] = other / base - 1 if horizon > 0 else base / other - 1
+        return result
+    
+    def news_returns(self, horizons=DEFAULT_HORIZONS, since_ts=None, as_dataframe=False):
+        """
+        Attach price returns to every (article, mentioned coin) pair of the news_coins index.
+        
+        Args:
+            horizons: Seconds around published_ts, see returns_around
+            since_ts: Only articles published after this epoch timestamp
+            as_dataframe: Return a pandas DataFrame instead of a dict of arrays
+        
+        Returns:
+            Columns news_id, coin_id, published_ts, price and return_<h> for
+            each coin with stored prices; a price is NaN where the store has no
+            sample near the article
+        """
+        coins = self.coins()
+        empty = {"news_id": np.empty(0, dtype=np.int64), "coin_id": np.empty(0, dtype=object),
+                 "published_ts": np.empty(0, dtype=np.int64)}
+        conn = self.db._get_connection()
+        try:
+            rows = conn.execute(f'''
+            SELECT nc.news_id, nc.coin_id, n.published_ts
+            FROM news_coins nc JOIN news n ON n.id = nc.news_id
+            WHERE n.published_ts > ? AND nc.coin_id IN ({', '.join('?' for _ in coins)})
+            ORDER BY nc.coin_id, n.published_ts
+            ''', [since_ts or 0] + coins).fetchall() if coins else []
+        finally:
+            conn.close()
+        
+        if rows:
+            news_ids, coin_ids, published = zip(*rows)
+            result = {"news_id": np.asarray(news_ids, dtype=np.int64), "coin_id": np.asarray(coin_ids, dtype=object),
+                      "published_ts": np.asarray(published, dtype=np.int64)}
+        else:
+            result = empty
+        
+        # Rows are grouped by coin, so each coin is one vectorized lookup over a contiguous slice
+        coin_ids = result["coin_id"]
+        bounds = np.flatnonzero(coin_ids[1:] != coin_ids[:-1]) + 1 if len(coin_ids) else np.empty(0, dtype=np.int64)
+        starts = np.concatenate(([0], bounds)).astype(np.int64)
+        ends = np.append(bounds, len(coin_ids)).astype(np.int64)
+        for start, end in zip(starts, ends):
+            if start == end:
+                continue
+            returns = self.returns_around(coin_ids[start], result["published_ts"][start:end], horizons)
+            for name, values in returns.items():
+                result.setdefault(name, np.full(len(coin_ids), np.nan))[start:end] = values
+        for name in ["price"] + [f"return_{horizon_label(h)}" for h in horizons]:
+            result.setdefault(name, np.full(len(coin_ids), np.nan))
+        
+        if as_dataframe:
+            import pandas as pd
+            return pd.DataFrame(result)
+        return result
@@ -0,0 +1,351 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from src.monitoring.metrics import REPLICA_SYNC_SECONDS, REPLICA_ROWS_TOTAL
+from .database import NewsDatabase
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLICA = {
+    # Sync after every collector cycle (--continuous)
+    "enabled": False,
+    "path": None,  # defaults to crypto_news_replica.db next to the database
+    "pages_per_step": 1024,
+    "step_sleep_seconds": 0.005,
+    # A backup restarts whenever the writer commits; after this many restarts
+    # the rest is copied in one step (in WAL mode that still doesn't block the writer)
+    "max_restarts": 5,
+    "chunk_size": 500,
+}
+
+# Tables that are never replicated
+SKIPPED_TABLES = ('replica_changes', 'replica_state')
+
+class _TooManyRestarts(Exception):
+    pass
+
+def replica_path(config, db_path):
+    """Path of the read replica configured for the database at `db_path`"""
+    path = dict(DEFAULT_REPLICA, **config.get("replica", {}))["path"]
+    if path:
+        return path
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_replica{ext or '.db'}"
+
+class ReplicaExporter:
+    """
+    Consistent copies of the SQLite database taken while the collector writes to it.
+    
+    snapshot() writes a standalone backup file with SQLite's online backup API
+    in steps of `pages_per_step` pages, so even in rollback-journal mode the
+    writer only waits for one step at a time.
+    
+    sync() keeps a read replica up to date. Triggers on the source record the
+    key of every inserted, updated or deleted row in replica_changes; each sync
+    reads the changes and the current rows in one read transaction (a consistent
+    snapshot that doesn't block the WAL writer) and applies them to the replica
+    in one write transaction, so readers of the replica always see a consistent
+    state and never contend with the ingest writer. The first sync, a schema
+    change on the source or a replica that fell behind the pruned changelog
+    rebuild the replica from a full snapshot instead.
+    
+    One replica per database; configure it in the "replica" section of the config file.
+    """
+    
+    def __init__(self, config_path="config/api_config.json", db=None):
+        self.db = db or NewsDatabase(config_path)
+        self.settings = dict(DEFAULT_REPLICA, **self.db.config.get("replica", {}))
+        self.path = replica_path(self.db.config, self.db.db_path)
+    
+    def _connect(self, path):
+        return sqlite3.connect(path, timeout=30)
+    
+    def _backup(self, source, dest_path):
+        """Copy `source` into a new database file in paged steps; returns (pages, restarts)"""
+        progress = {"remaining": None, "total": 0, "restarts": 0}
+        
+        def on_progress(status, remaining, total):
+            if progress["remaining"] is not None and remaining > progress["remaining"]:
+                progress["restarts"] += 1
+                if progress["restarts"] > self.settings["max_restarts"]:
+                    raise _TooManyRestarts()
+            progress["remaining"], progress["total"] = remaining, total
+        
+        dest = self._connect(dest_path)
+        try:
+            try:
+                source.backup(dest, pages=self.settings["pages_per_step"], progress=on_progress,
+                              sleep=self.settings["step_sleep_seconds"])
+            except _TooManyRestarts:
+                logger.info(f"Backup restarted {progress['restarts']} times; copying the rest in one step")
+                source.backup(dest)
+            pages = dest.execute("PRAGMA page_count").fetchone()[0]
+        finally:
+            dest.close()
+        return pages, progress["restarts"]
+    
+    def _remove(self, path):
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    
+    def snapshot(self, dest_path):
+        """
+        Write a consistent standalone copy of the database to `dest_path`.
+        
+        Returns:
+            Dictionary with the pages copied, backup restarts and seconds taken
+        """
+        start = time.perf_counter()
+        tmp_path = f"{dest_path}.tmp"
+        self._remove(tmp_path)
+        directory = os.path.dirname(dest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        source = self._connect(self.db.db_path)
+        try:
+            pages, restarts = self._backup(source, tmp_path)
+        finally:
+            source.close()
+        # A single self-contained file, without the source's WAL mode
+        conn = self._connect(tmp_path)
+        try:
+            conn.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            conn.close()
+        os.replace(tmp_path, dest_path)
+        elapsed = time.perf_counter() - start
+        REPLICA_SYNC_SECONDS.observe(elapsed, mode="snapshot")
+        logger.info(f"Snapshot of {pages} pages written to {dest_path} in {elapsed:.2f}s ({restarts} restarts)")
+        return {"pages": pages, "restarts": restarts, "seconds": elapsed}
+    
+    def _tables(self, conn):
+        """Replicated tables with their key columns ("rowid" unless the table is WITHOUT ROWID)"""
+        tables = {}
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"):
+            if name in SKIPPED_TABLES:
+                continue
+            try:
+                conn.execute(f'SELECT rowid FROM "{name}" LIMIT 0')
+                tables[name] = ["rowid"]
+            except sqlite3.OperationalError:
+                columns = sorted((row[5], row[1]) for row in conn.execute(f'PRAGMA table_info("{name}")') if row[5])
+                tables[name] = [column for _, column in columns]
+        return tables
+    
+    def _install_triggers(self, conn):
+        """Create the changelog and its triggers on the source (idempotent)"""
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS replica_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tbl TEXT,
+            row_key TEXT
+        )
+        ''')
+        for table, keys in self._tables(conn).items():
+            new_key = f"json_array({', '.join(f'NEW.{key}' for key in keys)})"
+            old_key = f"json_array({', '.join(f'OLD.{key}' for key in keys)})"
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS replica_{table}_insert AFTER INSERT ON "{table}" BEGIN
+                INSERT INTO replica_changes (tbl, row_key) VALUES ('{table}', {new_key});
+            END
+            ''')
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS replica_{table}_update AFTER UPDATE ON "{table}" BEGIN
+                INSERT INTO replica_changes (tbl, row_key) VALUES ('{table}', {new_key});
+                INSERT INTO replica_changes (tbl, row_key) SELECT '{table}', {old_key} WHERE {old_key} != {new_key};
+            END
+            ''')
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS replica_{table}_delete AFTER DELETE ON "{table}" BEGIN
+                INSERT INTO replica_changes (tbl, row_key) VALUES ('{table}', {old_key});
+            END
+            ''')
+        conn.commit()
+    
+    def stop(self):
+        """Remove the triggers and changelog from the source, e.g. when the replica is retired"""
+        conn = self._connect(self.db.db_path)
+        try:
+            triggers = [name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'replica\\_%' ESCAPE '\\'")]
+            for name in triggers:
+                conn.execute(f'DROP TRIGGER "{name}"')
+            conn.execute("DROP TABLE IF EXISTS replica_changes")
+            conn.commit()
+        finally:
+            conn.close()
+        logger.info(f"Removed {len(triggers)} replication triggers")
+    
+    def _rebuild(self):
+        """Replace the replica with a full snapshot that remembers its changelog position"""
+        start = time.perf_counter()
+        source = self._connect(self.db.db_path)
+        tmp_path = f"{self.path}.tmp"
+        self._remove(tmp_path)
+        try:
+            self._install_triggers(source)
+            # Read before copying: a schema change during the copy then forces another rebuild rather than being missed
+            schema_version = source.execute("PRAGMA schema_version").fetchone()[0]
+            pages, restarts = self._backup(source, tmp_path)
+        finally:
+            source.close()
+        
+        conn = self._connect(tmp_path)
+        try:
+            # The copied changelog ends exactly at the copied state (even if it was pruned empty)
+            last_seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'replica_changes'").fetchone()[0]
+            for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                        "AND name LIKE 'replica\\_%' ESCAPE '\\'").fetchall():
+                conn.execute(f'DROP TRIGGER "{name}"')
+            conn.execute("DROP TABLE replica_changes")
+            conn.execute("CREATE TABLE replica_state (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany("INSERT INTO replica_state (key, value) VALUES (?, ?)", [
+                ("last_seq", str(last_seq)),
+                ("schema_version", str(schema_version)),
+                ("synced_at", datetime.now().isoformat())
+            ])
+            conn.commit()
+            
+            if os.path.exists(self.path):
+                # Copied into the open replica in one transaction, so its readers switch over atomically
+                replica = self._connect(self.path)
+                try:
+                    conn.backup(replica)
+                finally:
+                    replica.close()
+        finally:
+            conn.close()
+        if os.path.exists(self.path):
+            self._remove(tmp_path)
+        else:
+            self._remove(self.path)
+            os.replace(tmp_path, self.path)
+        
+        self._prune(last_seq)
+        elapsed = time.perf_counter() - start
+        REPLICA_SYNC_SECONDS.observe(elapsed, mode="rebuild")
+        logger.info(f"Rebuilt replica {self.path} from a {pages} page snapshot in {elapsed:.2f}s ({restarts} restarts)")
+        return {"mode": "rebuild", "pages": pages, "rows": 0, "seq": last_seq, "seconds": elapsed}
+    
+    def _prune(self, seq):
+        """Delete changelog entries the replica has applied"""
+        conn = self._connect(self.db.db_path)
+        try:
+            while True:
+                deleted = conn.execute('''
+                DELETE FROM replica_changes WHERE seq IN (
+                    SELECT seq FROM replica_changes WHERE seq <= ? ORDER BY seq LIMIT ?
+                )
+                ''', (seq, self.settings["chunk_size"] * 10)).rowcount
+                conn.commit()
+                if deleted < self.settings["chunk_size"] * 10:
+                    break
+        finally:
+            conn.close()
+    
+    def sync(self):
+        """
+        Bring the replica up to date with the rows changed since the last sync.
+        
+        Returns:
+            Dictionary with mode ("delta" or "rebuild"), rows applied, the
+            changelog position reached and seconds taken
+        """
+        if self.db.db_type != "sqlite":
+            logger.error("Replication requires the SQLite backend")
+            return None
+        if not os.path.exists(self.path):
+            return self._rebuild()
+        
+        start = time.perf_counter()
+        result = self._apply_changes()
+        if result is None:
+            return self._rebuild()
+        rows_applied, last_seq, max_seq = result
+        if max_seq > last_seq:
+            self._prune(max_seq)
+        elapsed = time.perf_counter() - start
+        REPLICA_SYNC_SECONDS.observe(elapsed, mode="delta")
+        REPLICA_ROWS_TOTAL.inc(rows_applied)
+        logger.info(f"Applied {rows_applied} changed rows to replica {self.path} in {elapsed:.2f}s")
+        return {"mode": "delta", "pages": 0, "rows": rows_applied, "seq": max_seq, "seconds": elapsed}
+    
+    def _apply_changes(self):
+        """Apply pending changes to the replica; returns (rows, previous seq, new seq), or None if it needs a rebuild"""
+        replica = self._connect(self.path)
+        source = self._connect(self.db.db_path)
+        try:
+            try:
+                state = dict(replica.execute("SELECT key, value FROM replica_state"))
+                last_seq = int(state["last_seq"])
+            except (sqlite3.DatabaseError, KeyError, ValueError) as e:
+                logger.warning(f"{self.path} is not a usable replica ({e}); rebuilding it")
+                return None
+            
+            # Everything below is read from one consistent snapshot of the source
+            source.execute("BEGIN")
+            try:
+                max_seq = source.execute("SELECT MAX(seq) FROM replica_changes").fetchone()[0] or last_seq
+            except sqlite3.OperationalError:
+                return None
+            schema_version = source.execute("PRAGMA schema_version").fetchone()[0]
+            # Pruning deletes a prefix of the gapless AUTOINCREMENT sequence, up to what a sync applied
+            first_seq = source.execute("SELECT MIN(seq) FROM replica_changes").fetchone()[0]
+            pruned = first_seq - 1 if first_seq is not None else source.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'replica_changes'").fetchone()[0]
+            if str(schema_version) != state.get("schema_version") or last_seq < pruned:
+                logger.info("Source schema changed or replica is behind the changelog; rebuilding it")
+                return None
+            
+            changed = {}
+            for table, row_key in source.execute(
+                    "SELECT tbl, row_key FROM replica_changes WHERE seq > ? AND seq <= ?", (last_seq, max_seq)):
+                changed.setdefault(table, set()).add(row_key)
+            tables = self._tables(source)
+            
+            rows_applied = 0
+            replica.execute("BEGIN IMMEDIATE")
+            for table, row_keys in changed.items():
+                if table in tables:
+                    rows_applied += self._apply(source, replica, table, tables[table],
+                                                [json.loads(key) for key in row_keys])
+            replica.execute("UPDATE replica_state SET value = ? WHERE key = 'last_seq'", (str(max_seq),))
+            replica.execute("UPDATE replica_state SET value = ? WHERE key = 'synced_at'", (datetime.now().isoformat(),))
+            replica.commit()
+            return rows_applied, last_seq, max_seq
+        finally:
+            replica.close()
+            source.close()
+    
+    def _apply(self, source, replica, table, keys, row_keys):
+        """Copy the current version of each changed row, deleting rows that no longer exist"""
+        columns = ["rowid"] if keys == ["rowid"] else []
+        columns += [row[1] for row in source.execute(f'PRAGMA table_info("{table}")')]
+        select = ", ".join(f'"{column}"' if column != "rowid" else "rowid" for column in columns)
+        key_expr = f"({', '.join(keys)})" if len(keys) > 1 else keys[0]
+        key_indexes = [columns.index(key) for key in keys]
+        placeholders = ", ".join("?" for _ in columns)
+        applied = 0
+        chunk_size = self.settings["chunk_size"]
+        for offset in range(0, len(row_keys), chunk_size):
+            chunk = row_keys[offset:offset + chunk_size]
+            if len(keys) > 1:
+                values = ", ".join(f"({', '.join('?' for _ in keys)})" for _ in chunk)
+                rows = source.execute(f'SELECT {select} FROM "{table}" WHERE {key_expr} IN (VALUES {values})',
+                                      [value for key in chunk for value in key]).fetchall()
+            else:
+                rows = source.execute(f'SELECT {select} FROM "{table}" WHERE {key_expr} IN ({", ".join("?" for _ in chunk)})',
+                                      [key[0] for key in chunk]).fetchall()
+            found = {tuple(row[index] for index in key_indexes) for row in rows}
+            replica.executemany(f'INSERT OR REPLACE INTO "{table}" ({select}) VALUES ({placeholders})', rows)
+            gone = [tuple(key) for key in chunk if tuple(key) not in found]
+            if gone:
+                replica.executemany(f'DELETE FROM "{table}" WHERE {" AND ".join(f"{key} = ?" for key in keys)}', gone)
+            applied += len(rows) + len(gone)
+        return applied
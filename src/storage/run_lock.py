@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_TTL = 120
+
+class SQLiteLeaseStore:
+    """run_leases table in the SQLite bookkeeping file, shared by collectors on one host"""
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+        
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+    
+    def acquire(self, name, owner, ttl):
+        """Take the lease if it's free or expired; returns (acquired, current generation)"""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT owner, expires_at, generation FROM run_leases WHERE name = ?",
+                               (name,)).fetchone()
+            if row and row[0] is not None and row[1] >= now and row[0] != owner:
+                conn.execute("COMMIT")
+                return False, row[2]
+            if row and row[0] is not None and row[0] != owner:
+                logger.warning(f"Taking over expired {name} lease of {row[0]}")
+            conn.execute('''
+            INSERT INTO run_leases (name, owner, expires_at, acquired_at, generation)
+            VALUES (?, ?, ?, ?, 0)
+            ON CONFLICT (name) DO UPDATE SET
+                owner = excluded.owner, expires_at = excluded.expires_at, acquired_at = excluded.acquired_at
+            ''', (name, owner, now + ttl, datetime.now().isoformat()))
+            conn.execute("COMMIT")
+            return True, row[2] if row else 0
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+            
+    def renew(self, name, owner, ttl):
+        """Extend a lease we hold; returns False if it was lost"""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "UPDATE run_leases SET expires_at = ? WHERE name = ? AND owner = ?",
+                (time.time() + ttl, name, owner)
+            ).rowcount > 0
+        finally:
+            conn.close()
+            
+    def release(self, name, owner, result=None, completed=False):
+        """Give up the lease; a completed run publishes its JSON result and bumps the generation"""
+        conn = self._connect()
+        try:
+            if completed:
+                conn.execute('''
+                UPDATE run_leases
+                SET owner = NULL, expires_at = 0, generation = generation + 1, result = ?, finished_at = ?
+                WHERE name = ? AND owner = ?
+                ''', (result, datetime.now().isoformat(), name, owner))
+            else:
+                conn.execute("UPDATE run_leases SET owner = NULL, expires_at = 0 WHERE name = ? AND owner = ?",
+                             (name, owner))
+        finally:
+            conn.close()
+            
+    def read(self, name):
+        """Return (owner, expires_at, generation, result) of the lease, or None"""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT owner, expires_at, generation, result FROM run_leases WHERE name = ?",
+                                (name,)).fetchone()
+        finally:
+            conn.close()
+
+class RunCoordinator:
+    """
+    Lease-based run lock with single-flight semantics across processes.
+    
+    Each named run (e.g. "analysis") has one row in run_leases. The process
+    holding an unexpired lease does the work and renews the lease while it
+    runs; others wait and then reuse its stored result instead of repeating
+    the work. A lease that is not renewed expires after `ttl` seconds, so a
+    crashed holder never blocks the next run.
+    
+    The leases live in the storage backend's shared database when it has one
+    (the sqlalchemy backend, so collectors on different hosts coordinate) and
+    in the SQLite bookkeeping file otherwise.
+    """
+    
+    def __init__(self, db, ttl=DEFAULT_LEASE_TTL, poll_interval=1.0, owner=None):
+        self.db = db
+        self.ttl = ttl
+        self.poll_interval = poll_interval
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{os.urandom(3).hex()}"
+        self.leases = db.backend.lease_store() or SQLiteLeaseStore(db.db_path)
+        
+    def single_flight(self, name, func):
+        """
+        Run `func()` unless another process is already running `name`; in that
+        case wait for it and return its result. The result must be JSON-serializable.
+        """
+        while True:
+            acquired, generation = self.leases.acquire(name, self.owner, self.ttl)
+            if acquired:
+                return self._run(name, func)
+                
+            logger.info(f"{name} is already running in another process; waiting for its result")
+            while True:
+                time.sleep(self.poll_interval)
+                row = self.leases.read(name)
+                if row is None:
+                    break
+                owner, expires_at, current_generation, result = row
+                if current_generation > generation:
+                    logger.info(f"Reusing the result of the concurrent {name} run")
+                    return json.loads(result) if result is not None else None
+                if owner is None or expires_at < time.time():
+                    # The holder failed or crashed without a result; try to run it ourselves
+                    break
+                    
+    def _run(self, name, func):
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(name, stop), daemon=True)
+        heartbeat.start()
+        try:
+            result = func()
+        except BaseException:
+            stop.set()
+            heartbeat.join()
+            self.leases.release(name, self.owner)
+            raise
+        stop.set()
+        heartbeat.join()
+        self.leases.release(name, self.owner, json.dumps(result), completed=True)
+        return result
+    
+    def _heartbeat(self, name, stop):
+        while not stop.wait(self.ttl / 3):
+            if not self.leases.renew(name, self.owner, self.ttl):
+                logger.warning(f"Lost the {name} lease to another process")
+                return
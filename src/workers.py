@@ -0,0 +1,195 @@
+import logging
+import threading
+import time
+from src.storage.database import NewsDatabase
+from src.storage.job_queue import JobQueue, default_worker_id
+from src.storage.run_lock import RunCoordinator
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROLES = ("fetch", "analyze", "render")
+
+# Lookback of analyses, as in the single-process pipeline
+ANALYSIS_HOURS = 8
+
+class Worker:
+    """
+    Queue worker for one pipeline role.
+    
+    fetch:   fetches and stores news, indexes coin mentions, fetches coin updates
+             and price charts, then queues one analyze job for the global analysis and one per
+             watchlist, and schedules the next fetch after `fetch_interval`
+             (idle fetch workers re-schedule it if a fetch failed for good)
+    analyze: runs one LLM analysis and queues a render job for it
+    render:  writes the HTML and text reports of one analysis
+    
+    Start any number of workers per role; the queue's leases make sure each
+    job is processed by one worker at a time.
+    """
+    
+    def __init__(self, role, config_path="config/api_config.json", worker_id=None,
+                 poll_interval=5, fetch_interval=28800):
+        if role not in ROLES:
+            raise ValueError(f"Unknown worker role: {role}")
+        self.role = role
+        self.config_path = config_path
+        self.worker_id = worker_id or default_worker_id()
+        self.poll_interval = poll_interval
+        self.fetch_interval = fetch_interval
+        self.db = NewsDatabase(config_path)
+        self.queue = JobQueue(db=self.db)
+        self.handlers = {"fetch": self._fetch, "analyze": self._analyze, "render": self._render}
+        self._components = {}
+        
+    def _component(self, name, factory):
+        """Create pipeline components on first use, so each role only builds what it needs"""
+        if name not in self._components:
+            self._components[name] = factory()
+        return self._components[name]
+    
+    def run(self, max_jobs=None):
+        """Process jobs until interrupted (or until `max_jobs` jobs were handled)"""
+        logger.info(f"Worker {self.worker_id} started for {self.role} jobs")
+        if self.role == "fetch":
+            # No-op if a fetch is already queued or running
+            self.queue.enqueue("fetch", dedupe_key="fetch")
+            
+        handled = 0
+        while max_jobs is None or handled < max_jobs:
+            try:
+                job = self.queue.claim([self.role], self.worker_id)
+                if not job:
+                    if self.role == "fetch":
+                        self._schedule_fetch()
+                    time.sleep(self.poll_interval)
+                    continue
+                self.process(job)
+                handled += 1
+            except KeyboardInterrupt:
+                logger.info(f"Worker {self.worker_id} stopped by user")
+                break
+            except Exception as e:
+                logger.error(f"Worker {self.worker_id} error: {e}")
+                time.sleep(self.poll_interval)
+        return handled
+    
+    def process(self, job):
+        """Run a claimed job while keeping its lease alive, then complete or fail it"""
+        logger.info(f"Processing {job}")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop), daemon=True)
+        heartbeat.start()
+        try:
+            follow_ups = self.handlers[job.kind](job.payload) or []
+        except Exception as e:
+            stop.set()
+            heartbeat.join()
+            self.queue.fail(job, self.worker_id, e)
+            return False
+        stop.set()
+        heartbeat.join()
+        
+        # Follow-up jobs are only queued once this job is safely marked done
+        if self.queue.complete(job, self.worker_id):
+            for kind, payload, delay, dedupe_key in follow_ups:
+                self.queue.enqueue(kind, payload, delay=delay, dedupe_key=dedupe_key)
+        return True
+    
+    def _schedule_fetch(self):
+        """
+        Queue the next periodic fetch unless one is already queued or running.
+        
+        A successful fetch schedules its successor as a follow-up; this keeps the
+        schedule going after a fetch that failed permanently (e.g. a source outage
+        longer than the retries) or whose worker died on its last attempt.
+        """
+        if self.queue.enqueue("fetch", delay=self.fetch_interval, dedupe_key="fetch"):
+            logger.info(f"No fetch was scheduled; next fetch in {self.fetch_interval}s")
+            
+    def _heartbeat(self, job, stop):
+        while not stop.wait(self.queue.visibility_timeout / 3):
+            if not self.queue.heartbeat(job, self.worker_id):
+                return
+                
+    def _fetch(self, payload):
+        from src.data_collection.news_fetcher import NewsFetcher
+        from src.storage.coin_index import CoinIndexer
+        from src.storage.price_store import PriceStore
+        from src.analysis.watchlists import load_watchlists, watched_coins
+        
+        fetcher = self._component("fetcher", lambda: NewsFetcher(self.config_path))
+        watchlists = load_watchlists(self.db.config)
+        
+        def fetch_and_store():
+            news_items = fetcher.fetch_all_sources()
+            saved_count = self.db.save_news(news_items)
+            self.db.save_news_to_files(news_items)
+            
+            if self.db.db_type == "sqlite":
+                self._component("coin_indexer", lambda: CoinIndexer(self.config_path, db=self.db)).index_pending()
+                
+            coins = watched_coins(watchlists, self.db.resolve_coin)
+            coin_updates = fetcher.fetch_by_coin(coins)
+            if coin_updates:
+                self.db.save_coin_updates(coin_updates)
+                
+            price_store = self._component("price_store", lambda: PriceStore(self.config_path, db=self.db))
+            if self.db.db_type == "sqlite" and price_store.settings["enabled"]:
+                price_store.ingest(coins)
+            return saved_count
+        
+        # Shares the run lock with single-process pipelines on the same database
+        saved_count = RunCoordinator(self.db).single_flight("fetch", fetch_and_store)
+        logger.info(f"Fetch saved {saved_count} new news items")
+        
+        follow_ups = [("analyze", {}, 0, "analyze")]
+        follow_ups += [("analyze", {"watchlist": name}, 0, f"analyze:{name}") for name in watchlists]
+        follow_ups.append(("fetch", {}, self.fetch_interval, "fetch"))
+        return follow_ups
+    
+    def _analyze(self, payload):
+        from src.analysis.llm_analyzer import LLMAnalyzer
+        from src.analysis.watchlists import load_watchlists
+        
+        analyzer = self._component("analyzer", lambda: LLMAnalyzer(self.config_path))
+        name = payload.get("watchlist")
+        if not name:
+            analysis = analyzer.analyze_recent_news(self.db, hours=ANALYSIS_HOURS)
+            if "error" in analysis:
+                raise RuntimeError(analysis["error"])
+            return [("render", {"analysis": analysis, "hours": ANALYSIS_HOURS}, 0, None)]
+            
+        watchlist = load_watchlists(self.db.config).get(name)
+        if not watchlist:
+            logger.warning(f"Watchlist {name} is no longer configured; dropping the job")
+            return []
+        coins = [self.db.resolve_coin(coin) for coin in watchlist["coins"]]
+        hours = watchlist["hours"] or ANALYSIS_HOURS
+        analysis = analyzer.analyze_recent_news(self.db, hours=hours, limit=watchlist["limit"],
+                                                coins=coins, watchlist=name)
+        if "error" in analysis:
+            raise RuntimeError(analysis["error"])
+        if "coins" not in analysis:
+            logger.info(f"No recent news for watchlist {name}")
+            return []
+        return [("render", {"analysis": analysis, "watchlist": name, "coins": coins, "hours": hours}, 0, None)]
+    
+    def _render(self, payload):
+        from src.analysis.report_generator import ReportGenerator
+        
+        report_generator = self._component("report_generator", ReportGenerator)
+        since_ts = int(time.time()) - payload.get("hours", ANALYSIS_HOURS) * 3600
+        coins = payload.get("coins")
+        if coins:
+            coin_mentions = [(coin, count) for coin, count in self.db.get_coin_mention_counts(since_ts=since_ts)
+                             if coin in coins]
+        else:
+            coin_mentions = self.db.get_coin_mention_counts(since_ts=since_ts, limit=10)
+        name = payload.get("watchlist")
+        for report in (report_generator.generate_html_report(payload["analysis"], coin_mentions, name=name),
+                       report_generator.generate_text_report(payload["analysis"], coin_mentions, name=name)):
+            if not report:
+                raise RuntimeError("Report generation failed")
+            logger.info(f"Report generated: {report}")
+        return []